@@ -12,7 +12,10 @@ from app.schemas.lead_schemas import (
     LeadResponse,
     LeadsListResponse,
     LeadUpdate,
+    RescoreRequest,
+    RescoreRunResponse,
 )
+from app.services.lead_rescoring_service import RescoreFilter, get_lead_rescorer
 from app.services.websocket_manager import ws_manager
 from app.utils.db import get_db
 
@@ -76,6 +79,30 @@ def get_lead_metrics(
         conversion_rate=metrics["conversion_rate"],
     )
 
+@router.post("/rescore", response_model=RescoreRunResponse, status_code=202)
+def start_rescore(request: RescoreRequest):
+    filters = RescoreFilter(
+        status=request.status,
+        step=request.step,
+        created_from=request.created_from,
+        created_to=request.created_to,
+        limit=request.limit,
+    )
+    try:
+        run = get_lead_rescorer().start(filters, request.concurrency)
+    except RuntimeError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    
+    return RescoreRunResponse(**run.snapshot())
+
+@router.get("/rescore/{run_id}", response_model=RescoreRunResponse)
+def get_rescore(run_id: uuid.UUID):
+    run = get_lead_rescorer().get_run(run_id)
+    if not run:
+        raise HTTPException(status_code=404, detail="Rescoring não encontrado")
+    
+    return RescoreRunResponse(**run.snapshot())
+
 @router.get("/{lead_id}", response_model=LeadResponse)
 def get_lead(
     lead_id: uuid.UUID,
@@ -0,0 +1,11 @@
+from __future__ import annotations
+
+from fastapi import APIRouter
+
+from app.utils import metrics
+
+router = APIRouter(prefix="/metrics", tags=["Metrics"])
+
+@router.get("/")
+def get_metrics():
+    return metrics.collect()
@@ -2,13 +2,15 @@ from __future__ import annotations
 
 import logging
 
-from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, Request
+from fastapi import APIRouter, BackgroundTasks, HTTPException, Request
 from fastapi.responses import PlainTextResponse
-from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
 
-from app.schemas.webhook_schemas import WebhookPayload
-from app.services.webhook_service import extract_message_data, message_handler
-from app.utils.db import get_db, SessionLocal
+from app.services.dedupe_service import message_deduplicator
+from app.services.delivery_status_service import delivery_status_recorder
+from app.services.ingestion_service import get_ingestion_pipeline, handle_text_batch
+from app.services.webhook_parser import is_status_callback, parse_statuses, parse_webhook_body
+from app.services.webhook_service import message_handler
 from app.utils.settings import settings
 
 logger = logging.getLogger(__name__)
@@ -19,11 +21,6 @@ router = APIRouter()
 def health_check():
     return {"status": "ok"}
 
-def get_db_factory():
-    def factory() -> Session:
-        return SessionLocal()
-    return factory
-
 @router.get("/webhook", response_class=PlainTextResponse)
 def verify_webhook(request: Request):
     mode = request.query_params.get("hub.mode")
@@ -38,41 +35,59 @@ def verify_webhook(request: Request):
     raise HTTPException(status_code=403, detail="Falha na verificação do webhook")
 
 @router.post("/webhook")
-def receive_webhook(
-    payload: WebhookPayload,
+async def receive_webhook(
+    request: Request,
     background_tasks: BackgroundTasks,
-    db: Session = Depends(get_db),
 ):
-    wa_id, display_name, text_body, message_id, message_type = extract_message_data(payload)
+    body = await request.body()
+
+    if is_status_callback(body):
+        if settings.delivery_status_tracking:
+            delivery_status_recorder.record(parse_statuses(body))
+        return {"status": "ignored"}
+
+    messages = parse_webhook_body(body)
 
-    if not wa_id or not message_id:
+    if not messages:
         logger.debug("Payload ignorado: sem wa_id ou message_id")
         return {"status": "ignored"}
 
-    logger.info(f"Mensagem recebida de {wa_id}, tipo: {message_type}")
-
-    db_factory = get_db_factory()
-
-    if message_type == "text" and text_body:
-        message_handler.handle_text_message(
-            wa_id=wa_id,
-            text=text_body,
-            message_id=message_id,
-            db=db,
-            db_factory=db_factory,
-        )
-    elif message_type == "audio":
-        background_tasks.add_task(
-            message_handler.handle_audio_message,
-            wa_id,
-            message_id,
-        )
-    else:
-        background_tasks.add_task(
-            message_handler.handle_unsupported_message,
-            wa_id,
-            message_id,
-            message_type,
-        )
+    messages = message_deduplicator.filter_new(messages)
+    if not messages:
+        return {"status": "duplicate"}
+
+    for message in messages:
+        logger.info(f"Mensagem recebida de {message.wa_id}, tipo: {message.message_type}")
+
+    if settings.webhook_ingestion_mode == "queue":
+        if not get_ingestion_pipeline().submit(messages):
+            message_deduplicator.forget(m.message_id for m in messages)
+            raise HTTPException(status_code=503, detail="Fila de ingestao cheia")
+        return {"status": "queued"}
+
+    text_messages = [m for m in messages if m.message_type == "text" and m.text_body]
+    if text_messages:
+        try:
+            await run_in_threadpool(handle_text_batch, text_messages)
+        except Exception:
+            message_deduplicator.forget(m.message_id for m in messages)
+            raise
+
+    for message in messages:
+        if message.message_type == "text" and message.text_body:
+            continue
+        if message.message_type == "audio":
+            background_tasks.add_task(
+                message_handler.handle_audio_message,
+                message.wa_id,
+                message.message_id,
+            )
+        else:
+            background_tasks.add_task(
+                message_handler.handle_unsupported_message,
+                message.wa_id,
+                message.message_id,
+                message.message_type,
+            )
 
     return {"status": "ok"}
@@ -1,11 +1,17 @@
 from app.dao import conversation_dao
 from app.dao import lead_dao
 from app.dao import message_dao
+from app.dao import message_status_dao
+from app.dao import pending_text_dao
 from app.dao import profile_dao
+from app.dao import scoring_job_dao
 
 __all__ = [
     "conversation_dao",
     "lead_dao",
     "message_dao",
+    "message_status_dao",
+    "pending_text_dao",
     "profile_dao",
+    "scoring_job_dao",
 ]
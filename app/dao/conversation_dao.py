@@ -2,6 +2,7 @@ from __future__ import annotations
 
 import uuid
 from datetime import datetime
+from typing import Iterable
 
 from sqlalchemy.orm import Session
 
@@ -52,6 +53,35 @@ def get_or_create_open(db: Session, profile_id) -> Conversation:
         return conversation
     return create_conversation(db, profile_id)
 
+def get_or_create_open_many(db: Session, profile_ids: Iterable[uuid.UUID]) -> dict[uuid.UUID, Conversation]:
+    ids = set(profile_ids)
+    if not ids:
+        return {}
+    active = (
+        db.query(Conversation)
+        .filter(
+            Conversation.profile_id.in_(ids),
+            Conversation.status.in_([ConversationStatus.OPEN, ConversationStatus.HUMAN])
+        )
+        .order_by(Conversation.created_at.desc())
+        .all()
+    )
+    conversations: dict[uuid.UUID, Conversation] = {}
+    for conversation in active:
+        conversations.setdefault(conversation.profile_id, conversation)
+    missing = ids - conversations.keys()
+    if missing:
+        created = [
+            Conversation(id=uuid.uuid4(), profile_id=profile_id, status=ConversationStatus.OPEN, tags=[])
+            for profile_id in missing
+        ]
+        created_ids = [c.id for c in created]
+        db.add_all(created)
+        db.commit()
+        reloaded = db.query(Conversation).filter(Conversation.id.in_(created_ids)).all()
+        conversations.update({c.profile_id: c for c in reloaded})
+    return conversations
+
 def close_conversation(
     db: Session,
     conversation_id: uuid.UUID,
@@ -85,6 +115,18 @@ def set_human_takeover(
     db.refresh(conversation)
     return conversation
 
+def update_summary(
+    db: Session,
+    conversation_id: uuid.UUID,
+    summary: str,
+    summary_until: datetime,
+) -> None:
+    db.query(Conversation).filter(Conversation.id == conversation_id).update(
+        {Conversation.summary: summary, Conversation.summary_until: summary_until},
+        synchronize_session=False,
+    )
+    db.commit()
+
 def _normalize_tag(tag: str) -> str:
     return tag.lower().strip().replace(" ", "_")
 
@@ -3,7 +3,7 @@ from __future__ import annotations
 import uuid
 from datetime import datetime
 
-from sqlalchemy import func
+from sqlalchemy import func, select, update
 from sqlalchemy.orm import Session
 
 from app.entities.lead_entity import Lead, LeadStatus
@@ -30,6 +30,35 @@ def get_by_conversation_id(db: Session, conversation_id: uuid.UUID) -> Lead | No
         .one_or_none()
     )
 
+STEP_COLUMNS = {
+    "step_novo_lead": Lead.step_novo_lead,
+    "step_primeiro_contato": Lead.step_primeiro_contato,
+    "step_negociacao": Lead.step_negociacao,
+    "step_orcamento_realizado": Lead.step_orcamento_realizado,
+    "step_orcamento_aceito": Lead.step_orcamento_aceito,
+    "step_orcamento_recusado": Lead.step_orcamento_recusado,
+    "step_venda_convertida": Lead.step_venda_convertida,
+    "step_venda_perdida": Lead.step_venda_perdida,
+}
+
+def _filtered(
+    db: Session,
+    status: str | None = None,
+    step: str | None = None,
+    created_from: datetime | None = None,
+    created_to: datetime | None = None,
+):
+    query = db.query(Lead).filter(Lead.deleted_at.is_(None))
+    if status:
+        query = query.filter(Lead.status == status)
+    if step in STEP_COLUMNS:
+        query = query.filter(STEP_COLUMNS[step] == True)
+    if created_from:
+        query = query.filter(Lead.created_at >= created_from)
+    if created_to:
+        query = query.filter(Lead.created_at < created_to)
+    return query
+
 def get_all_paginated(
     db: Session,
     page: int = 1,
@@ -37,24 +66,7 @@ def get_all_paginated(
     status: str | None = None,
     step: str | None = None,
 ) -> tuple[list[Lead], int]:
-    query = db.query(Lead).filter(Lead.deleted_at.is_(None))
-    
-    if status:
-        query = query.filter(Lead.status == status)
-    
-    if step:
-        step_mapping = {
-            "step_novo_lead": Lead.step_novo_lead,
-            "step_primeiro_contato": Lead.step_primeiro_contato,
-            "step_negociacao": Lead.step_negociacao,
-            "step_orcamento_realizado": Lead.step_orcamento_realizado,
-            "step_orcamento_aceito": Lead.step_orcamento_aceito,
-            "step_orcamento_recusado": Lead.step_orcamento_recusado,
-            "step_venda_convertida": Lead.step_venda_convertida,
-            "step_venda_perdida": Lead.step_venda_perdida,
-        }
-        if step in step_mapping:
-            query = query.filter(step_mapping[step] == True)
+    query = _filtered(db, status, step)
     
     total = query.count()
     leads = (
@@ -159,6 +171,37 @@ def update_lead(
     db.refresh(lead)
     return lead
 
+def get_ids_for_rescore(
+    db: Session,
+    status: str | None = None,
+    step: str | None = None,
+    created_from: datetime | None = None,
+    created_to: datetime | None = None,
+    limit: int | None = None,
+) -> list[uuid.UUID]:
+    if step and step not in STEP_COLUMNS:
+        raise ValueError(f"Step desconhecido: {step}")
+    query = _filtered(db, status, step, created_from, created_to).with_entities(Lead.id)
+    query = query.order_by(Lead.created_at.asc())
+    if limit:
+        query = query.limit(limit)
+    return [row[0] for row in query.all()]
+
+RESCORE_LOCK_NAME = "lead_rescoring"
+
+def try_lock_rescore(db: Session) -> bool:
+    return bool(db.execute(select(func.pg_try_advisory_lock(func.hashtext(RESCORE_LOCK_NAME)))).scalar())
+
+def unlock_rescore(db: Session) -> None:
+    db.execute(select(func.pg_advisory_unlock(func.hashtext(RESCORE_LOCK_NAME))))
+
+def update_leads(db: Session, updates: list[dict]) -> int:
+    if not updates:
+        return 0
+    db.execute(update(Lead), updates)
+    db.commit()
+    return len(updates)
+
 def soft_delete(db: Session, lead_id: uuid.UUID) -> bool:
     lead = get_by_id(db, lead_id)
     if not lead:
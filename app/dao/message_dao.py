@@ -1,7 +1,11 @@
 from __future__ import annotations
 
+from datetime import datetime
+
+from sqlalchemy.dialects.postgresql import insert
 from sqlalchemy.orm import Session
 
+from app.entities.message_provider_id_entity import MessageProviderId
 from app.entities.message_entity import Message
 
 def create_message(
@@ -12,6 +16,7 @@ def create_message(
     content: str,
     provider_message_id: str | None = None,
     message_type: str = "text",
+    provider_message_ids: list[str] | None = None,
 ) -> Message:
     message = Message(
         conversation_id=conversation_id,
@@ -22,10 +27,41 @@ def create_message(
         message_type=message_type,
     )
     db.add(message)
+    if provider_message_ids:
+        db.flush()
+        db.add_all(
+            MessageProviderId(provider_message_id=provider_message_id, message_id=message.id)
+            for provider_message_id in dict.fromkeys(provider_message_ids)
+        )
     db.commit()
     db.refresh(message)
     return message
 
+def create_messages(db: Session, messages: list[dict]) -> int:
+    if not messages:
+        return 0
+    stmt = insert(Message).values(messages).on_conflict_do_nothing(
+        index_elements=["provider_message_id"],
+        index_where=Message.provider_message_id.isnot(None),
+    )
+    result = db.execute(stmt)
+    db.commit()
+    return result.rowcount
+
+def get_existing_provider_message_ids(db: Session, provider_message_ids: list[str]) -> set[str]:
+    if not provider_message_ids:
+        return set()
+    rows = (
+        db.query(Message.provider_message_id)
+        .filter(Message.provider_message_id.in_(provider_message_ids))
+        .union(
+            db.query(MessageProviderId.provider_message_id)
+            .filter(MessageProviderId.provider_message_id.in_(provider_message_ids))
+        )
+        .all()
+    )
+    return {row[0] for row in rows}
+
 def get_messages_by_conversation_id(
     db: Session,
     conversation_id,
@@ -52,3 +88,35 @@ def get_messages_by_conversation_id(
         )
 
     return query.all()
+
+def get_messages_between(
+    db: Session,
+    conversation_id,
+    after: datetime | None,
+    before: datetime,
+    limit: int,
+) -> list[Message]:
+    query = db.query(Message).filter(
+        Message.conversation_id == conversation_id,
+        Message.created_at < before,
+    )
+    if after is not None:
+        query = query.filter(Message.created_at > after)
+    return query.order_by(Message.created_at.asc()).limit(limit).all()
+
+def set_provider_message_id(db: Session, message_id, provider_message_id: str) -> None:
+    db.query(Message).filter(Message.id == message_id).update(
+        {Message.provider_message_id: provider_message_id}, synchronize_session=False,
+    )
+    db.commit()
+
+def add_provider_message_ids(db: Session, message_id, provider_message_ids: list[str]) -> int:
+    if not provider_message_ids:
+        return 0
+    stmt = insert(MessageProviderId).values([
+        {"provider_message_id": provider_message_id, "message_id": message_id}
+        for provider_message_id in dict.fromkeys(provider_message_ids)
+    ]).on_conflict_do_nothing(index_elements=["provider_message_id"])
+    result = db.execute(stmt)
+    db.commit()
+    return result.rowcount
@@ -0,0 +1,13 @@
+from __future__ import annotations
+
+from sqlalchemy import insert
+from sqlalchemy.orm import Session
+
+from app.entities.message_status_entity import MessageStatusEvent
+
+def create_many(db: Session, events: list[dict]) -> int:
+    if not events:
+        return 0
+    db.execute(insert(MessageStatusEvent), events)
+    db.commit()
+    return len(events)
@@ -0,0 +1,83 @@
+from __future__ import annotations
+
+from datetime import datetime, timedelta
+
+from sqlalchemy import func, select
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.orm import Session
+
+from app.entities.pending_text_entity import PendingText
+
+def db_now(db: Session) -> datetime:
+    return db.execute(select(func.now())).scalar_one()
+
+def create_many(db: Session, wa_id: str, profile_id, conversation_id, items: list[tuple[str, str | None]], window: float) -> int:
+    due_at = db_now(db) + timedelta(seconds=window)
+    stmt = insert(PendingText).values([
+        {
+            "wa_id": wa_id,
+            "profile_id": profile_id,
+            "conversation_id": conversation_id,
+            "text": text,
+            "provider_message_id": provider_message_id,
+            "due_at": due_at,
+        }
+        for text, provider_message_id in items
+    ]).on_conflict_do_nothing(
+        index_elements=["provider_message_id"],
+        index_where=PendingText.provider_message_id.isnot(None),
+    )
+    result = db.execute(stmt)
+    db.commit()
+    return result.rowcount
+
+def claim_due(db: Session, wa_id: str) -> list[dict]:
+    db.execute(select(func.pg_advisory_xact_lock(func.hashtext(wa_id))))
+    rows = (
+        db.query(PendingText)
+        .filter(PendingText.wa_id == wa_id)
+        .order_by(PendingText.id.asc())
+        .with_for_update()
+        .all()
+    )
+    if not rows or max(r.due_at for r in rows) > db_now(db):
+        db.rollback()
+        return []
+    claimed = [
+        {
+            "profile_id": r.profile_id,
+            "conversation_id": r.conversation_id,
+            "provider_message_id": r.provider_message_id,
+            "text": r.text,
+            "due_at": r.due_at,
+            "created_at": r.created_at,
+        }
+        for r in rows
+    ]
+    (
+        db.query(PendingText)
+        .filter(PendingText.id.in_([r.id for r in rows]))
+        .delete(synchronize_session=False)
+    )
+    db.commit()
+    return claimed
+
+def seconds_until_due(db: Session, wa_id: str) -> float | None:
+    due_at = (
+        db.query(func.max(PendingText.due_at))
+        .filter(PendingText.wa_id == wa_id)
+        .scalar()
+    )
+    if due_at is None:
+        return None
+    return (due_at - db_now(db)).total_seconds()
+
+def get_due_wa_ids(db: Session, limit: int = 100) -> list[str]:
+    rows = (
+        db.query(PendingText.wa_id)
+        .group_by(PendingText.wa_id)
+        .having(func.max(PendingText.due_at) <= func.now())
+        .limit(limit)
+        .all()
+    )
+    return [row[0] for row in rows]
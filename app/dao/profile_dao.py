@@ -1,7 +1,9 @@
 from __future__ import annotations
 
 import uuid
+from typing import Iterable
 
+from sqlalchemy.dialects.postgresql import insert
 from sqlalchemy.orm import Session
 
 from app.entities.profile_entity import Profile
@@ -66,6 +68,25 @@ def get_or_create(db: Session, whatsapp_number: str, display_name: str | None) -
         return profile
     return create_profile(db, whatsapp_number, display_name)
 
+def get_or_create_many(db: Session, whatsapp_numbers: Iterable[str]) -> dict[str, Profile]:
+    numbers = set(whatsapp_numbers)
+    if not numbers:
+        return {}
+    profiles = {
+        p.whatsapp_number: p
+        for p in db.query(Profile).filter(Profile.whatsapp_number.in_(numbers)).all()
+    }
+    missing = numbers - profiles.keys()
+    if missing:
+        stmt = insert(Profile).values(
+            [{"id": uuid.uuid4(), "whatsapp_number": number, "tags": []} for number in missing]
+        ).on_conflict_do_nothing(index_elements=["whatsapp_number"])
+        db.execute(stmt)
+        db.commit()
+        created = db.query(Profile).filter(Profile.whatsapp_number.in_(missing)).all()
+        profiles.update({p.whatsapp_number: p for p in created})
+    return profiles
+
 def update_name(
     db: Session, profile_id: uuid.UUID, first_name: str | None = None, last_name: str | None = None,
 ) -> Profile | None:
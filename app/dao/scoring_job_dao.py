@@ -0,0 +1,82 @@
+from __future__ import annotations
+
+import uuid
+from datetime import timedelta
+
+from sqlalchemy import case, func, update
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.orm import Session
+
+from app.entities.scoring_job_entity import ScoringJob, ScoringJobStatus
+
+def enqueue(db: Session, lead_id: uuid.UUID, conversation_id: uuid.UUID) -> bool:
+    stmt = insert(ScoringJob).values(
+        lead_id=lead_id,
+        conversation_id=conversation_id,
+        status=ScoringJobStatus.PENDING,
+    ).on_conflict_do_nothing(
+        index_elements=["lead_id"],
+        index_where=ScoringJob.status.in_([ScoringJobStatus.PENDING, ScoringJobStatus.RUNNING]),
+    )
+    result = db.execute(stmt)
+    db.commit()
+    return bool(result.rowcount)
+
+def claim_next(db: Session) -> ScoringJob | None:
+    job = (
+        db.query(ScoringJob)
+        .filter(ScoringJob.status == ScoringJobStatus.PENDING, ScoringJob.run_after <= func.now())
+        .order_by(ScoringJob.run_after.asc(), ScoringJob.id.asc())
+        .with_for_update(skip_locked=True)
+        .first()
+    )
+    if not job:
+        db.rollback()
+        return None
+    job.status = ScoringJobStatus.RUNNING
+    job.attempts += 1
+    job.locked_at = func.now()
+    db.commit()
+    db.refresh(job)
+    return job
+
+def complete(db: Session, job_id: int) -> None:
+    db.query(ScoringJob).filter(ScoringJob.id == job_id).update(
+        {ScoringJob.status: ScoringJobStatus.DONE, ScoringJob.last_error: None},
+        synchronize_session=False,
+    )
+    db.commit()
+
+def fail(db: Session, job_id: int, error: str, retry_in: float | None) -> None:
+    values = {ScoringJob.last_error: error[:2000]}
+    if retry_in is None:
+        values[ScoringJob.status] = ScoringJobStatus.FAILED
+    else:
+        values[ScoringJob.status] = ScoringJobStatus.PENDING
+        values[ScoringJob.run_after] = func.now() + timedelta(seconds=retry_in)
+    db.query(ScoringJob).filter(ScoringJob.id == job_id).update(values, synchronize_session=False)
+    db.commit()
+
+def requeue_stale(db: Session, older_than: float, max_attempts: int) -> tuple[int, int]:
+    exhausted = ScoringJob.attempts >= max_attempts
+    stmt = (
+        update(ScoringJob)
+        .where(
+            ScoringJob.status == ScoringJobStatus.RUNNING,
+            ScoringJob.locked_at < func.now() - timedelta(seconds=older_than),
+        )
+        .values(
+            status=case((exhausted, ScoringJobStatus.FAILED), else_=ScoringJobStatus.PENDING),
+            run_after=func.now(),
+            last_error=case(
+                (exhausted, "Job abandonado em execucao apos esgotar as tentativas"),
+                else_=ScoringJob.last_error,
+            ),
+        )
+        .returning(ScoringJob.status)
+        .execution_options(synchronize_session=False)
+    )
+    statuses = db.execute(stmt).scalars().all()
+    db.commit()
+    failed = sum(1 for status in statuses if status == ScoringJobStatus.FAILED)
+    return len(statuses) - failed, failed
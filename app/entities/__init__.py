@@ -1,6 +1,10 @@
 from app.entities.profile_entity import Profile
 from app.entities.conversation_entity import Conversation
 from app.entities.message_entity import Message
+from app.entities.message_provider_id_entity import MessageProviderId
 from app.entities.lead_entity import Lead
+from app.entities.message_status_entity import MessageStatusEvent
+from app.entities.pending_text_entity import PendingText
+from app.entities.scoring_job_entity import ScoringJob
 
-__all__ = ["Profile", "Conversation", "Message", "Lead"]
+__all__ = ["Profile", "Conversation", "Message", "MessageProviderId", "Lead", "MessageStatusEvent", "PendingText", "ScoringJob"]
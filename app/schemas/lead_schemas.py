@@ -87,3 +87,30 @@ class LeadMetricsResponse(BaseModel):
     by_step: dict[str, int]
     by_status: dict[str, int]
     conversion_rate: float
+
+STEP_PATTERN = (
+    "^(step_novo_lead|step_primeiro_contato|step_negociacao|step_orcamento_realizado"
+    "|step_orcamento_aceito|step_orcamento_recusado|step_venda_convertida|step_venda_perdida)$"
+)
+
+class RescoreRequest(BaseModel):
+    status: str | None = Field(default=None, pattern="^(quente|morno|frio)$")
+    step: str | None = Field(default=None, pattern=STEP_PATTERN)
+    created_from: datetime | None = None
+    created_to: datetime | None = None
+    limit: int | None = Field(default=None, ge=1)
+    concurrency: int | None = Field(default=None, ge=1, le=32)
+
+class RescoreRunResponse(BaseModel):
+    id: uuid.UUID
+    state: str
+    concurrency: int
+    total: int
+    processed: int
+    updated: int
+    failed: int
+    error: str | None = None
+    started_at: datetime | None = None
+    finished_at: datetime | None = None
+    elapsed_seconds: float
+    leads_per_second: float
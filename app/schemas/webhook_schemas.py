@@ -1,5 +1,7 @@
 from __future__ import annotations
 
+from dataclasses import dataclass
+
 from pydantic import BaseModel, Field
 
 class WebhookText(BaseModel):
@@ -35,3 +37,11 @@ class WebhookEntry(BaseModel):
 class WebhookPayload(BaseModel):
     object: str | None = None
     entry: list[WebhookEntry] | None = None
+
+@dataclass
+class InboundMessage:
+    wa_id: str
+    message_id: str
+    message_type: str
+    text_body: str | None = None
+    display_name: str | None = None
@@ -1,6 +1,7 @@
 from __future__ import annotations
 
 import logging
+from dataclasses import dataclass
 
 from sqlalchemy.orm import Session
 
@@ -9,6 +10,17 @@ from app.entities.agent_config_entity import AgentConfig
 
 logger = logging.getLogger(__name__)
 
+@dataclass(frozen=True)
+class AgentInstructions:
+    version: str
+    tone: str
+    emoji: str
+    greeting: str
+    response_style: str
+    max_message_length: int
+
+_instructions: AgentInstructions | None = None
+
 def get_config(db: Session) -> AgentConfig:
     return agent_config_dao.get_config(db)
 
@@ -104,3 +116,26 @@ def build_response_style_instructions(config: AgentConfig) -> str:
         ),
     }
     return style_map.get(config.response_style, style_map["conversacional"])
+
+def config_version(config: AgentConfig) -> str:
+    updated_at = config.updated_at.isoformat() if config.updated_at else ""
+    return f"{config.id}:{updated_at}"
+
+def get_agent_instructions(db: Session) -> AgentInstructions:
+    global _instructions
+    config = agent_config_dao.get_config(db)
+    version = config_version(config)
+    cached = _instructions
+    if cached is not None and cached.version == version:
+        return cached
+    instructions = AgentInstructions(
+        version=version,
+        tone=build_tone_instructions(config),
+        emoji=build_emoji_instructions(config),
+        greeting=build_greeting_instructions(config),
+        response_style=build_response_style_instructions(config),
+        max_message_length=config.max_message_length,
+    )
+    _instructions = instructions
+    logger.debug(f"Instrucoes do agente recompiladas para versao {version}")
+    return instructions
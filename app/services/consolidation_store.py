@@ -0,0 +1,212 @@
+from __future__ import annotations
+
+import logging
+import threading
+import time
+import uuid
+import zlib
+from abc import ABC, abstractmethod
+from dataclasses import dataclass, field
+from typing import Any, Callable
+
+from sqlalchemy.orm import Session
+
+from app.dao import pending_text_dao
+from app.utils.db import SessionLocal
+from app.utils.metrics import Counter, register_provider
+from app.utils.settings import settings
+
+logger = logging.getLogger(__name__)
+
+@dataclass
+class ConsolidatedBatch:
+    wa_id: str
+    profile_id: uuid.UUID
+    conversation_id: uuid.UUID
+    texts: list[str]
+    message_ids: list[str]
+    first_received_at: float
+    due_at: float
+
+@dataclass
+class PendingMessage:
+    profile_id: uuid.UUID
+    conversation_id: uuid.UUID
+    texts: list[str] = field(default_factory=list)
+    message_ids: list[str] = field(default_factory=list)
+    first_received_at: float = 0.0
+    due_at: float = 0.0
+
+class ConsolidationStore(ABC):
+    durable = False
+
+    @abstractmethod
+    def append(
+        self, wa_id: str, profile_id: uuid.UUID, conversation_id: uuid.UUID,
+        items: list[tuple[str, str]], window: float,
+    ) -> float: ...
+
+    @abstractmethod
+    def claim(self, wa_id: str) -> ConsolidatedBatch | None: ...
+
+    @abstractmethod
+    def seconds_until_due(self, wa_id: str) -> float | None: ...
+
+    def due_contacts(self, limit: int = 100) -> list[str]:
+        return []
+
+    def stats(self) -> dict[str, Any]:
+        return {}
+
+class _MemoryShard:
+
+    def __init__(self) -> None:
+        self.pending: dict[str, PendingMessage] = {}
+        self.lock = threading.Lock()
+
+class MemoryConsolidationStore(ConsolidationStore):
+
+    def __init__(self, stripes: int | None = None) -> None:
+        self._shards = [_MemoryShard() for _ in range(max(1, stripes or settings.consolidation_store_stripes))]
+
+    def _shard(self, wa_id: str) -> _MemoryShard:
+        return self._shards[zlib.crc32(wa_id.encode("utf-8")) % len(self._shards)]
+
+    def append(
+        self, wa_id: str, profile_id: uuid.UUID, conversation_id: uuid.UUID,
+        items: list[tuple[str, str]], window: float,
+    ) -> float:
+        now = time.time()
+        shard = self._shard(wa_id)
+        with shard.lock:
+            pending = shard.pending.get(wa_id)
+            if pending is None:
+                pending = PendingMessage(
+                    profile_id=profile_id, conversation_id=conversation_id, first_received_at=now,
+                )
+                shard.pending[wa_id] = pending
+            pending.profile_id = profile_id
+            pending.conversation_id = conversation_id
+            for text, message_id in items:
+                pending.texts.append(text)
+                pending.message_ids.append(message_id)
+            pending.due_at = now + window
+        return window
+
+    def claim(self, wa_id: str) -> ConsolidatedBatch | None:
+        shard = self._shard(wa_id)
+        with shard.lock:
+            pending = shard.pending.get(wa_id)
+            if not pending or not pending.texts or pending.due_at > time.time():
+                return None
+            del shard.pending[wa_id]
+        return ConsolidatedBatch(
+            wa_id=wa_id,
+            profile_id=pending.profile_id,
+            conversation_id=pending.conversation_id,
+            texts=pending.texts,
+            message_ids=pending.message_ids,
+            first_received_at=pending.first_received_at,
+            due_at=pending.due_at,
+        )
+
+    def seconds_until_due(self, wa_id: str) -> float | None:
+        shard = self._shard(wa_id)
+        with shard.lock:
+            pending = shard.pending.get(wa_id)
+            if not pending:
+                return None
+            return pending.due_at - time.time()
+
+    def stats(self) -> dict[str, Any]:
+        contacts = 0
+        texts = 0
+        for shard in self._shards:
+            with shard.lock:
+                contacts += len(shard.pending)
+                texts += sum(len(p.texts) for p in shard.pending.values())
+        return {
+            "backend": "memory",
+            "stripes": len(self._shards),
+            "pending_contacts": contacts,
+            "pending_texts": texts,
+        }
+
+class PostgresConsolidationStore(ConsolidationStore):
+    durable = True
+
+    def __init__(self, session_factory: Callable[[], Session] | None = None):
+        self._session_factory = session_factory or SessionLocal
+        self._claimed = Counter()
+        self._appended = Counter()
+        self._duplicates = Counter()
+
+    def append(
+        self, wa_id: str, profile_id: uuid.UUID, conversation_id: uuid.UUID,
+        items: list[tuple[str, str]], window: float,
+    ) -> float:
+        db = self._session_factory()
+        try:
+            inserted = pending_text_dao.create_many(db, wa_id, profile_id, conversation_id, items, window)
+        finally:
+            db.close()
+        self._appended.inc(inserted)
+        if inserted < len(items):
+            self._duplicates.inc(len(items) - inserted)
+            logger.info(f"{len(items) - inserted} textos duplicados descartados para {wa_id}")
+        return window
+
+    def claim(self, wa_id: str) -> ConsolidatedBatch | None:
+        db = self._session_factory()
+        try:
+            rows = pending_text_dao.claim_due(db, wa_id)
+        finally:
+            db.close()
+        if not rows:
+            return None
+        self._claimed.inc(len(rows))
+        last = rows[-1]
+        return ConsolidatedBatch(
+            wa_id=wa_id,
+            profile_id=last["profile_id"],
+            conversation_id=last["conversation_id"],
+            texts=[r["text"] for r in rows],
+            message_ids=[r["provider_message_id"] for r in rows if r["provider_message_id"]],
+            first_received_at=rows[0]["created_at"].timestamp(),
+            due_at=max(r["due_at"] for r in rows).timestamp(),
+        )
+
+    def seconds_until_due(self, wa_id: str) -> float | None:
+        db = self._session_factory()
+        try:
+            return pending_text_dao.seconds_until_due(db, wa_id)
+        finally:
+            db.close()
+
+    def due_contacts(self, limit: int = 100) -> list[str]:
+        db = self._session_factory()
+        try:
+            return pending_text_dao.get_due_wa_ids(db, limit=limit)
+        finally:
+            db.close()
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            "backend": "postgres",
+            "appended": self._appended.value,
+            "duplicates": self._duplicates.value,
+            "claimed": self._claimed.value,
+        }
+
+_consolidation_store: ConsolidationStore | None = None
+
+def get_consolidation_store() -> ConsolidationStore:
+    global _consolidation_store
+    if _consolidation_store is None:
+        if settings.consolidation_store == "postgres":
+            _consolidation_store = PostgresConsolidationStore()
+        else:
+            _consolidation_store = MemoryConsolidationStore()
+        register_provider("consolidation_store", _consolidation_store.stats)
+        logger.info(f"Store de consolidacao: {settings.consolidation_store}")
+    return _consolidation_store
@@ -0,0 +1,64 @@
+from __future__ import annotations
+
+from dataclasses import dataclass
+
+@dataclass
+class TypingCadence:
+    last_arrival: float = 0.0
+    gap_ewma: float | None = None
+    burst_size_ewma: float | None = None
+    current_burst: int = 0
+    applied_window: float | None = None
+
+class AdaptiveWindow:
+
+    def __init__(
+        self,
+        min_window: float,
+        max_window: float,
+        default_window: float,
+        alpha: float = 0.3,
+        gap_multiplier: float = 2.0,
+    ):
+        self.min_window = min_window
+        self.max_window = max(min_window, max_window)
+        self.default_window = default_window
+        self.alpha = alpha
+        self.gap_multiplier = gap_multiplier
+
+    def _clamp(self, value: float) -> float:
+        return max(self.min_window, min(self.max_window, value))
+
+    def _ewma(self, current: float | None, sample: float) -> float:
+        if current is None:
+            return sample
+        return self.alpha * sample + (1 - self.alpha) * current
+
+    def observe(self, cadence: TypingCadence, now: float, count: int = 1) -> None:
+        gap = now - cadence.last_arrival if cadence.last_arrival else None
+        burst_window = cadence.applied_window if cadence.applied_window is not None else self.default_window
+        if gap is not None and gap <= burst_window:
+            cadence.gap_ewma = self._ewma(cadence.gap_ewma, gap)
+            cadence.current_burst += count
+        else:
+            if cadence.current_burst:
+                cadence.burst_size_ewma = self._ewma(cadence.burst_size_ewma, cadence.current_burst)
+            cadence.current_burst = count
+        if count > 1:
+            cadence.gap_ewma = self._ewma(cadence.gap_ewma, 0.0)
+        cadence.last_arrival = now
+
+    def window_for(self, cadence: TypingCadence) -> float:
+        cadence.applied_window = self._window_for(cadence)
+        return cadence.applied_window
+
+    def _window_for(self, cadence: TypingCadence) -> float:
+        if cadence.current_burst > 1 and cadence.gap_ewma is not None:
+            return self._clamp(cadence.gap_ewma * self.gap_multiplier)
+        if cadence.burst_size_ewma is None:
+            return self._clamp(self.default_window)
+        if cadence.burst_size_ewma < 1.5:
+            return self.min_window
+        if cadence.gap_ewma is None:
+            return self._clamp(self.default_window)
+        return self._clamp(cadence.gap_ewma * self.gap_multiplier)
@@ -0,0 +1,57 @@
+from __future__ import annotations
+
+import logging
+import threading
+from collections import OrderedDict
+from typing import Any, Iterable
+
+from app.utils.metrics import Counter, register_provider
+from app.utils.settings import settings
+
+logger = logging.getLogger(__name__)
+
+class MessageDeduplicator:
+
+    def __init__(self, capacity: int | None = None):
+        self.capacity = capacity or settings.dedupe_cache_size
+        self._seen: OrderedDict[str, None] = OrderedDict()
+        self._lock = threading.Lock()
+        self.dropped_memory = Counter()
+        self.dropped_database = Counter()
+        register_provider("dedupe", self.stats)
+
+    def mark_seen(self, message_id: str) -> bool:
+        with self._lock:
+            if message_id in self._seen:
+                self._seen.move_to_end(message_id)
+                return False
+            self._seen[message_id] = None
+            if len(self._seen) > self.capacity:
+                self._seen.popitem(last=False)
+            return True
+
+    def forget(self, message_ids: Iterable[str]) -> None:
+        with self._lock:
+            for message_id in message_ids:
+                self._seen.pop(message_id, None)
+
+    def filter_new(self, items: Iterable[Any], key: str = "message_id") -> list[Any]:
+        fresh = []
+        for item in items:
+            message_id = getattr(item, key)
+            if self.mark_seen(message_id):
+                fresh.append(item)
+            else:
+                self.dropped_memory.inc()
+                logger.info(f"Mensagem duplicada descartada: {message_id}")
+        return fresh
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            "cache_size": len(self._seen),
+            "cache_capacity": self.capacity,
+            "dropped_memory": self.dropped_memory.value,
+            "dropped_database": self.dropped_database.value,
+        }
+
+message_deduplicator = MessageDeduplicator()
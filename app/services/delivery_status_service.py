@@ -0,0 +1,130 @@
+from __future__ import annotations
+
+import logging
+import threading
+from datetime import datetime, timezone
+from typing import Any
+
+from app.dao import message_status_dao
+from app.utils.db import SessionLocal
+from app.utils.metrics import Counter, register_provider
+from app.utils.settings import settings
+
+logger = logging.getLogger(__name__)
+
+class DeliveryStatusRecorder:
+
+    def __init__(
+        self,
+        batch_size: int | None = None,
+        flush_interval: float | None = None,
+        max_buffer: int | None = None,
+    ):
+        self.batch_size = batch_size or settings.delivery_status_batch_size
+        self.flush_interval = flush_interval or settings.delivery_status_flush_interval
+        self.max_buffer = max_buffer or settings.delivery_status_max_buffer
+        self._buffer: list[dict] = []
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._thread: threading.Thread | None = None
+        self._recorded = Counter()
+        self._dropped = Counter()
+        self._requeued = Counter()
+        self._flushes = Counter()
+        register_provider("delivery_status", self.stats)
+
+    def _ensure_started(self) -> None:
+        if self._thread is not None:
+            return
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(
+                    target=self._flush_loop, name="delivery-status-flusher", daemon=True,
+                )
+                self._thread.start()
+
+    def record(self, callbacks: list[dict[str, Any]]) -> None:
+        statuses = [e for e in (_event_from_callback(c) for c in callbacks) if e]
+        if not statuses:
+            return
+        self._ensure_started()
+        with self._lock:
+            free = self.max_buffer - len(self._buffer)
+            accepted = statuses[:max(free, 0)]
+            self._buffer.extend(accepted)
+            dropped = len(statuses) - len(accepted)
+            should_flush = len(self._buffer) >= self.batch_size
+        if dropped:
+            self._dropped.inc(dropped)
+            logger.warning(f"Buffer de status cheio, {dropped} eventos descartados")
+        if should_flush:
+            self._wakeup.set()
+
+    def _flush_loop(self) -> None:
+        while True:
+            self._wakeup.wait(self.flush_interval)
+            self._wakeup.clear()
+            try:
+                self.flush()
+            except Exception as e:
+                logger.error(f"Erro ao gravar status de entrega: {e}")
+
+    def flush(self) -> int:
+        with self._lock:
+            batch, self._buffer = self._buffer, []
+        if not batch:
+            return 0
+        written = 0
+        db = SessionLocal()
+        try:
+            for start in range(0, len(batch), self.batch_size):
+                written += message_status_dao.create_many(db, batch[start:start + self.batch_size])
+                self._flushes.inc()
+        except Exception:
+            self._requeue(batch[written:])
+            raise
+        finally:
+            db.close()
+            self._recorded.inc(written)
+        return written
+
+    def _requeue(self, events: list[dict]) -> None:
+        with self._lock:
+            free = self.max_buffer - len(self._buffer)
+            kept = events[:max(free, 0)]
+            self._buffer[:0] = kept
+        dropped = len(events) - len(kept)
+        self._requeued.inc(len(kept))
+        if dropped:
+            self._dropped.inc(dropped)
+            logger.warning(f"Buffer de status cheio, {dropped} eventos descartados apos falha de gravacao")
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            "buffered": len(self._buffer),
+            "recorded": self._recorded.value,
+            "dropped": self._dropped.value,
+            "requeued": self._requeued.value,
+            "flushes": self._flushes.value,
+        }
+
+def _event_from_callback(status: dict[str, Any]) -> dict[str, Any] | None:
+    provider_message_id = status.get("id")
+    status_name = status.get("status")
+    if not provider_message_id or not status_name:
+        return None
+    timestamp = status.get("timestamp")
+    status_at = None
+    if timestamp:
+        try:
+            status_at = datetime.fromtimestamp(int(timestamp), tz=timezone.utc)
+        except (TypeError, ValueError):
+            status_at = None
+    return {
+        "provider_message_id": str(provider_message_id),
+        "status": str(status_name),
+        "recipient_id": status.get("recipient_id"),
+        "status_at": status_at,
+    }
+
+delivery_status_recorder = DeliveryStatusRecorder()
@@ -5,6 +5,9 @@ from dataclasses import dataclass
 
 from openai import OpenAI
 
+from app.services.llm_clients import get_llm_clients
+from app.services.llm_limiter import estimate_request_tokens, get_llm_limiter
+from app.utils.circuit_breaker import endpoint_key, get_circuit_breaker
 from app.utils.settings import settings, load_system_prompt
 
 logger = logging.getLogger(__name__)
@@ -27,7 +30,7 @@ class AIService:
     ):
         self.api_key = api_key or settings.openai_api_key
         self.base_url = base_url or settings.openai_base_url
-        self.model = model or settings.model
+        self.model = model or settings.fallback_model
         self._client: OpenAI | None = None
 
     def _get_client(self) -> OpenAI:
@@ -35,10 +38,7 @@ class AIService:
             if not self.api_key:
                 raise AIServiceError("OPENAI_API_KEY não configurada")
             
-            self._client = OpenAI(
-                api_key=self.api_key,
-                base_url=self.base_url,
-            )
+            self._client = get_llm_clients().openai(self.api_key, self.base_url)
         return self._client
 
     def _build_messages(self, messages: list[ChatMessage]) -> list[dict]:
@@ -61,7 +61,7 @@ class AIService:
         
         return result
 
-    def chat(self, messages: list[ChatMessage]) -> str:
+    def chat(self, messages: list[ChatMessage], priority: str = "onboarding") -> str:
         if not messages:
             raise AIServiceError("Nenhuma mensagem fornecida")
 
@@ -71,10 +71,14 @@ class AIService:
 
             logger.debug(f"Enviando {len(api_messages)} mensagens para {self.model}")
 
-            response = client.chat.completions.create(
-                model=self.model,
-                messages=api_messages, # type: ignore
-            )
+            estimated_tokens = estimate_request_tokens(str(m["content"]) for m in api_messages)
+            breaker = get_circuit_breaker(endpoint_key(self.base_url, self.model, "fallback"))
+            with breaker.guard(), get_llm_limiter().slot(priority, estimated_tokens) as ticket:
+                response = client.chat.completions.create(
+                    model=self.model,
+                    messages=api_messages, # type: ignore
+                )
+                ticket.used_tokens = response.usage.total_tokens if response.usage else None
 
             result = response.choices[0].message.content or ""
             logger.debug("Resposta recebida do modelo")
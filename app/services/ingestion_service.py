@@ -0,0 +1,113 @@
+from __future__ import annotations
+
+import logging
+import queue
+import threading
+import time
+from dataclasses import dataclass
+from typing import Any
+
+from app.services.webhook_service import InboundMessage, message_handler
+from app.utils.db import SessionLocal
+from app.utils.metrics import Counter, LatencyStats, register_provider
+from app.utils.settings import settings
+
+logger = logging.getLogger(__name__)
+
+@dataclass
+class IngestionJob:
+    messages: list[InboundMessage]
+    enqueued_at: float
+
+class IngestionPipeline:
+
+    def __init__(self, max_size: int | None = None, workers: int | None = None):
+        self.max_size = max_size or settings.webhook_queue_max_size
+        self.workers = workers or settings.webhook_workers
+        self._queue: queue.Queue[IngestionJob] = queue.Queue(maxsize=self.max_size)
+        self._threads: list[threading.Thread] = []
+        self._start_lock = threading.Lock()
+        self._accepted = Counter()
+        self._rejected = Counter()
+        self._processed = Counter()
+        self._failed = Counter()
+        self._wait_time = LatencyStats()
+        register_provider("ingestion", self.stats)
+
+    def start(self) -> None:
+        with self._start_lock:
+            if self._threads:
+                return
+            for i in range(self.workers):
+                thread = threading.Thread(
+                    target=self._worker_loop, name=f"webhook-worker-{i}", daemon=True,
+                )
+                thread.start()
+                self._threads.append(thread)
+            logger.info(f"Pipeline de ingestao iniciado com {self.workers} workers")
+
+    def submit(self, messages: list[InboundMessage]) -> bool:
+        self.start()
+        try:
+            self._queue.put_nowait(IngestionJob(messages=messages, enqueued_at=time.monotonic()))
+        except queue.Full:
+            self._rejected.inc()
+            logger.warning(f"Fila de ingestao cheia ({self.max_size}), payload rejeitado")
+            return False
+        self._accepted.inc()
+        return True
+
+    def _worker_loop(self) -> None:
+        while True:
+            job = self._queue.get()
+            self._wait_time.observe(time.monotonic() - job.enqueued_at)
+            try:
+                process_inbound_messages(job.messages)
+                self._processed.inc()
+            except Exception as e:
+                self._failed.inc()
+                logger.error(f"Erro ao processar payload da fila de ingestao: {e}")
+            finally:
+                self._queue.task_done()
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            "queue_depth": self._queue.qsize(),
+            "queue_max_size": self.max_size,
+            "workers": len(self._threads),
+            "accepted": self._accepted.value,
+            "rejected": self._rejected.value,
+            "processed": self._processed.value,
+            "failed": self._failed.value,
+            "enqueue_to_start_seconds": self._wait_time.snapshot(),
+        }
+
+def handle_text_batch(messages: list[InboundMessage]) -> None:
+    db = SessionLocal()
+    try:
+        message_handler.handle_text_messages(messages, db, SessionLocal)
+    finally:
+        db.close()
+
+def process_inbound_messages(messages: list[InboundMessage]) -> None:
+    text_messages = [m for m in messages if m.message_type == "text" and m.text_body]
+    if text_messages:
+        handle_text_batch(text_messages)
+
+    for message in messages:
+        if message.message_type == "text" and message.text_body:
+            continue
+        if message.message_type == "audio":
+            message_handler.handle_audio_message(message.wa_id, message.message_id)
+        else:
+            message_handler.handle_unsupported_message(
+                message.wa_id, message.message_id, message.message_type,
+            )
+
+_ingestion_pipeline: IngestionPipeline | None = None
+
+def get_ingestion_pipeline() -> IngestionPipeline:
+    global _ingestion_pipeline
+    if _ingestion_pipeline is None:
+        _ingestion_pipeline = IngestionPipeline()
+    return _ingestion_pipeline
@@ -1,16 +1,34 @@
 from __future__ import annotations
 
-import json
 import logging
+import threading
 import uuid
 from dataclasses import dataclass, field
 from pathlib import Path
-from typing import TypedDict, Literal, Annotated, Any, cast
+from typing import TypedDict, Literal, Annotated, Any, Callable, Hashable, cast
 
 from langchain_openai import ChatOpenAI
 from langchain_core.messages import HumanMessage, AIMessage, SystemMessage, BaseMessage
+from langchain_core.runnables import RunnableConfig
 from langgraph.graph import StateGraph, END
 
+from app.services.llm_clients import get_llm_clients
+from app.services.llm_limiter import LimiterTicket, estimate_request_tokens, get_llm_limiter
+from app.services.response_cache import ResponseCache, normalize_text
+from app.utils.circuit_breaker import endpoint_key, get_circuit_breaker
+from app.utils.hedging import DeadlineExceeded, call_abandoned
+from app.utils.markers import (
+    AddTagAction,
+    LeadAnalysisAction,
+    LeadDataAction,
+    NegativeSignalAction,
+    NegotiationDetectedAction,
+    ParsedOutput,
+    parse_markers,
+)
+from app.utils.message_splitter import StreamingSplitter
+from app.utils.metrics import register_provider
+from app.utils.prompt_template import PromptTemplate
 from app.utils.settings import settings
 
 logger = logging.getLogger(__name__)
@@ -42,6 +60,8 @@ class ConversationState(TypedDict):
     emoji_instructions: str
     greeting_instructions: str
     response_style_instructions: str
+    config_version: str | None
+    summary: str | None
 
 PipelineStage = Literal["onboarding", "first_contact", "negotiation"]
 
@@ -52,17 +72,6 @@ def _load_prompt(filename: str) -> str:
     logger.warning(f"Prompt file not found: {path}")
     return ""
 
-def _safe_format(template: str, **kwargs) -> str:
-    result = template
-    for key, value in kwargs.items():
-        placeholder = "{" + key + "}"
-        if value is None:
-            replacement = "Não informado"
-        else:
-            replacement = str(value)
-        result = result.replace(placeholder, replacement)
-    return result
-
 def _get_lead_field(lead: Any, field_name: str, default: str = "Não informado") -> str:
     if not lead:
         return default
@@ -71,9 +80,63 @@ def _get_lead_field(lead: Any, field_name: str, default: str = "Não informado")
         return default
     return str(value)
 
-ONBOARDING_PROMPT_TEMPLATE = _load_prompt("system_prompt_onboarding.md")
-FIRST_CONTACT_PROMPT_TEMPLATE = _load_prompt("system_prompt_first_contact.md")
-NEGOTIATION_PROMPT_TEMPLATE = _load_prompt("system_prompt_negotiation.md")
+ONBOARDING_PROMPT_TEMPLATE = PromptTemplate(_load_prompt("system_prompt_onboarding.md"))
+FIRST_CONTACT_PROMPT_TEMPLATE = PromptTemplate(_load_prompt("system_prompt_first_contact.md"))
+NEGOTIATION_PROMPT_TEMPLATE = PromptTemplate(_load_prompt("system_prompt_negotiation.md"))
+
+CONFIG_FIELDS = (
+    "tone_instructions",
+    "emoji_instructions",
+    "greeting_instructions",
+    "response_style_instructions",
+)
+
+MAX_CONFIG_TEMPLATES = 64
+
+PROMPT_LEAD_FIELDS: dict[str, tuple[str, ...]] = {
+    "onboarding": (),
+    "first_contact": ("first_name", "nome_empresa", "cargo"),
+    "negotiation": ("first_name", "nome_empresa", "cargo"),
+}
+
+SUMMARY_PREFIX = "Resumo da conversa anterior ao historico abaixo:\n"
+
+TERMINAL_ROUTES = {
+    "onboarding": ("onboarding", "human"),
+    "first_contact": ("first_contact", "human"),
+}
+
+STREAMING_STAGES = frozenset({"negotiation"})
+
+CACHED_LAYOUT_CONTEXT = "A conversa completa segue nas mensagens abaixo, da mais antiga para a mais recente."
+
+class PromptUsageStats:
+
+    def __init__(self) -> None:
+        self._nodes: dict[str, dict[str, int]] = {}
+        self._lock = threading.Lock()
+
+    def record(self, node: str, usage: dict[str, Any] | None) -> None:
+        if not usage:
+            return
+        details = usage.get("input_token_details") or {}
+        with self._lock:
+            entry = self._nodes.setdefault(
+                node, {"calls": 0, "input_tokens": 0, "cached_tokens": 0, "output_tokens": 0},
+            )
+            entry["calls"] += 1
+            entry["input_tokens"] += usage.get("input_tokens", 0) or 0
+            entry["cached_tokens"] += details.get("cache_read", 0) or 0
+            entry["output_tokens"] += usage.get("output_tokens", 0) or 0
+
+    def snapshot(self) -> dict[str, Any]:
+        with self._lock:
+            nodes = {node: dict(entry) for node, entry in self._nodes.items()}
+        for entry in nodes.values():
+            entry["cache_hit_ratio"] = (
+                round(entry["cached_tokens"] / entry["input_tokens"], 4) if entry["input_tokens"] else 0.0
+            )
+        return nodes
 
 class LangGraphService:
     def __init__(self, model: str | None = None, api_key: str | None = None, base_url: str | None = None):
@@ -83,17 +146,29 @@ class LangGraphService:
         self._llm: ChatOpenAI | None = None
         self._graph: StateGraph | None = None
         self._compiled_graph = None
+        self._compiled_async_graph = None
+        self.prompt_layout = settings.prompt_layout
+        self.usage = PromptUsageStats()
+        self.limiter = get_llm_limiter()
+        self.breaker = get_circuit_breaker(endpoint_key(self.base_url, self.model_name))
+        self._config_templates: dict[tuple[str, str], PromptTemplate] = {}
+        self._config_templates_lock = threading.Lock()
+        register_provider("llm_prompt_usage", self.usage_stats)
+        self.response_cache = ResponseCache() if settings.response_cache else None
+        if self.response_cache is not None:
+            register_provider("response_cache", self.response_cache.stats)
 
     @property
     def llm(self) -> ChatOpenAI:
         if self._llm is None:
             if not self.api_key:
                 raise ValueError("OPENAI_API_KEY não configurada")
-            self._llm = ChatOpenAI(
-                model=self.model_name,
-                api_key=self.api_key,
-                base_url=self.base_url,
+            self._llm = get_llm_clients().chat_model(
+                self.model_name,
+                self.api_key,
+                self.base_url,
                 temperature=0.7,
+                stream_usage=True,
             )
         return self._llm
 
@@ -103,12 +178,23 @@ class LangGraphService:
             self._compiled_graph = self._build_graph()
         return self._compiled_graph
 
-    def _build_graph(self):
+    @property
+    def async_graph(self):
+        if self._compiled_async_graph is None:
+            self._compiled_async_graph = self._build_graph(asynchronous=True)
+        return self._compiled_async_graph
+
+    def _build_graph(self, asynchronous: bool = False):
         workflow = StateGraph(ConversationState)
 
-        workflow.add_node("onboarding", self._onboarding_node)
-        workflow.add_node("first_contact", self._first_contact_node)
-        workflow.add_node("negotiation", self._negotiation_node)
+        if asynchronous:
+            workflow.add_node("onboarding", self._aonboarding_node)
+            workflow.add_node("first_contact", self._afirst_contact_node)
+            workflow.add_node("negotiation", self._anegotiation_node)
+        else:
+            workflow.add_node("onboarding", self._onboarding_node)
+            workflow.add_node("first_contact", self._first_contact_node)
+            workflow.add_node("negotiation", self._negotiation_node)
 
         workflow.set_conditional_entry_point(
             self._route_entry,
@@ -174,133 +260,357 @@ class LangGraphService:
             lines.append(f"{role}: {msg.content}")
         return "\n".join(lines)
 
-    def _onboarding_node(self, state: ConversationState) -> ConversationState:
+    def usage_stats(self) -> dict[str, Any]:
+        return {"layout": self.prompt_layout, "nodes": self.usage.snapshot()}
+
+    def _prompt_context(self, state: ConversationState) -> str:
+        if self.prompt_layout == "cached":
+            return CACHED_LAYOUT_CONTEXT
+        return self._format_context(state["messages"])
+
+    def _config_template(self, stage: str, template: PromptTemplate, state: ConversationState) -> PromptTemplate:
+        config_values = {name: state.get(name, "") for name in CONFIG_FIELDS}
+        version = state.get("config_version")
+        if not version:
+            return template.partial(**config_values)
+        key = (stage, version)
+        cached = self._config_templates.get(key)
+        if cached is not None:
+            return cached
+        compiled = template.partial(**config_values)
+        with self._config_templates_lock:
+            if len(self._config_templates) >= MAX_CONFIG_TEMPLATES:
+                self._config_templates.clear()
+            self._config_templates[key] = compiled
+        return compiled
+
+    def _history_messages(self, state: ConversationState) -> list[BaseMessage]:
+        summary = state.get("summary")
+        if not summary:
+            return state["messages"]
+        return [SystemMessage(content=SUMMARY_PREFIX + summary), *state["messages"]]
+
+    def _lead_slice(self, stage: str, state: ConversationState) -> tuple[str | None, ...]:
+        lead = state.get("lead") or {}
+        values = []
+        for name in PROMPT_LEAD_FIELDS.get(stage, ()):
+            value = state.get("first_name") if name == "first_name" else None
+            values.append(value or lead.get(name) or None)
+        return tuple(values)
+
+    def _response_cache_key(self, stage: str, state: ConversationState) -> tuple[Hashable, ...] | None:
+        if self.response_cache is None:
+            return None
+        messages = state["messages"]
+        lead_slice = self._lead_slice(stage, state)
+        if (
+            any(value is not None for value in lead_slice)
+            or not state.get("config_version")
+            or state.get("summary")
+            or len(messages) != 1
+            or not isinstance(messages[0], HumanMessage)
+        ):
+            self.response_cache.bypass(stage)
+            return None
+        text = normalize_text(str(messages[0].content))
+        if not text:
+            self.response_cache.bypass(stage)
+            return None
+        return (stage, self.prompt_layout, state["config_version"], lead_slice, text)
+
+    def _chunk_sink(
+        self, config: RunnableConfig | None, held: list[str] | None,
+    ) -> Callable[[str], None] | None:
+        on_chunk = ((config or {}).get("configurable") or {}).get("on_chunk")
+        if on_chunk is None:
+            return None
+        return held.append if held is not None else on_chunk
+
+    def _release_held(self, held: list[str], config: RunnableConfig | None) -> None:
+        on_chunk = ((config or {}).get("configurable") or {}).get("on_chunk")
+        if on_chunk is None:
+            return
+        for chunk in held:
+            on_chunk(chunk)
+
+    def _replay_cached(self, response_text: str, config: RunnableConfig | None, held: list[str] | None) -> None:
+        sink = self._chunk_sink(config, held)
+        if sink is None:
+            return
+        configurable = (config or {}).get("configurable") or {}
+        splitter = StreamingSplitter(max_length=configurable.get("max_chunk_length", 300))
+        for chunk in [*splitter.feed(response_text), *splitter.finish()]:
+            sink(chunk)
+
+    def _generate(
+        self,
+        node: str,
+        messages: list[BaseMessage],
+        config: RunnableConfig | None,
+        cache_key: tuple[Hashable, ...] | None = None,
+        held: list[str] | None = None,
+    ) -> str:
+        if cache_key is not None:
+            cached = self.response_cache.get(node, cache_key)
+            if cached is not None:
+                self._replay_cached(cached, config, held)
+                return cached
+        estimated_tokens = estimate_request_tokens(str(m.content) for m in messages)
+        with self.breaker.guard(), self.limiter.slot(node, estimated_tokens) as ticket:
+            response_text = self._call_llm(node, messages, config, ticket, held)
+        if cache_key is not None:
+            self.response_cache.put(node, cache_key, response_text)
+        return response_text
+
+    async def _agenerate(
+        self,
+        node: str,
+        messages: list[BaseMessage],
+        config: RunnableConfig | None,
+        cache_key: tuple[Hashable, ...] | None = None,
+        held: list[str] | None = None,
+    ) -> str:
+        if cache_key is not None:
+            cached = self.response_cache.get(node, cache_key)
+            if cached is not None:
+                self._replay_cached(cached, config, held)
+                return cached
+        estimated_tokens = estimate_request_tokens(str(m.content) for m in messages)
+        with self.breaker.guard():
+            async with self.limiter.aslot(node, estimated_tokens) as ticket:
+                response_text = await self._acall_llm(node, messages, config, ticket, held)
+        if cache_key is not None:
+            self.response_cache.put(node, cache_key, response_text)
+        return response_text
+
+    def _record_usage(self, node: str, usage: dict[str, Any] | None, ticket: LimiterTicket) -> None:
+        self.usage.record(node, usage)
+        if usage:
+            ticket.used_tokens = usage.get("total_tokens")
+
+    def _call_llm(
+        self,
+        node: str,
+        messages: list[BaseMessage],
+        config: RunnableConfig | None,
+        ticket: LimiterTicket,
+        held: list[str] | None = None,
+    ) -> str:
+        configurable = (config or {}).get("configurable") or {}
+        on_chunk = self._chunk_sink(config, held)
+        if on_chunk is None:
+            response = self.llm.invoke(messages)
+            self._record_usage(node, response.usage_metadata, ticket)
+            return str(response.content)
+
+        splitter = StreamingSplitter(max_length=configurable.get("max_chunk_length", 300))
+        parts: list[str] = []
+        for piece in self.llm.stream(messages):
+            if call_abandoned():
+                raise DeadlineExceeded(f"Geracao de {node} abandonada")
+            if piece.usage_metadata:
+                self._record_usage(node, piece.usage_metadata, ticket)
+            delta = str(piece.content)
+            parts.append(delta)
+            for chunk in splitter.feed(delta):
+                on_chunk(chunk)
+        for chunk in splitter.finish():
+            on_chunk(chunk)
+        return "".join(parts)
+
+    async def _acall_llm(
+        self,
+        node: str,
+        messages: list[BaseMessage],
+        config: RunnableConfig | None,
+        ticket: LimiterTicket,
+        held: list[str] | None = None,
+    ) -> str:
+        configurable = (config or {}).get("configurable") or {}
+        on_chunk = self._chunk_sink(config, held)
+        if on_chunk is None:
+            response = await self.llm.ainvoke(messages)
+            self._record_usage(node, response.usage_metadata, ticket)
+            return str(response.content)
+
+        splitter = StreamingSplitter(max_length=configurable.get("max_chunk_length", 300))
+        parts: list[str] = []
+        async for piece in self.llm.astream(messages):
+            if piece.usage_metadata:
+                self._record_usage(node, piece.usage_metadata, ticket)
+            delta = str(piece.content)
+            parts.append(delta)
+            for chunk in splitter.feed(delta):
+                on_chunk(chunk)
+        for chunk in splitter.finish():
+            on_chunk(chunk)
+        return "".join(parts)
+
+    def _onboarding_messages(self, state: ConversationState) -> list[BaseMessage]:
+        template = self._config_template("onboarding", ONBOARDING_PROMPT_TEMPLATE, state)
+        prompt = template.render(context=self._prompt_context(state))
+        return [SystemMessage(content=prompt), *self._history_messages(state)]
+
+    def _apply_onboarding_response(self, state: ConversationState, response_text: str) -> ConversationState:
+        parsed = parse_markers(response_text)
+        new_state = dict(state)
+        new_state["response"] = parsed.text
+
+        lead_data = parsed.first(LeadDataAction)
+        if lead_data:
+            new_state["lead"] = lead_data.data
+            new_state["should_create_lead"] = True
+            new_state["first_name"] = lead_data.data.get("first_name", state.get("first_name"))
+
+        new_state = self._apply_markers(new_state, parsed)
+        return cast(ConversationState, new_state)
+
+    def _onboarding_node(self, state: ConversationState, config: RunnableConfig) -> ConversationState:
         logger.info("Entrando no onboarding_node")
         try:
-            context = self._format_context(state["messages"])
-            prompt = _safe_format(
-                ONBOARDING_PROMPT_TEMPLATE,
-                context=context,
-                tone_instructions=state.get("tone_instructions", ""),
-                emoji_instructions=state.get("emoji_instructions", ""),
-                greeting_instructions=state.get("greeting_instructions", ""),
-                response_style_instructions=state.get("response_style_instructions", ""),
+            held: list[str] = []
+            response_text = self._generate(
+                "onboarding", self._onboarding_messages(state), config, self._response_cache_key("onboarding", state), held,
             )
-
-            messages = [SystemMessage(content=prompt), *state["messages"]]
-            response = self.llm.invoke(messages)
-            response_text = str(response.content)
-
-            new_state = dict(state)
-            new_state["response"] = response_text
-
-            if "[LEAD_DATA]" in response_text and "[/LEAD_DATA]" in response_text:
-                try:
-                    start = response_text.index("[LEAD_DATA]") + len("[LEAD_DATA]")
-                    end = response_text.index("[/LEAD_DATA]")
-                    lead_json = response_text[start:end].strip()
-                    lead_data = json.loads(lead_json)
-
-                    new_state["lead"] = lead_data
-                    new_state["should_create_lead"] = True
-                    new_state["first_name"] = lead_data.get("first_name", state.get("first_name"))
-
-                    full_marker = f"[LEAD_DATA]{lead_json}[/LEAD_DATA]"
-                    response_text = response_text.replace(full_marker, "").strip()
-                    new_state["response"] = response_text
-                except (json.JSONDecodeError, ValueError) as e:
-                    logger.warning(f"Erro ao parsear LEAD_DATA: {e}")
-
-            new_state = self._check_negative_signal(new_state, response_text)
-            return cast(ConversationState, new_state)
+            new_state = self._apply_onboarding_response(state, response_text)
+            if self._route_after_onboarding(new_state) in TERMINAL_ROUTES["onboarding"]:
+                self._release_held(held, config)
+            return new_state
         except Exception as e:
             import traceback
             logger.error(f"Erro no onboarding_node: {e}")
             logger.error(f"Traceback: {traceback.format_exc()}")
             raise
 
-    def _first_contact_node(self, state: ConversationState) -> ConversationState:
-        logger.info("Entrando no first_contact_node")
+    async def _aonboarding_node(self, state: ConversationState, config: RunnableConfig) -> ConversationState:
+        logger.info("Entrando no onboarding_node (async)")
         try:
-            lead = state.get("lead")
-            first_name = state.get("first_name") or _get_lead_field(lead, "first_name")
-            context = self._format_context(state["messages"])
-
-            prompt = _safe_format(
-                FIRST_CONTACT_PROMPT_TEMPLATE,
-                first_name=first_name,
-                nome_empresa=_get_lead_field(lead, "nome_empresa"),
-                cargo=_get_lead_field(lead, "cargo"),
-                context=context,
-                tone_instructions=state.get("tone_instructions", ""),
-                emoji_instructions=state.get("emoji_instructions", ""),
-                response_style_instructions=state.get("response_style_instructions", ""),
+            held: list[str] = []
+            response_text = await self._agenerate(
+                "onboarding", self._onboarding_messages(state), config, self._response_cache_key("onboarding", state), held,
             )
+            new_state = self._apply_onboarding_response(state, response_text)
+            if self._route_after_onboarding(new_state) in TERMINAL_ROUTES["onboarding"]:
+                self._release_held(held, config)
+            return new_state
+        except Exception as e:
+            import traceback
+            logger.error(f"Erro no onboarding_node: {e}")
+            logger.error(f"Traceback: {traceback.format_exc()}")
+            raise
 
-            messages = [SystemMessage(content=prompt), *state["messages"]]
-            response = self.llm.invoke(messages)
-            response_text = str(response.content)
+    def _first_contact_messages(self, state: ConversationState) -> list[BaseMessage]:
+        lead = state.get("lead")
+        first_name = state.get("first_name") or _get_lead_field(lead, "first_name")
+        template = self._config_template("first_contact", FIRST_CONTACT_PROMPT_TEMPLATE, state)
 
-            new_state = dict(state)
-            new_state["response"] = response_text
+        prompt = template.render(
+            first_name=first_name,
+            nome_empresa=_get_lead_field(lead, "nome_empresa"),
+            cargo=_get_lead_field(lead, "cargo"),
+            context=self._prompt_context(state),
+        )
+        return [SystemMessage(content=prompt), *self._history_messages(state)]
+
+    def _apply_first_contact_response(self, state: ConversationState, response_text: str) -> ConversationState:
+        parsed = parse_markers(response_text)
+        new_state = dict(state)
+        new_state["response"] = parsed.text
 
-            new_state = self._extract_lead_analysis(new_state, response_text)
+        for analysis in parsed.of(LeadAnalysisAction):
+            new_state["lead_analysis"] = analysis.data
+            logger.info(f"Lead analysis: {analysis.data}")
+
+        if parsed.has(NegotiationDetectedAction):
+            new_state["pipeline_stage"] = "negotiation"
 
-            if "[NEGOTIATION_DETECTED]true[/NEGOTIATION_DETECTED]" in response_text:
-                new_state["pipeline_stage"] = "negotiation"
-                response_text = response_text.replace(
-                    "[NEGOTIATION_DETECTED]true[/NEGOTIATION_DETECTED]", ""
-                ).strip()
-                new_state["response"] = response_text
+        new_state = self._apply_markers(new_state, parsed)
+        return cast(ConversationState, new_state)
 
-            new_state = self._check_negative_signal(new_state, response_text)
-            new_state = self._extract_tags(new_state, response_text)
-            return cast(ConversationState, new_state)
+    def _first_contact_node(self, state: ConversationState, config: RunnableConfig) -> ConversationState:
+        logger.info("Entrando no first_contact_node")
+        try:
+            held: list[str] = []
+            response_text = self._generate(
+                "first_contact", self._first_contact_messages(state), config, self._response_cache_key("first_contact", state), held,
+            )
+            new_state = self._apply_first_contact_response(state, response_text)
+            if self._route_after_first_contact(new_state) in TERMINAL_ROUTES["first_contact"]:
+                self._release_held(held, config)
+            return new_state
         except Exception as e:
             import traceback
             logger.error(f"Erro no first_contact_node: {e}")
             logger.error(f"Traceback: {traceback.format_exc()}")
             raise
 
-    def _negotiation_node(self, state: ConversationState) -> ConversationState:
-        logger.info("Entrando no negotiation_node")
+    async def _afirst_contact_node(self, state: ConversationState, config: RunnableConfig) -> ConversationState:
+        logger.info("Entrando no first_contact_node (async)")
         try:
-            lead = state.get("lead")
-            first_name = state.get("first_name") or _get_lead_field(lead, "first_name")
-            context = self._format_context(state["messages"])
-
-            prompt = _safe_format(
-                NEGOTIATION_PROMPT_TEMPLATE,
-                first_name=first_name,
-                nome_empresa=_get_lead_field(lead, "nome_empresa"),
-                cargo=_get_lead_field(lead, "cargo"),
-                context=context,
-                tone_instructions=state.get("tone_instructions", ""),
-                emoji_instructions=state.get("emoji_instructions", ""),
-                response_style_instructions=state.get("response_style_instructions", ""),
+            held: list[str] = []
+            response_text = await self._agenerate(
+                "first_contact", self._first_contact_messages(state), config, self._response_cache_key("first_contact", state), held,
             )
+            new_state = self._apply_first_contact_response(state, response_text)
+            if self._route_after_first_contact(new_state) in TERMINAL_ROUTES["first_contact"]:
+                self._release_held(held, config)
+            return new_state
+        except Exception as e:
+            import traceback
+            logger.error(f"Erro no first_contact_node: {e}")
+            logger.error(f"Traceback: {traceback.format_exc()}")
+            raise
 
-            messages = [SystemMessage(content=prompt), *state["messages"]]
-            response = self.llm.invoke(messages)
+    def _negotiation_messages(self, state: ConversationState) -> list[BaseMessage]:
+        lead = state.get("lead")
+        first_name = state.get("first_name") or _get_lead_field(lead, "first_name")
+        template = self._config_template("negotiation", NEGOTIATION_PROMPT_TEMPLATE, state)
 
-            new_state = dict(state)
-            new_state["response"] = str(response.content)
-            new_state["should_human_takeover"] = True
-            new_state["pipeline_stage"] = "negotiation"
-            return cast(ConversationState, new_state)
+        prompt = template.render(
+            first_name=first_name,
+            nome_empresa=_get_lead_field(lead, "nome_empresa"),
+            cargo=_get_lead_field(lead, "cargo"),
+            context=self._prompt_context(state),
+        )
+        return [SystemMessage(content=prompt), *self._history_messages(state)]
+
+    def _apply_negotiation_response(self, state: ConversationState, response_text: str) -> ConversationState:
+        new_state = dict(state)
+        new_state["response"] = parse_markers(response_text).text
+        new_state["should_human_takeover"] = True
+        new_state["pipeline_stage"] = "negotiation"
+        return cast(ConversationState, new_state)
+
+    def _negotiation_node(self, state: ConversationState, config: RunnableConfig) -> ConversationState:
+        logger.info("Entrando no negotiation_node")
+        try:
+            response_text = self._generate(
+                "negotiation", self._negotiation_messages(state), config, self._response_cache_key("negotiation", state),
+            )
+            return self._apply_negotiation_response(state, response_text)
         except Exception as e:
             import traceback
             logger.error(f"Erro no negotiation_node: {e}")
             logger.error(f"Traceback: {traceback.format_exc()}")
             raise
 
-    def _check_negative_signal(self, state: dict, response_text: str) -> dict:
-        if "[NEGATIVE_SIGNAL]true[/NEGATIVE_SIGNAL]" in response_text:
+    async def _anegotiation_node(self, state: ConversationState, config: RunnableConfig) -> ConversationState:
+        logger.info("Entrando no negotiation_node (async)")
+        try:
+            response_text = await self._agenerate(
+                "negotiation", self._negotiation_messages(state), config, self._response_cache_key("negotiation", state),
+            )
+            return self._apply_negotiation_response(state, response_text)
+        except Exception as e:
+            import traceback
+            logger.error(f"Erro no negotiation_node: {e}")
+            logger.error(f"Traceback: {traceback.format_exc()}")
+            raise
+
+    def _apply_markers(self, state: dict, parsed: ParsedOutput) -> dict:
+        if parsed.has(NegativeSignalAction):
             state["negative_score_count"] = state.get("negative_score_count", 0) + 1
             state["current_score"] = max(0, state.get("current_score", 50) - 20)
-            state["response"] = response_text.replace(
-                "[NEGATIVE_SIGNAL]true[/NEGATIVE_SIGNAL]", ""
-            ).strip()
 
             if state["current_score"] < 30 and state.get("user_message_count", 0) >= 2:
                 state["should_human_takeover"] = True
@@ -310,61 +620,33 @@ class LangGraphService:
                     tags.append("frio")
                     lead["tags"] = tags
                     state["lead"] = lead
-        return state
 
-    def _extract_tags(self, state: dict, response_text: str) -> dict:
-        import re
-        tag_pattern = r'\[ADD_TAG\]\s*(\{.*?\})\s*\[/ADD_TAG\]'
-        matches = re.findall(tag_pattern, response_text, re.DOTALL)
-
-        for match in matches:
-            try:
-                data = json.loads(match)
-                tag = data.get("tag")
-                if tag:
-                    lead = state.get("lead") or {}
-                    tags = lead.get("tags", [])
-                    if tag not in tags and len(tags) < 5:
-                        tags.append(tag)
-                        lead["tags"] = tags
-                        state["lead"] = lead
-            except json.JSONDecodeError:
-                pass
-
-        state["response"] = re.sub(tag_pattern, "", state.get("response", "")).strip()
+        for action in parsed.of(AddTagAction):
+            lead = state.get("lead") or {}
+            tags = lead.get("tags", [])
+            if action.tag not in tags and len(tags) < 5:
+                tags.append(action.tag)
+                lead["tags"] = tags
+                state["lead"] = lead
         return state
 
-    def _extract_lead_analysis(self, state: dict, response_text: str) -> dict:
-        import re
-        pattern = r'\[LEAD_ANALYSIS\]\s*(\{.*?\})\s*\[/LEAD_ANALYSIS\]'
-        matches = re.findall(pattern, response_text, re.DOTALL)
-
-        for match in matches:
-            try:
-                analysis = json.loads(match)
-                state["lead_analysis"] = analysis
-                logger.info(f"Lead analysis: {analysis}")
-            except json.JSONDecodeError:
-                pass
-
-        state["response"] = re.sub(pattern, "", state.get("response", "")).strip()
-        return state
-
-    def process_message(
+    def _initial_state(
         self,
         messages: list[dict],
         profile_id: str,
         conversation_id: str,
-        lead_id: str | None = None,
-        lead_info: dict | None = None,
-        pipeline_stage: str = "onboarding",
-        user_message_count: int = 1,
-        first_name: str | None = None,
-        tone_instructions: str = "",
-        emoji_instructions: str = "",
-        greeting_instructions: str = "",
-        response_style_instructions: str = "",
-    ) -> ConversationState:
+        lead_id: str | None,
+        lead_info: dict | None,
+        pipeline_stage: str,
+        user_message_count: int,
+        first_name: str | None,
+        tone_instructions: str,
+        emoji_instructions: str,
+        greeting_instructions: str,
+        response_style_instructions: str,
+        config_version: str | None,
+        summary: str | None,
+    ) -> dict[str, Any]:
         langchain_messages = []
         for msg in messages:
             if msg["role"] == "user":
@@ -372,7 +654,7 @@ class LangGraphService:
             else:
                 langchain_messages.append(AIMessage(content=msg["content"]))
 
-        initial_state: dict[str, Any] = {
+        return {
             "messages": langchain_messages,
             "profile_id": profile_id,
             "conversation_id": conversation_id,
@@ -391,23 +673,109 @@ class LangGraphService:
             "emoji_instructions": emoji_instructions,
             "greeting_instructions": greeting_instructions,
             "response_style_instructions": response_style_instructions,
+            "config_version": config_version,
+            "summary": summary,
         }
 
+    def _stream_config(
+        self, on_chunk: Callable[[str], None] | None, max_chunk_length: int,
+    ) -> RunnableConfig | None:
+        if on_chunk is None:
+            return None
+        return {"configurable": {"on_chunk": on_chunk, "max_chunk_length": max_chunk_length}}
+
+    def _error_state(self, initial_state: dict[str, Any], e: Exception) -> ConversationState:
+        import traceback
+        logger.error(f"Erro ao processar mensagem no LangGraph: {e}")
+        logger.error(f"Traceback completo: {traceback.format_exc()}")
+        initial_state["response"] = "Desculpe, ocorreu um erro. Pode repetir?"
+        return cast(ConversationState, initial_state)
+
+    def process_message(
+        self,
+        messages: list[dict],
+        profile_id: str,
+        conversation_id: str,
+        lead_id: str | None = None,
+        lead_info: dict | None = None,
+        pipeline_stage: str = "onboarding",
+        user_message_count: int = 1,
+        first_name: str | None = None,
+        tone_instructions: str = "",
+        emoji_instructions: str = "",
+        greeting_instructions: str = "",
+        response_style_instructions: str = "",
+        config_version: str | None = None,
+        summary: str | None = None,
+        on_chunk: Callable[[str], None] | None = None,
+        max_chunk_length: int = 300,
+        raise_errors: bool = False,
+    ) -> ConversationState:
+        initial_state = self._initial_state(
+            messages, profile_id, conversation_id, lead_id, lead_info, pipeline_stage,
+            user_message_count, first_name, tone_instructions, emoji_instructions,
+            greeting_instructions, response_style_instructions, config_version, summary,
+        )
+
         try:
             logger.info(
                 f"Iniciando LangGraph para conversation {conversation_id}, stage: {pipeline_stage}"
             )
-            result = self.graph.invoke(cast(ConversationState, initial_state))
+            result = self.graph.invoke(
+                cast(ConversationState, initial_state),
+                config=self._stream_config(on_chunk, max_chunk_length),
+            )
             logger.info(
                 f"LangGraph concluído com sucesso. Response: {result.get('response', '')[:100]}..."
             )
             return cast(ConversationState, result)
         except Exception as e:
-            import traceback
-            logger.error(f"Erro ao processar mensagem no LangGraph: {e}")
-            logger.error(f"Traceback completo: {traceback.format_exc()}")
-            initial_state["response"] = "Desculpe, ocorreu um erro. Pode repetir?"
-            return cast(ConversationState, initial_state)
+            if raise_errors:
+                raise
+            return self._error_state(initial_state, e)
+
+    async def aprocess_message(
+        self,
+        messages: list[dict],
+        profile_id: str,
+        conversation_id: str,
+        lead_id: str | None = None,
+        lead_info: dict | None = None,
+        pipeline_stage: str = "onboarding",
+        user_message_count: int = 1,
+        first_name: str | None = None,
+        tone_instructions: str = "",
+        emoji_instructions: str = "",
+        greeting_instructions: str = "",
+        response_style_instructions: str = "",
+        config_version: str | None = None,
+        summary: str | None = None,
+        on_chunk: Callable[[str], None] | None = None,
+        max_chunk_length: int = 300,
+        raise_errors: bool = False,
+    ) -> ConversationState:
+        initial_state = self._initial_state(
+            messages, profile_id, conversation_id, lead_id, lead_info, pipeline_stage,
+            user_message_count, first_name, tone_instructions, emoji_instructions,
+            greeting_instructions, response_style_instructions, config_version, summary,
+        )
+
+        try:
+            logger.info(
+                f"Iniciando LangGraph (async) para conversation {conversation_id}, stage: {pipeline_stage}"
+            )
+            result = await self.async_graph.ainvoke(
+                cast(ConversationState, initial_state),
+                config=self._stream_config(on_chunk, max_chunk_length),
+            )
+            logger.info(
+                f"LangGraph concluído com sucesso. Response: {result.get('response', '')[:100]}..."
+            )
+            return cast(ConversationState, result)
+        except Exception as e:
+            if raise_errors:
+                raise
+            return self._error_state(initial_state, e)
 
 _langgraph_service: LangGraphService | None = None
 
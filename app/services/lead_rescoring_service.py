@@ -0,0 +1,288 @@
+from __future__ import annotations
+
+import logging
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from typing import Any, Callable
+
+from sqlalchemy.orm import Session
+
+from app.dao import lead_dao
+from app.services.lead_scoring_service import (
+    LeadScoringService,
+    build_lead_data,
+    get_lead_scoring_service,
+    status_for_score,
+)
+from app.services.websocket_manager import ws_manager
+from app.utils.db import SessionLocal
+from app.utils.metrics import Counter, register_provider
+from app.utils.settings import settings
+
+logger = logging.getLogger(__name__)
+
+MAX_TRACKED_RUNS = 20
+
+@dataclass
+class RescoreFilter:
+    status: str | None = None
+    step: str | None = None
+    created_from: datetime | None = None
+    created_to: datetime | None = None
+    limit: int | None = None
+
+@dataclass
+class RescoreRun:
+    filters: RescoreFilter
+    concurrency: int
+    id: uuid.UUID = field(default_factory=uuid.uuid4)
+    state: str = "pending"
+    total: int = 0
+    processed: int = 0
+    updated: int = 0
+    failed: int = 0
+    error: str | None = None
+    started_at: datetime | None = None
+    finished_at: datetime | None = None
+    _started: float = 0.0
+    _finished: float = 0.0
+
+    @property
+    def elapsed_seconds(self) -> float:
+        if not self._started:
+            return 0.0
+        return (self._finished or time.monotonic()) - self._started
+
+    @property
+    def throughput(self) -> float:
+        elapsed = self.elapsed_seconds
+        return self.processed / elapsed if elapsed else 0.0
+
+    def snapshot(self) -> dict[str, Any]:
+        return {
+            "id": self.id,
+            "state": self.state,
+            "concurrency": self.concurrency,
+            "total": self.total,
+            "processed": self.processed,
+            "updated": self.updated,
+            "failed": self.failed,
+            "error": self.error,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+            "elapsed_seconds": round(self.elapsed_seconds, 2),
+            "leads_per_second": round(self.throughput, 3),
+        }
+
+class LeadRescorer:
+
+    def __init__(
+        self,
+        scoring: LeadScoringService | None = None,
+        session_factory: Callable[[], Session] | None = None,
+        batch_size: int | None = None,
+    ):
+        self._scoring = scoring
+        self._session_factory = session_factory or SessionLocal
+        self.batch_size = max(1, batch_size or settings.rescore_batch_size)
+        self._runs: OrderedDict[uuid.UUID, RescoreRun] = OrderedDict()
+        self._lock = threading.Lock()
+        self._active: RescoreRun | None = None
+        self._lock_db: Session | None = None
+        self._rescored = Counter()
+        self._failed = Counter()
+        register_provider("lead_rescoring", self.stats)
+
+    @property
+    def scoring(self) -> LeadScoringService:
+        if self._scoring is None:
+            self._scoring = get_lead_scoring_service()
+        return self._scoring
+
+    def get_run(self, run_id: uuid.UUID) -> RescoreRun | None:
+        return self._runs.get(run_id)
+
+    def _register(self, filters: RescoreFilter, concurrency: int | None) -> RescoreRun:
+        run = RescoreRun(filters=filters, concurrency=max(1, concurrency or settings.rescore_concurrency))
+        with self._lock:
+            if self._active is not None:
+                raise RuntimeError(f"Rescoring {self._active.id} ainda em andamento")
+            self._active = run
+        try:
+            self._lock_db = self._acquire_db_lock()
+        except Exception:
+            with self._lock:
+                self._active = None
+            raise
+        with self._lock:
+            self._runs[run.id] = run
+            while len(self._runs) > MAX_TRACKED_RUNS:
+                self._runs.popitem(last=False)
+        return run
+
+    def _acquire_db_lock(self) -> Session:
+        db = self._session_factory()
+        try:
+            acquired = lead_dao.try_lock_rescore(db)
+        except Exception:
+            db.close()
+            raise
+        if not acquired:
+            db.close()
+            raise RuntimeError("Rescoring ainda em andamento em outro processo")
+        return db
+
+    def _release_db_lock(self) -> None:
+        db, self._lock_db = self._lock_db, None
+        if db is None:
+            return
+        try:
+            lead_dao.unlock_rescore(db)
+        except Exception as e:
+            logger.error(f"Erro ao liberar lock de rescoring: {e}")
+        finally:
+            db.close()
+
+    def start(self, filters: RescoreFilter, concurrency: int | None = None) -> RescoreRun:
+        run = self._register(filters, concurrency)
+        thread = threading.Thread(target=self._execute, args=(run, None), name=f"rescore-{run.id}", daemon=True)
+        thread.start()
+        return run
+
+    def run(
+        self,
+        filters: RescoreFilter,
+        concurrency: int | None = None,
+        on_progress: Callable[[RescoreRun], None] | None = None,
+    ) -> RescoreRun:
+        run = self._register(filters, concurrency)
+        self._execute(run, on_progress)
+        return run
+
+    def _execute(self, run: RescoreRun, on_progress: Callable[[RescoreRun], None] | None) -> None:
+        run.state = "running"
+        run.started_at = datetime.now(timezone.utc)
+        run._started = time.monotonic()
+        try:
+            lead_ids = self._select(run.filters)
+            run.total = len(lead_ids)
+            logger.info(f"Rescoring {run.id} iniciado: {run.total} leads, concorrencia {run.concurrency}")
+            self._rescore_all(run, lead_ids, on_progress)
+            run.state = "completed"
+        except Exception as e:
+            run.state = "failed"
+            run.error = str(e)
+            logger.error(f"Rescoring {run.id} interrompido: {e}")
+        finally:
+            run._finished = time.monotonic()
+            run.finished_at = datetime.now(timezone.utc)
+            self._release_db_lock()
+            with self._lock:
+                self._active = None
+            logger.info(
+                f"Rescoring {run.id} finalizado: {run.updated}/{run.total} atualizados, "
+                f"{run.failed} falhas, {run.throughput:.2f} leads/s"
+            )
+            ws_manager.broadcast_threadsafe("leads_rescored", {
+                "run_id": str(run.id),
+                "state": run.state,
+                "updated": run.updated,
+                "failed": run.failed,
+            })
+
+    def _select(self, filters: RescoreFilter) -> list[uuid.UUID]:
+        db = self._session_factory()
+        try:
+            return lead_dao.get_ids_for_rescore(
+                db, filters.status, filters.step, filters.created_from, filters.created_to, filters.limit,
+            )
+        finally:
+            db.close()
+
+    def _rescore_all(
+        self,
+        run: RescoreRun,
+        lead_ids: list[uuid.UUID],
+        on_progress: Callable[[RescoreRun], None] | None,
+    ) -> None:
+        pending_updates: list[dict] = []
+        remaining = iter(lead_ids)
+        in_flight: set[Future] = set()
+        with ThreadPoolExecutor(max_workers=run.concurrency, thread_name_prefix="rescore") as executor:
+            while True:
+                while len(in_flight) < run.concurrency:
+                    lead_id = next(remaining, None)
+                    if lead_id is None:
+                        break
+                    in_flight.add(executor.submit(self._score_lead, lead_id))
+                if not in_flight:
+                    break
+
+                done, in_flight = wait(in_flight, return_when=FIRST_COMPLETED)
+                for future in done:
+                    run.processed += 1
+                    try:
+                        update = future.result()
+                    except Exception as e:
+                        run.failed += 1
+                        self._failed.inc()
+                        logger.warning(f"Rescoring {run.id}: falha ao recalcular lead: {e}")
+                        continue
+                    if update is not None:
+                        pending_updates.append(update)
+
+                if len(pending_updates) >= self.batch_size:
+                    self._flush(run, pending_updates)
+                    pending_updates = []
+                if on_progress:
+                    on_progress(run)
+
+        self._flush(run, pending_updates)
+        if on_progress:
+            on_progress(run)
+
+    def _score_lead(self, lead_id: uuid.UUID) -> dict | None:
+        db = self._session_factory()
+        try:
+            lead = lead_dao.get_by_id(db, lead_id)
+            if not lead:
+                return None
+            score_result = self.scoring.calculate_score(
+                db, lead.conversation_id, build_lead_data(lead), max_retries=1, raise_errors=True,
+            )
+            score = score_result.get("score", 50)
+            return {"id": lead.id, "score": score, "status": status_for_score(score)}
+        finally:
+            db.close()
+
+    def _flush(self, run: RescoreRun, updates: list[dict]) -> None:
+        if not updates:
+            return
+        db = self._session_factory()
+        try:
+            count = lead_dao.update_leads(db, updates)
+        finally:
+            db.close()
+        run.updated += count
+        self._rescored.inc(count)
+
+    def stats(self) -> dict[str, Any]:
+        active = self._active
+        return {
+            "rescored": self._rescored.value,
+            "failed": self._failed.value,
+            "active_run": active.snapshot() if active else None,
+        }
+
+_lead_rescorer: LeadRescorer | None = None
+
+def get_lead_rescorer() -> LeadRescorer:
+    global _lead_rescorer
+    if _lead_rescorer is None:
+        _lead_rescorer = LeadRescorer()
+    return _lead_rescorer
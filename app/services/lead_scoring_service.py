@@ -10,6 +10,9 @@ from openai import OpenAI
 from sqlalchemy.orm import Session
 
 from app.dao import message_dao
+from app.entities.lead_entity import Lead, LeadStatus
+from app.services.llm_clients import get_llm_clients
+from app.services.llm_limiter import estimate_request_tokens, get_llm_limiter
 from app.utils.settings import settings, load_scoring_prompt
 
 logger = logging.getLogger(__name__)
@@ -26,6 +29,23 @@ class LeadData:
     tags: list[str]
     notes: str | None
 
+def build_lead_data(lead: Lead) -> LeadData:
+    return LeadData(
+        nome_cliente=lead.nome_cliente,
+        nome_empresa=lead.nome_empresa,
+        cargo=lead.cargo,
+        telefone=lead.telefone,
+        tags=lead.tags or [],
+        notes=lead.notes,
+    )
+
+def status_for_score(score: int) -> str:
+    if score >= 70:
+        return LeadStatus.QUENTE
+    if score >= 40:
+        return LeadStatus.MORNO
+    return LeadStatus.FRIO
+
 class LeadScoringService:
 
     def __init__(
@@ -46,10 +66,7 @@ class LeadScoringService:
             if not self.api_key:
                 raise LeadScoringError("API key não configurada")
             
-            self._client = OpenAI(
-                api_key=self.api_key,
-                base_url=self.base_url,
-            )
+            self._client = get_llm_clients().openai(self.api_key, self.base_url)
         return self._client
 
     def _build_context(
@@ -106,7 +123,10 @@ class LeadScoringService:
         db: Session,
         conversation_id: uuid.UUID,
         lead_data: LeadData,
+        max_retries: int | None = None,
+        raise_errors: bool = False,
     ) -> dict:
+        attempts = max_retries or self.max_retries
         messages = message_dao.get_messages_by_conversation_id(db, conversation_id, limit=50)
         conversation_history = [
             {"role": msg.role, "content": msg.content}
@@ -122,18 +142,21 @@ class LeadScoringService:
         last_error = None
         backoff_times = [1, 2, 4]
         
-        for attempt in range(self.max_retries):
+        for attempt in range(attempts):
             try:
                 client = self._get_client()
                 scoring_prompt = load_scoring_prompt()
                 
-                response = client.chat.completions.create(
-                    model=self.model,
-                    messages=[
-                        {"role": "system", "content": scoring_prompt},
-                        {"role": "user", "content": context},
-                    ],
-                )
+                estimated_tokens = estimate_request_tokens((scoring_prompt, context))
+                with get_llm_limiter().slot("scoring", estimated_tokens) as ticket:
+                    response = client.chat.completions.create(
+                        model=self.model,
+                        messages=[
+                            {"role": "system", "content": scoring_prompt},
+                            {"role": "user", "content": context},
+                        ],
+                    )
+                    ticket.used_tokens = response.usage.total_tokens if response.usage else None
                 
                 response_text = response.choices[0].message.content or ""
                 result = self._parse_score_response(response_text)
@@ -143,12 +166,14 @@ class LeadScoringService:
                 
             except Exception as e:
                 last_error = e
-                logger.warning(f"Tentativa {attempt + 1}/{self.max_retries} de scoring falhou: {e}")
+                logger.warning(f"Tentativa {attempt + 1}/{attempts} de scoring falhou: {e}")
                 
-                if attempt < self.max_retries - 1:
+                if attempt < attempts - 1:
                     time.sleep(backoff_times[attempt])
         
         logger.error(f"Todas as tentativas de scoring falharam: {last_error}")
+        if raise_errors:
+            raise LeadScoringError(f"Erro no cálculo de score: {last_error}") from last_error
         return {
             "score": 50,
             "breakdown": {},
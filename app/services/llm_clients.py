@@ -0,0 +1,147 @@
+from __future__ import annotations
+
+import logging
+import threading
+from typing import Any
+
+import httpx
+from langchain_openai import ChatOpenAI
+from openai import OpenAI
+
+from app.utils.metrics import Counter, register_provider
+from app.utils.settings import settings
+
+try:
+    import h2  # noqa: F401
+
+    _HTTP2_AVAILABLE = True
+except ImportError:
+    _HTTP2_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
+
+def _pool_stats(client: httpx.Client | httpx.AsyncClient | None, max_connections: int) -> dict[str, Any]:
+    pool = getattr(getattr(client, "_transport", None), "_pool", None)
+    connections = list(getattr(pool, "connections", None) or [])
+    idle = sum(1 for connection in connections if connection.is_idle())
+    active = len(connections) - idle
+    return {
+        "connections": len(connections),
+        "active": active,
+        "idle": idle,
+        "utilization": round(active / max_connections, 4) if max_connections else 0.0,
+    }
+
+class LLMClientRegistry:
+
+    def __init__(
+        self,
+        max_connections: int | None = None,
+        max_keepalive: int | None = None,
+        keepalive_expiry: float | None = None,
+        http2: bool | None = None,
+    ):
+        self.max_connections = max_connections or settings.llm_pool_max_connections
+        self.max_keepalive = max_keepalive or settings.llm_pool_max_keepalive
+        self.keepalive_expiry = keepalive_expiry or settings.llm_keepalive_expiry
+        wants_http2 = settings.llm_http2 if http2 is None else http2
+        if wants_http2 and not _HTTP2_AVAILABLE:
+            logger.info("LLM_HTTP2 ativo mas pacote h2 nao instalado, usando HTTP/1.1")
+        self.http2 = wants_http2 and _HTTP2_AVAILABLE
+        self.timeout = httpx.Timeout(
+            settings.llm_read_timeout,
+            connect=settings.llm_connect_timeout,
+            pool=settings.llm_pool_timeout,
+        )
+        self._http_client: httpx.Client | None = None
+        self._http_async_client: httpx.AsyncClient | None = None
+        self._openai_clients: dict[tuple[str, str | None], OpenAI] = {}
+        self._lock = threading.Lock()
+        self._requests = Counter()
+        register_provider("llm_http_pool", self.stats)
+
+    def _limits(self) -> httpx.Limits:
+        return httpx.Limits(
+            max_connections=self.max_connections,
+            max_keepalive_connections=self.max_keepalive,
+            keepalive_expiry=self.keepalive_expiry,
+        )
+
+    def _on_request(self, request: httpx.Request) -> None:
+        self._requests.inc()
+
+    async def _aon_request(self, request: httpx.Request) -> None:
+        self._requests.inc()
+
+    @property
+    def http_client(self) -> httpx.Client:
+        if self._http_client is None:
+            with self._lock:
+                if self._http_client is None:
+                    self._http_client = httpx.Client(
+                        limits=self._limits(),
+                        timeout=self.timeout,
+                        http2=self.http2,
+                        event_hooks={"request": [self._on_request]},
+                    )
+        return self._http_client
+
+    @property
+    def http_async_client(self) -> httpx.AsyncClient:
+        if self._http_async_client is None:
+            with self._lock:
+                if self._http_async_client is None:
+                    self._http_async_client = httpx.AsyncClient(
+                        limits=self._limits(),
+                        timeout=self.timeout,
+                        http2=self.http2,
+                        event_hooks={"request": [self._aon_request]},
+                    )
+        return self._http_async_client
+
+    def openai(self, api_key: str, base_url: str | None = None) -> OpenAI:
+        key = (api_key, base_url)
+        client = self._openai_clients.get(key)
+        if client is None:
+            http_client = self.http_client
+            with self._lock:
+                client = self._openai_clients.get(key)
+                if client is None:
+                    client = OpenAI(
+                        api_key=api_key,
+                        base_url=base_url,
+                        http_client=http_client,
+                        timeout=self.timeout,
+                    )
+                    self._openai_clients[key] = client
+        return client
+
+    def chat_model(self, model: str, api_key: str, base_url: str | None = None, **kwargs: Any) -> ChatOpenAI:
+        return ChatOpenAI(
+            model=model,
+            api_key=api_key,
+            base_url=base_url,
+            timeout=self.timeout,
+            http_client=self.http_client,
+            http_async_client=self.http_async_client,
+            **kwargs,
+        )
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            "http2": self.http2,
+            "max_connections": self.max_connections,
+            "max_keepalive": self.max_keepalive,
+            "requests": self._requests.value,
+            "openai_clients": len(self._openai_clients),
+            "sync_pool": _pool_stats(self._http_client, self.max_connections),
+            "async_pool": _pool_stats(self._http_async_client, self.max_connections),
+        }
+
+_llm_clients: LLMClientRegistry | None = None
+
+def get_llm_clients() -> LLMClientRegistry:
+    global _llm_clients
+    if _llm_clients is None:
+        _llm_clients = LLMClientRegistry()
+    return _llm_clients
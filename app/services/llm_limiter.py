@@ -0,0 +1,225 @@
+from __future__ import annotations
+
+import asyncio
+import heapq
+import itertools
+import threading
+import time
+from contextlib import asynccontextmanager, contextmanager
+from dataclasses import dataclass
+from typing import Any, AsyncIterator, Iterable, Iterator
+
+from app.utils.hedging import DeadlineExceeded, on_abandon
+from app.utils.metrics import Counter, LatencyStats, register_provider
+from app.utils.settings import settings
+from app.utils.token_budget import estimate_tokens
+
+PRIORITIES = ("negotiation", "first_contact", "onboarding", "scoring", "summary")
+
+def estimate_request_tokens(contents: Iterable[str]) -> int:
+    return sum(estimate_tokens(content) for content in contents) + settings.llm_expected_output_tokens
+
+def _wake(waker: asyncio.Future[None]) -> None:
+    if not waker.done():
+        waker.set_result(None)
+
+class _TokenBucket:
+
+    def __init__(self, per_minute: int):
+        self.capacity = float(max(0, per_minute))
+        self.rate = self.capacity / 60.0
+        self.level = self.capacity
+        self.updated = time.monotonic()
+
+    def _refill(self, now: float) -> None:
+        self.level = min(self.capacity, self.level + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self, amount: float, now: float) -> float:
+        if not self.capacity:
+            return 0.0
+        self._refill(now)
+        amount = min(amount, self.capacity)
+        return 0.0 if self.level >= amount else (amount - self.level) / self.rate
+
+    def take(self, amount: float) -> None:
+        if self.capacity:
+            self.level -= min(amount, self.capacity)
+
+    def adjust(self, amount: float) -> None:
+        if self.capacity:
+            self.level = min(self.capacity, self.level + amount)
+
+@dataclass
+class LimiterTicket:
+    priority: str
+    estimated_tokens: int
+    used_tokens: int | None = None
+    released: bool = False
+
+class LLMLimiter:
+
+    def __init__(
+        self,
+        max_concurrency: int | None = None,
+        requests_per_minute: int | None = None,
+        tokens_per_minute: int | None = None,
+    ):
+        self.max_concurrency = max(1, max_concurrency or settings.llm_max_concurrency)
+        self._requests = _TokenBucket(
+            settings.llm_requests_per_minute if requests_per_minute is None else requests_per_minute
+        )
+        self._tokens = _TokenBucket(
+            settings.llm_tokens_per_minute if tokens_per_minute is None else tokens_per_minute
+        )
+        self._cond = threading.Condition()
+        self._waiters: list[tuple[int, int]] = []
+        self._async_wakers: list[tuple[asyncio.AbstractEventLoop, asyncio.Future[None]]] = []
+        self._sequence = itertools.count()
+        self._in_flight = 0
+        self._admitted = {priority: Counter() for priority in PRIORITIES}
+        self._queue_wait = {priority: LatencyStats() for priority in PRIORITIES}
+        register_provider("llm_limiter", self.stats)
+
+    def _rank(self, priority: str) -> int:
+        return PRIORITIES.index(priority) if priority in PRIORITIES else len(PRIORITIES)
+
+    def _admission_delay(self, entry: tuple[int, int], estimated_tokens: int) -> float | None:
+        if self._waiters[0] != entry or self._in_flight >= self.max_concurrency:
+            return None
+        now = time.monotonic()
+        return max(
+            self._requests.wait_time(1, now),
+            self._tokens.wait_time(estimated_tokens, now),
+        )
+
+    def _withdraw(self, entry: tuple[int, int]) -> None:
+        self._waiters.remove(entry)
+        heapq.heapify(self._waiters)
+
+    def _notify(self) -> None:
+        self._cond.notify_all()
+        wakers, self._async_wakers = self._async_wakers, []
+        for loop, waker in wakers:
+            try:
+                loop.call_soon_threadsafe(_wake, waker)
+            except RuntimeError:
+                pass
+
+    def _admit(self, entry: tuple[int, int], estimated_tokens: int) -> None:
+        self._withdraw(entry)
+        self._requests.take(1)
+        self._tokens.take(estimated_tokens)
+        self._in_flight += 1
+        self._notify()
+
+    def _ticket(self, priority: str, estimated_tokens: int, enqueued_at: float) -> LimiterTicket:
+        if priority in self._queue_wait:
+            self._queue_wait[priority].observe(time.monotonic() - enqueued_at)
+            self._admitted[priority].inc()
+        return LimiterTicket(priority=priority, estimated_tokens=estimated_tokens)
+
+    def acquire(self, priority: str, estimated_tokens: int) -> LimiterTicket:
+        entry = (self._rank(priority), next(self._sequence))
+        enqueued_at = time.monotonic()
+        with self._cond:
+            heapq.heappush(self._waiters, entry)
+            try:
+                while True:
+                    timeout = self._admission_delay(entry, estimated_tokens)
+                    if timeout is not None and timeout <= 0:
+                        break
+                    self._cond.wait(timeout)
+            except BaseException:
+                self._withdraw(entry)
+                self._notify()
+                raise
+            self._admit(entry, estimated_tokens)
+        return self._ticket(priority, estimated_tokens, enqueued_at)
+
+    async def aacquire(self, priority: str, estimated_tokens: int) -> LimiterTicket:
+        entry = (self._rank(priority), next(self._sequence))
+        enqueued_at = time.monotonic()
+        loop = asyncio.get_running_loop()
+        with self._cond:
+            heapq.heappush(self._waiters, entry)
+        try:
+            while True:
+                with self._cond:
+                    timeout = self._admission_delay(entry, estimated_tokens)
+                    if timeout is not None and timeout <= 0:
+                        self._admit(entry, estimated_tokens)
+                        break
+                    waker = loop.create_future()
+                    self._async_wakers.append((loop, waker))
+                await asyncio.wait((waker,), timeout=timeout)
+        except BaseException:
+            with self._cond:
+                if entry in self._waiters:
+                    self._withdraw(entry)
+                    self._notify()
+            raise
+        return self._ticket(priority, estimated_tokens, enqueued_at)
+
+    def release(self, ticket: LimiterTicket) -> None:
+        with self._cond:
+            if ticket.released:
+                return
+            ticket.released = True
+            self._in_flight -= 1
+            if ticket.used_tokens is not None:
+                self._tokens.adjust(ticket.estimated_tokens - ticket.used_tokens)
+            self._notify()
+
+    @contextmanager
+    def slot(self, priority: str, estimated_tokens: int) -> Iterator[LimiterTicket]:
+        ticket = self.acquire(priority, estimated_tokens)
+        cancel = on_abandon(lambda: self.release(ticket))
+        try:
+            if ticket.released:
+                raise DeadlineExceeded("Chamada abandonada antes de iniciar")
+            yield ticket
+        finally:
+            cancel()
+            self.release(ticket)
+
+    @asynccontextmanager
+    async def aslot(self, priority: str, estimated_tokens: int) -> AsyncIterator[LimiterTicket]:
+        ticket = await self.aacquire(priority, estimated_tokens)
+        try:
+            yield ticket
+        finally:
+            self.release(ticket)
+
+    def stats(self) -> dict[str, Any]:
+        with self._cond:
+            now = time.monotonic()
+            self._requests.wait_time(0, now)
+            self._tokens.wait_time(0, now)
+            queued = {priority: 0 for priority in PRIORITIES}
+            for rank, _ in self._waiters:
+                if rank < len(PRIORITIES):
+                    queued[PRIORITIES[rank]] += 1
+            snapshot = {
+                "in_flight": self._in_flight,
+                "max_concurrency": self.max_concurrency,
+                "requests_available": round(self._requests.level, 2) if self._requests.capacity else None,
+                "tokens_available": round(self._tokens.level, 2) if self._tokens.capacity else None,
+            }
+        snapshot["priorities"] = {
+            priority: {
+                "queued": queued[priority],
+                "admitted": self._admitted[priority].value,
+                "queue_wait_seconds": self._queue_wait[priority].snapshot(),
+            }
+            for priority in PRIORITIES
+        }
+        return snapshot
+
+_llm_limiter: LLMLimiter | None = None
+
+def get_llm_limiter() -> LLMLimiter:
+    global _llm_limiter
+    if _llm_limiter is None:
+        _llm_limiter = LLMLimiter()
+    return _llm_limiter
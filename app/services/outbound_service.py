@@ -0,0 +1,209 @@
+from __future__ import annotations
+
+import logging
+import random
+import threading
+import time
+import uuid
+from dataclasses import dataclass, field
+from typing import Any, Callable
+
+from sqlalchemy.orm import Session
+
+from app.dao import message_dao
+from app.services.whatsapp_service import WhatsAppService, whatsapp_service
+from app.utils.db import SessionLocal
+from app.utils.metrics import Counter, LatencyStats, register_provider
+from app.utils.scheduler import DeadlineScheduler
+from app.utils.settings import settings
+
+logger = logging.getLogger(__name__)
+
+@dataclass
+class OutboundReply:
+    wa_id: str
+    chunks: list[str]
+    not_before: float
+    message_id: uuid.UUID | None = None
+    on_first_sent: Callable[[], None] | None = None
+    open: bool = False
+    sent: int = 0
+    provider_message_ids: list[str] = field(default_factory=list)
+    in_flight: bool = False
+    failed: bool = False
+    provider_ids_recorded: int = 0
+    waiting: bool = False
+    successor: OutboundReply | None = None
+
+class OutboundSender:
+
+    def __init__(
+        self,
+        whatsapp: WhatsAppService | None = None,
+        session_factory: Callable[[], Session] | None = None,
+        max_workers: int | None = None,
+    ):
+        self.whatsapp = whatsapp or whatsapp_service
+        self._session_factory = session_factory or SessionLocal
+        self._scheduler = DeadlineScheduler("outbound", max_workers or settings.outbound_workers)
+        self._lock = threading.Lock()
+        self._tails: dict[str, OutboundReply] = {}
+        self._scheduled = Counter()
+        self._chained = Counter()
+        self._sent_chunks = Counter()
+        self._completed = Counter()
+        self._failed = Counter()
+        self._dispatch_lag = LatencyStats()
+        register_provider("outbound", self.stats)
+
+    def schedule(self, reply: OutboundReply) -> None:
+        if not reply.chunks and not reply.open:
+            return
+        self._scheduled.inc()
+        with self._lock:
+            previous = self._tails.get(reply.wa_id)
+            self._tails[reply.wa_id] = reply
+            if previous is not None:
+                previous.successor = reply
+                reply.waiting = True
+                self._chained.inc()
+                return
+            if not reply.chunks or reply.in_flight:
+                return
+            reply.in_flight = True
+        self._scheduler.schedule(None, reply.not_before - time.time(), self._send_next, reply)
+
+    def push(self, reply: OutboundReply, chunk: str) -> None:
+        with self._lock:
+            reply.chunks.append(chunk)
+            if reply.failed or reply.in_flight or reply.waiting:
+                return
+            reply.in_flight = True
+        self._scheduler.schedule(None, reply.not_before - time.time(), self._send_next, reply)
+
+    def close(self, reply: OutboundReply, message_id: uuid.UUID | None = None) -> None:
+        with self._lock:
+            reply.open = False
+            if message_id is not None:
+                reply.message_id = message_id
+            finished = not reply.waiting and not reply.in_flight and reply.sent == len(reply.chunks)
+            done = finished and bool(reply.chunks)
+            successor = self._finish(reply) if finished else None
+        if reply.sent:
+            self._record_provider_ids(reply)
+        if done:
+            self._completed.inc()
+        self._release(successor)
+
+    def _finish(self, reply: OutboundReply) -> OutboundReply | None:
+        while True:
+            if self._tails.get(reply.wa_id) is reply:
+                del self._tails[reply.wa_id]
+            successor = reply.successor
+            if successor is None:
+                return None
+            reply.successor = None
+            successor.waiting = False
+            successor.not_before = max(successor.not_before, reply.not_before)
+            if successor.chunks:
+                successor.in_flight = True
+                return successor
+            if successor.open:
+                return None
+            reply = successor
+
+    def _release(self, successor: OutboundReply | None) -> None:
+        if successor is not None:
+            self._scheduler.schedule(None, successor.not_before - time.time(), self._send_next, successor)
+
+    def _send_next(self, reply: OutboundReply) -> None:
+        self._dispatch_lag.observe(max(0.0, time.time() - reply.not_before))
+        chunk = reply.chunks[reply.sent]
+        try:
+            response = self.whatsapp.send_text_message(reply.wa_id, chunk)
+        except Exception as e:
+            with self._lock:
+                reply.failed = True
+                reply.in_flight = False
+                successor = self._finish(reply)
+            self._failed.inc()
+            logger.error(f"Erro ao enviar resposta agendada para {reply.wa_id}: {e}")
+            self._record_provider_ids(reply)
+            self._release(successor)
+            return
+        self._sent_chunks.inc()
+        reply.provider_message_ids.extend(
+            m["id"] for m in response.get("messages", []) if m.get("id")
+        )
+        reply.sent += 1
+
+        if reply.sent == 1:
+            self._on_first_sent(reply)
+
+        with self._lock:
+            reply.not_before = time.time() + random.uniform(
+                settings.outbound_chunk_min_gap, settings.outbound_chunk_max_gap,
+            )
+            has_next = reply.sent < len(reply.chunks)
+            if not has_next:
+                reply.in_flight = False
+            done = not has_next and not reply.open
+            successor = self._finish(reply) if done else None
+        if has_next:
+            self._scheduler.schedule(None, reply.not_before - time.time(), self._send_next, reply)
+            return
+        self._record_provider_ids(reply)
+        if done:
+            self._completed.inc()
+            self._release(successor)
+
+    def _record_provider_ids(self, reply: OutboundReply) -> None:
+        with self._lock:
+            if not reply.message_id:
+                return
+            new_ids = reply.provider_message_ids[reply.provider_ids_recorded:]
+            if not new_ids:
+                return
+            first = reply.provider_ids_recorded == 0
+            reply.provider_ids_recorded += len(new_ids)
+        db = self._session_factory()
+        try:
+            if first:
+                message_dao.set_provider_message_id(db, reply.message_id, new_ids[0])
+            message_dao.add_provider_message_ids(db, reply.message_id, new_ids)
+        except Exception as e:
+            logger.error(f"Erro ao registrar id do provedor para mensagem {reply.message_id}: {e}")
+        finally:
+            db.close()
+
+    def _on_first_sent(self, reply: OutboundReply) -> None:
+        self._record_provider_ids(reply)
+        if reply.on_first_sent:
+            try:
+                reply.on_first_sent()
+            except Exception as e:
+                logger.error(f"Erro no callback de envio para {reply.wa_id}: {e}")
+
+    @property
+    def pending_count(self) -> int:
+        return self._scheduler.pending_count
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            "pending_sends": self.pending_count,
+            "scheduled_replies": self._scheduled.value,
+            "chained_replies": self._chained.value,
+            "waiting_contacts": len(self._tails),
+            "sent_chunks": self._sent_chunks.value,
+            "completed_replies": self._completed.value,
+            "failed_replies": self._failed.value,
+            "dispatch_lag_seconds": self._dispatch_lag.snapshot(),
+        }
+
+_outbound_sender: OutboundSender | None = None
+
+def get_outbound_sender() -> OutboundSender:
+    global _outbound_sender
+    if _outbound_sender is None:
+        _outbound_sender = OutboundSender()
+    return _outbound_sender
@@ -0,0 +1,54 @@
+from __future__ import annotations
+
+import re
+import threading
+import unicodedata
+from typing import Any, Hashable
+
+from app.utils.settings import settings
+from app.utils.ttl_cache import TTLCache
+
+_NON_WORD = re.compile(r'[^\w\s]')
+_SPACES = re.compile(r'\s+')
+
+def normalize_text(text: str) -> str:
+    decomposed = unicodedata.normalize("NFKD", text.lower())
+    stripped = "".join(c for c in decomposed if not unicodedata.combining(c))
+    return _SPACES.sub(" ", _NON_WORD.sub(" ", stripped)).strip()
+
+class ResponseCache:
+
+    def __init__(self, max_entries: int | None = None, ttl: float | None = None):
+        self._entries: TTLCache[str] = TTLCache(
+            max_entries or settings.response_cache_max_entries,
+            ttl or settings.response_cache_ttl,
+        )
+        self._stages: dict[str, dict[str, int]] = {}
+        self._lock = threading.Lock()
+
+    def _count(self, stage: str, outcome: str) -> None:
+        with self._lock:
+            entry = self._stages.setdefault(stage, {"hits": 0, "misses": 0, "bypassed": 0, "stored": 0})
+            entry[outcome] += 1
+
+    def bypass(self, stage: str) -> None:
+        self._count(stage, "bypassed")
+
+    def get(self, stage: str, key: Hashable) -> str | None:
+        value = self._entries.get(key)
+        self._count(stage, "misses" if value is None else "hits")
+        return value
+
+    def put(self, stage: str, key: Hashable, response_text: str) -> None:
+        if not response_text:
+            return
+        self._entries.get_or_create(key, lambda: response_text)
+        self._count(stage, "stored")
+
+    def stats(self) -> dict[str, Any]:
+        with self._lock:
+            stages = {stage: dict(entry) for stage, entry in self._stages.items()}
+        for entry in stages.values():
+            lookups = entry["hits"] + entry["misses"]
+            entry["hit_rate"] = round(entry["hits"] / lookups, 4) if lookups else 0.0
+        return {"stages": stages, **self._entries.stats()}
@@ -0,0 +1,182 @@
+from __future__ import annotations
+
+import logging
+import threading
+import time
+import uuid
+from typing import Any, Callable
+
+from sqlalchemy.orm import Session
+
+from app.dao import lead_dao, scoring_job_dao
+from app.entities.scoring_job_entity import ScoringJob
+from app.services.lead_scoring_service import (
+    LeadScoringService,
+    build_lead_data,
+    get_lead_scoring_service,
+    status_for_score,
+)
+from app.services.websocket_manager import ws_manager
+from app.utils.db import SessionLocal
+from app.utils.metrics import Counter, LatencyStats, register_provider
+from app.utils.settings import settings
+
+logger = logging.getLogger(__name__)
+
+class ScoringWorker:
+
+    def __init__(
+        self,
+        scoring: LeadScoringService | None = None,
+        session_factory: Callable[[], Session] | None = None,
+        workers: int | None = None,
+        poll_interval: float | None = None,
+        max_attempts: int | None = None,
+    ):
+        self._scoring = scoring
+        self._session_factory = session_factory or SessionLocal
+        self.workers = max(1, workers or settings.scoring_workers)
+        self.poll_interval = poll_interval or settings.scoring_poll_interval
+        self.max_attempts = max_attempts or settings.scoring_max_attempts
+        self.retry_backoff = settings.scoring_retry_backoff
+        self.stale_after = settings.scoring_stale_after
+        self._threads: list[threading.Thread] = []
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._last_requeue = 0.0
+        self._enqueued = Counter()
+        self._completed = Counter()
+        self._retried = Counter()
+        self._failed = Counter()
+        self._requeued = Counter()
+        self._duration = LatencyStats()
+        register_provider("scoring_jobs", self.stats)
+
+    @property
+    def scoring(self) -> LeadScoringService:
+        if self._scoring is None:
+            self._scoring = get_lead_scoring_service()
+        return self._scoring
+
+    def start(self) -> None:
+        with self._lock:
+            if self._threads:
+                return
+            for i in range(self.workers):
+                thread = threading.Thread(target=self._run, name=f"scoring-worker-{i}", daemon=True)
+                thread.start()
+                self._threads.append(thread)
+
+    def enqueue(self, db: Session, lead_id: uuid.UUID, conversation_id: uuid.UUID) -> bool:
+        created = scoring_job_dao.enqueue(db, lead_id, conversation_id)
+        if created:
+            self._enqueued.inc()
+            self._wakeup.set()
+        return created
+
+    def _run(self) -> None:
+        while True:
+            try:
+                processed = self._process_next()
+            except Exception as e:
+                logger.error(f"Erro no worker de scoring: {e}")
+                processed = False
+            if not processed:
+                self._wakeup.wait(self.poll_interval)
+                self._wakeup.clear()
+
+    def _process_next(self) -> bool:
+        db = self._session_factory()
+        try:
+            job = scoring_job_dao.claim_next(db)
+            if job is None:
+                self._maybe_requeue_stale(db)
+                return False
+
+            started = time.monotonic()
+            try:
+                self._score(db, job)
+            except Exception as e:
+                db.rollback()
+                if job.attempts >= self.max_attempts:
+                    scoring_job_dao.fail(db, job.id, str(e), None)
+                    self._failed.inc()
+                    logger.error(f"Scoring do lead {job.lead_id} falhou apos {job.attempts} tentativas: {e}")
+                else:
+                    retry_in = self.retry_backoff * 2 ** (job.attempts - 1)
+                    scoring_job_dao.fail(db, job.id, str(e), retry_in)
+                    self._retried.inc()
+                    logger.warning(f"Scoring do lead {job.lead_id} falhou, nova tentativa em {retry_in:.0f}s: {e}")
+                return True
+
+            scoring_job_dao.complete(db, job.id)
+            self._completed.inc()
+            self._duration.observe(time.monotonic() - started)
+            return True
+        finally:
+            db.close()
+
+    def _maybe_requeue_stale(self, db: Session) -> None:
+        now = time.monotonic()
+        with self._lock:
+            if now - self._last_requeue < self.stale_after:
+                return
+            self._last_requeue = now
+        requeued, failed = scoring_job_dao.requeue_stale(db, self.stale_after, self.max_attempts)
+        if requeued:
+            self._requeued.inc(requeued)
+            logger.warning(f"{requeued} jobs de scoring presos reenfileirados")
+        if failed:
+            self._failed.inc(failed)
+            logger.error(f"{failed} jobs de scoring presos marcados como falhos apos {self.max_attempts} tentativas")
+
+    def _score(self, db: Session, job: ScoringJob) -> None:
+        lead = lead_dao.get_by_id(db, job.lead_id)
+        if not lead:
+            logger.info(f"Lead {job.lead_id} nao encontrado, job de scoring descartado")
+            return
+
+        score_result = self.scoring.calculate_score(
+            db, job.conversation_id, build_lead_data(lead), max_retries=1, raise_errors=True,
+        )
+        new_score = score_result.get("score", 50)
+        justificativa = score_result.get("justificativa", "")
+        notes = lead.notes or ""
+        if justificativa:
+            notes = f"{notes}\n\n[Scoring negociação]: {justificativa}".strip()
+
+        temperatura = status_for_score(new_score)
+        lead_dao.update_lead(
+            db, lead.id,
+            status=temperatura,
+            score=new_score,
+            notes=notes,
+            step_negociacao=True,
+        )
+        logger.info(f"Lead {lead.id} em negociação: score={new_score}, temperatura={temperatura}")
+        ws_manager.broadcast_threadsafe("lead_updated", {
+            "lead_id": str(lead.id),
+            "conversation_id": str(job.conversation_id),
+            "score": new_score,
+            "status": temperatura,
+        })
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            "workers": self.workers,
+            "running": len(self._threads),
+            "enqueued": self._enqueued.value,
+            "completed": self._completed.value,
+            "retried": self._retried.value,
+            "failed": self._failed.value,
+            "requeued_stale": self._requeued.value,
+            "duration_seconds": self._duration.snapshot(),
+        }
+
+_scoring_worker: ScoringWorker | None = None
+
+def get_scoring_worker() -> ScoringWorker:
+    global _scoring_worker
+    if _scoring_worker is None:
+        _scoring_worker = ScoringWorker()
+    return _scoring_worker
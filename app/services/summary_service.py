@@ -0,0 +1,116 @@
+from __future__ import annotations
+
+import logging
+import time
+import uuid
+from datetime import datetime
+from typing import Any, Callable
+
+from openai import OpenAI
+from sqlalchemy.orm import Session
+
+from app.dao import conversation_dao, message_dao
+from app.services.llm_clients import get_llm_clients
+from app.services.llm_limiter import estimate_request_tokens, get_llm_limiter
+from app.utils.db import SessionLocal
+from app.utils.metrics import Counter, LatencyStats, register_provider
+from app.utils.settings import settings, load_summary_prompt
+from app.utils.sharded_executor import ShardedExecutor
+
+logger = logging.getLogger(__name__)
+
+class ConversationSummarizer:
+
+    def __init__(
+        self,
+        api_key: str | None = None,
+        base_url: str | None = None,
+        model: str | None = None,
+        session_factory: Callable[[], Session] | None = None,
+        workers: int | None = None,
+    ):
+        self.api_key = api_key or settings.openai_api_key
+        self.base_url = base_url or settings.openai_base_url
+        self.model = model or settings.model
+        self.batch_size = settings.summary_batch_size
+        self._session_factory = session_factory or SessionLocal
+        self._client: OpenAI | None = None
+        self._executor = ShardedExecutor("summary", workers or settings.summary_workers)
+        self._runs = Counter()
+        self._failed = Counter()
+        self._folded_messages = Counter()
+        self._latency = LatencyStats()
+        register_provider("conversation_summary", self.stats)
+
+    def _get_client(self) -> OpenAI:
+        if self._client is None:
+            if not self.api_key:
+                raise ValueError("OPENAI_API_KEY não configurada")
+            self._client = get_llm_clients().openai(self.api_key, self.base_url)
+        return self._client
+
+    def schedule(self, conversation_id: uuid.UUID, window_start: datetime) -> None:
+        self._executor.submit(conversation_id, self._summarize, conversation_id, window_start)
+
+    def _build_input(self, summary: str | None, messages: list[Any]) -> str:
+        lines = ["## Resumo atual", summary or "(vazio)", "", "## Mensagens novas"]
+        for msg in messages:
+            role = "Cliente" if msg.role == "user" else "Agente"
+            lines.append(f"{role}: {msg.content}")
+        return "\n".join(lines)
+
+    def _summarize(self, conversation_id: uuid.UUID, window_start: datetime) -> None:
+        db = self._session_factory()
+        try:
+            conversation = conversation_dao.get_by_id(db, conversation_id)
+            if not conversation:
+                return
+            messages = message_dao.get_messages_between(
+                db, conversation_id, conversation.summary_until, window_start, self.batch_size,
+            )
+            if not messages:
+                return
+
+            prompt = load_summary_prompt()
+            content = self._build_input(conversation.summary, messages)
+            started = time.monotonic()
+            with get_llm_limiter().slot("summary", estimate_request_tokens((prompt, content))) as ticket:
+                response = self._get_client().chat.completions.create(
+                    model=self.model,
+                    messages=[
+                        {"role": "system", "content": prompt},
+                        {"role": "user", "content": content},
+                    ],
+                )
+                ticket.used_tokens = response.usage.total_tokens if response.usage else None
+            summary = (response.choices[0].message.content or "").strip()
+            self._latency.observe(time.monotonic() - started)
+            if not summary:
+                return
+
+            conversation_dao.update_summary(db, conversation_id, summary, messages[-1].created_at)
+            self._runs.inc()
+            self._folded_messages.inc(len(messages))
+            logger.info(f"Resumo da conversa {conversation_id} atualizado com {len(messages)} mensagens")
+        except Exception as e:
+            self._failed.inc()
+            logger.error(f"Erro ao atualizar resumo da conversa {conversation_id}: {e}")
+        finally:
+            db.close()
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            "runs": self._runs.value,
+            "failed": self._failed.value,
+            "folded_messages": self._folded_messages.value,
+            "queued": self._executor.queued,
+            "latency_seconds": self._latency.snapshot(),
+        }
+
+_summarizer: ConversationSummarizer | None = None
+
+def get_summarizer() -> ConversationSummarizer:
+    global _summarizer
+    if _summarizer is None:
+        _summarizer = ConversationSummarizer()
+    return _summarizer
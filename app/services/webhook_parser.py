@@ -0,0 +1,128 @@
+from __future__ import annotations
+
+import json
+import re
+from typing import Any
+
+from fastapi import HTTPException
+from fastapi.exceptions import RequestValidationError
+from pydantic import ValidationError
+
+from app.schemas.webhook_schemas import InboundMessage, WebhookPayload
+from app.services.webhook_service import extract_messages
+from app.utils.settings import settings
+
+try:
+    import orjson
+
+    _loads = orjson.loads
+    _DecodeError: type[Exception] = orjson.JSONDecodeError
+except ImportError:
+    _loads = json.loads
+    _DecodeError = json.JSONDecodeError
+
+_MESSAGES_KEY = re.compile(rb'"messages"\s*:')
+_STATUSES_KEY = re.compile(rb'"statuses"\s*:')
+
+def is_status_callback(body: bytes) -> bool:
+    return not _MESSAGES_KEY.search(body) and bool(_STATUSES_KEY.search(body))
+
+def parse_statuses(body: bytes) -> list[dict[str, Any]]:
+    try:
+        data = _loads(body)
+    except _DecodeError:
+        return []
+    statuses: list[dict[str, Any]] = []
+    if not isinstance(data, dict) or not isinstance(data.get("entry"), list):
+        return statuses
+    for entry in data["entry"]:
+        if not isinstance(entry, dict) or not isinstance(entry.get("changes"), list):
+            continue
+        for change in entry["changes"]:
+            value = change.get("value") if isinstance(change, dict) else None
+            if isinstance(value, dict) and isinstance(value.get("statuses"), list):
+                statuses.extend(s for s in value["statuses"] if isinstance(s, dict))
+    return statuses
+
+def parse_messages_fast(body: bytes) -> list[InboundMessage]:
+    if not _MESSAGES_KEY.search(body):
+        return []
+    try:
+        data = _loads(body)
+    except _DecodeError as e:
+        raise ValueError(f"JSON invalido: {e}") from e
+
+    messages: list[InboundMessage] = []
+    if not isinstance(data, dict):
+        return messages
+    entries = data.get("entry")
+    if not isinstance(entries, list):
+        return messages
+
+    for entry in entries:
+        if not isinstance(entry, dict):
+            continue
+        changes = entry.get("changes")
+        if not isinstance(changes, list):
+            continue
+        for change in changes:
+            if not isinstance(change, dict):
+                continue
+            value = change.get("value")
+            if not isinstance(value, dict):
+                continue
+            raw_messages = value.get("messages")
+            if not raw_messages or not isinstance(raw_messages, list):
+                continue
+            contacts = value.get("contacts")
+            if not isinstance(contacts, list):
+                contacts = []
+            contacts_by_wa_id = {
+                c.get("wa_id"): c for c in contacts if isinstance(c, dict) and c.get("wa_id")
+            }
+            for message in raw_messages:
+                if not isinstance(message, dict):
+                    continue
+                parsed = _parse_message(message, contacts, contacts_by_wa_id)
+                if parsed:
+                    messages.append(parsed)
+    return messages
+
+def _parse_message(
+    message: dict[str, Any],
+    contacts: list[Any],
+    contacts_by_wa_id: dict[str, dict[str, Any]],
+) -> InboundMessage | None:
+    sender = message.get("from")
+    contact = contacts_by_wa_id.get(sender) if sender else None
+    if contact is None and len(contacts) == 1 and isinstance(contacts[0], dict):
+        contact = contacts[0]
+
+    wa_id = (contact.get("wa_id") if contact else None) or sender
+    message_id = message.get("id")
+    if not wa_id or not message_id:
+        return None
+
+    text = message.get("text")
+    profile = contact.get("profile") if contact else None
+    return InboundMessage(
+        wa_id=str(wa_id),
+        message_id=str(message_id),
+        message_type=message.get("type") or "text",
+        text_body=text.get("body") if isinstance(text, dict) else None,
+        display_name=profile.get("name") if isinstance(profile, dict) else None,
+    )
+
+def parse_messages_pydantic(body: bytes) -> list[InboundMessage]:
+    return extract_messages(WebhookPayload.model_validate_json(body))
+
+def parse_webhook_body(body: bytes) -> list[InboundMessage]:
+    if settings.webhook_parser == "fast":
+        try:
+            return parse_messages_fast(body)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+    try:
+        return parse_messages_pydantic(body)
+    except ValidationError as e:
+        raise RequestValidationError(e.errors())
@@ -1,37 +1,46 @@
 from __future__ import annotations
 
-import json
+import hashlib
 import logging
 import random
-import re
+import sys
 import threading
 import time
 import uuid
 from dataclasses import dataclass, field
-from typing import Callable
+from datetime import datetime
+from functools import partial
+from typing import Any, Callable, Hashable
 
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session
 
-from app.dao import agent_config_dao, conversation_dao, lead_dao, profile_dao
-from app.dao.conversation_dao import get_or_create_open
+from app.dao import conversation_dao, lead_dao, message_dao, profile_dao
 from app.dao.message_dao import create_message, get_messages_by_conversation_id
-from app.dao.profile_dao import get_or_create
 from app.entities.conversation_entity import ConversationStatus
 from app.entities.lead_entity import LeadStatus
-from app.schemas.webhook_schemas import WebhookPayload
-from app.services.agent_config_service import (
-    build_emoji_instructions,
-    build_greeting_instructions,
-    build_response_style_instructions,
-    build_tone_instructions,
-)
-from app.services.openai_service import ChatMessage, AIService, AIServiceError, get_ai_service
-from app.services.langgraph_service import get_langgraph_service, LangGraphService
-from app.services.lead_scoring_service import LeadData, get_lead_scoring_service
+from app.schemas.webhook_schemas import InboundMessage, WebhookPayload
+from app.services.agent_config_service import AgentInstructions, get_agent_instructions
+from app.services.consolidation_store import ConsolidationStore, get_consolidation_store
+from app.services.consolidation_window import AdaptiveWindow, TypingCadence
+from app.services.dedupe_service import message_deduplicator
+from app.services.outbound_service import OutboundReply, OutboundSender, get_outbound_sender
+from app.services.summary_service import ConversationSummarizer, get_summarizer
+from app.services.openai_service import ChatMessage, AIService, get_ai_service
+from app.services.langgraph_service import get_langgraph_service, LangGraphService, STREAMING_STAGES
+from app.services.scoring_worker import ScoringWorker, get_scoring_worker
 from app.services.whatsapp_service import WhatsAppService, whatsapp_service
 from app.services.websocket_manager import ws_manager
+from app.utils.db import SessionLocal
+from app.utils.hedging import HedgedCall
+from app.utils.markers import BgxCommandAction, parse_markers
 from app.utils.message_splitter import split_response
+from app.utils.metrics import Counter, LatencyStats, register_provider
+from app.utils.scheduler import DeadlineScheduler
+from app.utils.sharded_executor import ShardedExecutor
 from app.utils.settings import settings
+from app.utils.token_budget import estimate_tokens, window_start
+from app.utils.ttl_cache import ShardedTTLCache
 
 logger = logging.getLogger(__name__)
 
@@ -40,17 +49,34 @@ AUDIO_NOT_SUPPORTED_MESSAGE = (
     "Por favor, envie sua mensagem em texto."
 )
 
-BGX_COMMAND_PATTERN = re.compile(
-    r'\[BGX_COMMAND:(\w+)\]\s*(\{.*?\})\s*\[/BGX_COMMAND\]',
-    re.DOTALL
-)
+ERROR_REPLY_MESSAGE = "Desculpe, ocorreu um erro ao processar sua mensagem. Tente novamente."
 
 @dataclass
-class PendingMessage:
-    texts: list[str] = field(default_factory=list)
-    timestamp: float = 0.0
-    last_sent: str = ""
-    timer: threading.Timer | None = None
+class ContactState:
+    last_sent_hash: bytes = b""
+    cadence: TypingCadence = field(default_factory=TypingCadence)
+
+class StreamGate:
+
+    def __init__(self) -> None:
+        self.lock = threading.Lock()
+        self.streamed = False
+        self.closed = False
+
+    def close(self) -> bool:
+        with self.lock:
+            self.closed = True
+            return not self.streamed
+
+def _text_digest(text: str) -> bytes:
+    return hashlib.blake2b(text.strip().encode("utf-8"), digest_size=8).digest()
+
+def _contact_state_size(state: ContactState) -> int:
+    return (
+        sys.getsizeof(state) + sys.getsizeof(state.__dict__)
+        + sys.getsizeof(state.last_sent_hash)
+        + sys.getsizeof(state.cadence) + sys.getsizeof(state.cadence.__dict__)
+    )
 
 class MessageHandler:
     def __init__(
@@ -60,22 +86,65 @@ class MessageHandler:
         whatsapp: WhatsAppService | None = None,
         gemini: AIService | None = None,
         langgraph: LangGraphService | None = None,
+        store: ConsolidationStore | None = None,
+        outbound: OutboundSender | None = None,
+        summarizer: ConversationSummarizer | None = None,
+        scoring_worker: ScoringWorker | None = None,
     ):
         self.timeout = timeout or settings.message_consolidation_timeout
         self.history_limit = history_limit or settings.message_history_limit
+        self.history_selection = settings.history_selection
+        self.conversation_summary = settings.conversation_summary
         self.min_delay = settings.min_response_delay
         self.max_delay = max(
             self.min_delay,
-            min(
-                settings.max_response_delay,
-                settings.message_consolidation_timeout - 5,
-            ),
+            settings.max_response_delay
+            if settings.adaptive_consolidation
+            else min(settings.max_response_delay, settings.message_consolidation_timeout - 5),
         )
         self.whatsapp = whatsapp or whatsapp_service
         self._gemini = gemini
         self._langgraph = langgraph
-        self._pending_messages: dict[str, PendingMessage] = {}
-        self._lock = threading.Lock()
+        self._outbound = outbound
+        self._summarizer = summarizer
+        self._scoring_worker = scoring_worker
+        self.store = store or get_consolidation_store()
+        self._contacts: ShardedTTLCache[ContactState] = ShardedTTLCache(
+            settings.contact_state_lock_stripes,
+            settings.contact_state_max_entries,
+            settings.contact_state_ttl,
+        )
+        self._executor = ShardedExecutor("consolidation", settings.consolidation_workers)
+        self._scheduler = DeadlineScheduler(
+            "consolidation", settings.consolidation_workers, dispatch=self._dispatch_turn,
+        )
+        self.adaptive = settings.adaptive_consolidation
+        self._window = AdaptiveWindow(
+            min_window=settings.consolidation_min_window,
+            max_window=settings.consolidation_max_window,
+            default_window=settings.consolidation_cold_start_window,
+        )
+        self._chosen_windows = LatencyStats()
+        self._time_to_first_response = LatencyStats()
+        self.response_timing = settings.response_timing
+        self.streaming = settings.llm_streaming
+        self.turn_deadline = settings.turn_deadline
+        self.hedging = settings.llm_hedging
+        self._llm_calls: HedgedCall[Any] = HedgedCall(
+            "llm",
+            hedge_percentile=settings.hedge_percentile,
+            min_hedge_delay=settings.hedge_min_delay,
+            min_samples=settings.hedge_min_samples,
+            fallback_reserve=settings.fallback_reserve,
+            max_workers=settings.hedge_max_workers,
+        )
+        self._response_latency = LatencyStats()
+        self._target_missed = Counter()
+        self._history_messages = LatencyStats()
+        self._history_tokens = LatencyStats()
+        register_provider("consolidation", self.consolidation_stats)
+        register_provider("history", self.history_stats)
+        register_provider("contact_state", self.contact_state_stats)
 
     @property
     def gemini(self) -> AIService:
@@ -89,33 +158,125 @@ class MessageHandler:
             self._langgraph = get_langgraph_service()
         return self._langgraph
 
-    def _validate_message(self, pending: PendingMessage, consolidated_text: str) -> bool:
-        if consolidated_text.strip() == pending.last_sent.strip():
+    @property
+    def outbound(self) -> OutboundSender:
+        if self._outbound is None:
+            self._outbound = get_outbound_sender()
+        return self._outbound
+
+    @property
+    def summarizer(self) -> ConversationSummarizer:
+        if self._summarizer is None:
+            self._summarizer = get_summarizer()
+        return self._summarizer
+
+    @property
+    def scoring_worker(self) -> ScoringWorker:
+        if self._scoring_worker is None:
+            self._scoring_worker = get_scoring_worker()
+        return self._scoring_worker
+
+    def _validate_message(self, state: ContactState, consolidated_text: str) -> bool:
+        digest = _text_digest(consolidated_text)
+        if digest == state.last_sent_hash:
             logger.debug("Mensagem repetitiva detectada, ignorando envio")
             return False
-        pending.last_sent = consolidated_text
+        state.last_sent_hash = digest
         return True
 
-    def _build_chat_history(self, db: Session, conversation_id) -> list[ChatMessage]:
-        messages = get_messages_by_conversation_id(
-            db, conversation_id, limit=self.history_limit
+    def _history_budget(self, pipeline_stage: str) -> int:
+        if pipeline_stage == "negotiation":
+            return settings.history_budget_negotiation
+        if pipeline_stage == "first_contact":
+            return settings.history_budget_first_contact
+        return settings.history_budget_onboarding
+
+    def _summary_covered(self, messages: list[Any], summary_until: datetime | None) -> int:
+        if summary_until is None:
+            return 0
+        return next((i for i, msg in enumerate(messages) if msg.created_at > summary_until), len(messages))
+
+    def _summary_due(self, messages: list[Any], start: int, covered: int) -> bool:
+        if covered == 0 and len(messages) >= settings.history_scan_limit:
+            return True
+        overflow = messages[covered:start]
+        return bool(overflow) and (
+            len(overflow) >= settings.summary_min_messages
+            or sum(estimate_tokens(m.content) for m in overflow) >= settings.summary_min_tokens
         )
-        return [
+
+    def _build_chat_history(
+        self, db: Session, conversation_id, pipeline_stage: str = "onboarding",
+        summary_until: datetime | None = None,
+    ) -> tuple[list[ChatMessage], int]:
+        if self.history_selection != "budget":
+            messages = get_messages_by_conversation_id(
+                db, conversation_id, limit=self.history_limit
+            )
+            start = 0
+        else:
+            messages = get_messages_by_conversation_id(
+                db, conversation_id, limit=settings.history_scan_limit
+            )
+            start = window_start([msg.content for msg in messages], self._history_budget(pipeline_stage))
+            if self.conversation_summary:
+                covered = self._summary_covered(messages, summary_until)
+                if start < len(messages) and self._summary_due(messages, start, covered):
+                    self.summarizer.schedule(conversation_id, messages[start].created_at)
+                start = covered
+
+        history = [
             ChatMessage(role=msg.role, content=msg.content)
-            for msg in messages
+            for msg in messages[start:]
         ]
+        self._history_messages.observe(len(history))
+        self._history_tokens.observe(sum(estimate_tokens(msg.content) for msg in history))
+        user_message_count = sum(1 for msg in messages if msg.role == "user")
+        return history, user_message_count
+
+    def _push_chunk(self, reply: OutboundReply, gate: StreamGate, chunk: str) -> None:
+        with gate.lock:
+            if gate.closed:
+                return
+            gate.streamed = True
+            self.outbound.push(reply, chunk)
+
+    def _fallback_unless_streamed(self, gate: StreamGate, fallback: Callable[[], Any]) -> Any:
+        if not gate.close():
+            raise RuntimeError("Resposta parcial ja enviada, failover desativado")
+        return fallback()
 
     def _calculate_humanized_delay(self) -> float:
         if self.max_delay <= 0:
             return 0
         return random.uniform(self.min_delay, self.max_delay)
 
-    def _send_split_messages(self, wa_id: str, text: str, max_length: int = 300) -> None:
-        chunks = split_response(text, max_length=max_length)
-        for i, chunk in enumerate(chunks):
-            if i > 0:
-                time.sleep(random.uniform(1.0, 3.0))
-            self.whatsapp.send_text_message(wa_id, chunk)
+    def _reply_not_before(self, due_at: float) -> float:
+        now = time.time()
+        if self.response_timing == "target":
+            target = self._calculate_humanized_delay()
+            if due_at + target < now:
+                self._target_missed.inc()
+            return max(now, due_at + target)
+        return now + self._calculate_humanized_delay()
+
+    def _broadcast_new_message(self, conversation_id: uuid.UUID, profile_id: uuid.UUID) -> None:
+        ws_manager.broadcast_threadsafe("new_message", {
+            "conversation_id": str(conversation_id),
+            "profile_id": str(profile_id),
+        })
+
+    def _record_reply_latency(self, first_received_at: float, due_at: float) -> None:
+        now = time.time()
+        self._time_to_first_response.observe(now - first_received_at)
+        self._response_latency.observe(now - due_at)
+
+    def _on_reply_sent(
+        self, first_received_at: float, due_at: float,
+        conversation_id: uuid.UUID, profile_id: uuid.UUID,
+    ) -> None:
+        self._record_reply_latency(first_received_at, due_at)
+        self._broadcast_new_message(conversation_id, profile_id)
 
     def _parse_bgx_commands(
         self,
@@ -125,33 +286,28 @@ class MessageHandler:
         profile_id: uuid.UUID,
         profile_phone: str,
     ) -> str:
-        clean_text = response_text
-        matches = BGX_COMMAND_PATTERN.findall(response_text)
-        for command_type, json_str in matches:
+        parsed = parse_markers(response_text)
+        for command in parsed.of(BgxCommandAction):
             try:
-                data = json.loads(json_str)
-                if command_type == "ADD_TAG":
-                    tag = data.get("tag")
+                if command.command == "ADD_TAG":
+                    tag = command.data.get("tag")
                     if tag:
                         self._add_tag_to_conversation_and_profile(
                             db, conversation_id, profile_id, tag
                         )
-                elif command_type == "ADD_TAGS":
-                    tags = data.get("tags", [])
+                elif command.command == "ADD_TAGS":
+                    tags = command.data.get("tags", [])
                     for tag in tags:
                         self._add_tag_to_conversation_and_profile(
                             db, conversation_id, profile_id, tag
                         )
-                elif command_type == "CREATE_LEAD":
+                elif command.command == "CREATE_LEAD":
                     self._create_lead_from_conversation(
-                        db, conversation_id, profile_id, profile_phone, data,
+                        db, conversation_id, profile_id, profile_phone, command.data,
                     )
-            except json.JSONDecodeError as e:
-                logger.warning(f"Erro ao parsear comando BGX: {e}")
             except Exception as e:
-                logger.error(f"Erro ao executar comando BGX {command_type}: {e}")
-        clean_text = BGX_COMMAND_PATTERN.sub("", clean_text).strip()
-        return clean_text
+                logger.error(f"Erro ao executar comando BGX {command.command}: {e}")
+        return parsed.text
 
     def _add_tag_to_conversation_and_profile(
         self, db: Session, conversation_id: uuid.UUID, profile_id: uuid.UUID, tag: str,
@@ -193,32 +349,33 @@ class MessageHandler:
         except Exception as e:
             logger.error(f"Erro ao criar lead para conversa {conversation_id}: {e}")
 
-    def _get_agent_config_instructions(self, db: Session) -> tuple[str, str, str, str, int]:
+    def _get_agent_config_instructions(self, db: Session) -> AgentInstructions:
         try:
-            config = agent_config_dao.get_config(db)
-            return (
-                build_tone_instructions(config),
-                build_emoji_instructions(config),
-                build_greeting_instructions(config),
-                build_response_style_instructions(config),
-                config.max_message_length,
-            )
+            return get_agent_instructions(db)
         except Exception as e:
             logger.warning(f"Erro ao carregar agent_config, usando defaults: {e}")
-            return "", "", "", "", 300
+            return AgentInstructions(
+                version="", tone="", emoji="", greeting="", response_style="", max_message_length=300,
+            )
 
-    def _process_consolidated_message(
-        self, wa_id: str, db_factory: Callable[[], Session], profile_id, conversation_id,
-    ) -> None:
-        with self._lock:
-            pending = self._pending_messages.get(wa_id)
-            if not pending or not pending.texts:
-                return
-            consolidated_text = " ".join(pending.texts)
-            if not self._validate_message(pending, consolidated_text):
+    def _process_consolidated_message(self, wa_id: str, db_factory: Callable[[], Session]) -> None:
+        batch = self.store.claim(wa_id)
+        if batch is None:
+            remaining = self.store.seconds_until_due(wa_id)
+            if remaining is not None and remaining > 0:
+                self._schedule_processing(wa_id, remaining, db_factory)
+            return
+
+        consolidated_text = " ".join(batch.texts)
+        with self._contacts.lock_for(wa_id):
+            state = self._contacts.get_or_create(wa_id, ContactState)
+            if not self._validate_message(state, consolidated_text):
                 return
-            pending.texts = []
+        provider_message_id = batch.message_ids[0] if batch.message_ids else None
+        profile_id = batch.profile_id
+        conversation_id = batch.conversation_id
 
+        streamed: OutboundReply | None = None
         try:
             db = db_factory()
             try:
@@ -227,15 +384,18 @@ class MessageHandler:
                     logger.info(f"Conversa {conversation_id} nao esta open, ignorando processamento")
                     return
 
-                create_message(
-                    db, conversation_id=conversation_id, profile_id=profile_id,
-                    role="user", content=consolidated_text,
-                )
-                history = self._build_chat_history(db, conversation_id)
-                messages_for_graph = [
-                    {"role": msg.role, "content": msg.content} for msg in history
-                ]
-
+                try:
+                    create_message(
+                        db, conversation_id=conversation_id, profile_id=profile_id,
+                        role="user", content=consolidated_text,
+                        provider_message_id=provider_message_id,
+                        provider_message_ids=batch.message_ids,
+                    )
+                except IntegrityError:
+                    db.rollback()
+                    message_deduplicator.dropped_database.inc()
+                    logger.info(f"Mensagem {provider_message_id} ja persistida, ignorando turno duplicado")
+                    return
                 existing_lead = lead_dao.get_by_conversation_id(db, conversation_id)
                 if not existing_lead:
                     existing_lead = lead_dao.get_by_profile_id(db, profile_id)
@@ -264,84 +424,131 @@ class MessageHandler:
                     pipeline_stage = "onboarding"
                     lead_id = None
 
-                user_message_count = len([m for m in messages_for_graph if m["role"] == "user"])
+                history, user_message_count = self._build_chat_history(
+                    db, conversation_id, pipeline_stage, conversation.summary_until,
+                )
+                messages_for_graph = [
+                    {"role": msg.role, "content": msg.content} for msg in history
+                ]
+                summary = (
+                    conversation.summary
+                    if self.history_selection == "budget" and self.conversation_summary
+                    else None
+                )
+
+                instructions = self._get_agent_config_instructions(db)
+                max_message_length = instructions.max_message_length
 
-                (
-                    tone_instructions,
-                    emoji_instructions,
-                    greeting_instructions,
-                    response_style_instructions,
-                    max_message_length,
-                ) = self._get_agent_config_instructions(db)
+                on_reply_sent = partial(
+                    self._on_reply_sent, batch.first_received_at, batch.due_at,
+                    conversation_id, profile_id,
+                )
+                if self.streaming and pipeline_stage in STREAMING_STAGES:
+                    streamed = OutboundReply(
+                        wa_id=wa_id,
+                        chunks=[],
+                        not_before=self._reply_not_before(batch.due_at),
+                        on_first_sent=partial(self._record_reply_latency, batch.first_received_at, batch.due_at),
+                        open=True,
+                    )
+                    self.outbound.schedule(streamed)
+
+                gate = StreamGate()
+                primary = partial(
+                    self.langgraph.process_message,
+                    messages=messages_for_graph,
+                    profile_id=str(profile_id),
+                    conversation_id=str(conversation_id),
+                    lead_id=lead_id,
+                    lead_info=lead_info,
+                    pipeline_stage=pipeline_stage,
+                    user_message_count=user_message_count,
+                    first_name=first_name,
+                    tone_instructions=instructions.tone,
+                    emoji_instructions=instructions.emoji,
+                    greeting_instructions=instructions.greeting,
+                    response_style_instructions=instructions.response_style,
+                    config_version=instructions.version,
+                    summary=summary,
+                    on_chunk=partial(self._push_chunk, streamed, gate) if streamed else None,
+                    max_chunk_length=max_message_length,
+                    raise_errors=True,
+                )
+                fallback = partial(self.gemini.chat, history, priority=pipeline_stage)
+                if streamed is not None:
+                    fallback = partial(self._fallback_unless_streamed, gate, fallback)
 
                 try:
-                    result = self.langgraph.process_message(
-                        messages=messages_for_graph,
-                        profile_id=str(profile_id),
-                        conversation_id=str(conversation_id),
-                        lead_id=lead_id,
-                        lead_info=lead_info,
-                        pipeline_stage=pipeline_stage,
-                        user_message_count=user_message_count,
-                        first_name=first_name,
-                        tone_instructions=tone_instructions,
-                        emoji_instructions=emoji_instructions,
-                        greeting_instructions=greeting_instructions,
-                        response_style_instructions=response_style_instructions,
-                    )
-                    response_text = result.get("response", "")
-                    self._process_langgraph_actions(
-                        db, dict(result), conversation_id, profile_id, wa_id
+                    source, value = self._llm_calls.call(
+                        primary, fallback, self.turn_deadline or None,
+                        hedge=self.hedging and streamed is None,
                     )
                 except Exception as e:
-                    logger.error(f"Erro ao chamar LangGraph: {e}")
-                    try:
-                        response_text = self.gemini.chat(history)
+                    logger.error(f"Erro ao gerar resposta para {wa_id}: {e}")
+                    response_text = ERROR_REPLY_MESSAGE
+                    failed = True
+                else:
+                    failed = False
+                    if source == "primary":
+                        response_text = value.get("response", "")
+                        self._process_langgraph_actions(
+                            db, dict(value), conversation_id, profile_id, wa_id
+                        )
+                    else:
                         response_text = self._parse_bgx_commands(
-                            response_text, db, conversation_id, profile_id, wa_id
+                            value, db, conversation_id, profile_id, wa_id
                         )
-                    except AIServiceError as e:
-                        logger.error(f"Erro ao chamar OpenAI: {e}")
-                        response_text = "Desculpe, ocorreu um erro ao processar sua mensagem. Tente novamente."
-
-                delay = self._calculate_humanized_delay()
-                logger.debug(f"Aplicando delay humanizado de {delay:.1f}s para {wa_id}")
-                time.sleep(delay)
+                finally:
+                    gate.close()
+
+                if streamed is not None:
+                    sent = list(streamed.chunks)
+                    if failed and sent:
+                        remaining = [response_text]
+                        response_text = "\n\n".join([*sent, response_text])
+                    elif response_text:
+                        remaining = split_response(response_text, max_length=max_message_length)[len(sent):]
+                    else:
+                        remaining = []
+                    for chunk in remaining:
+                        self.outbound.push(streamed, chunk)
+                    agent_message = create_message(
+                        db, conversation_id=conversation_id, profile_id=profile_id,
+                        role="agent", content=response_text or "",
+                    )
+                    self.outbound.close(streamed, agent_message.id)
+                    self._broadcast_new_message(conversation_id, profile_id)
+                    logger.info(f"Mensagem processada para {wa_id}")
+                    return
 
-                if response_text:
-                    self._send_split_messages(wa_id, response_text, max_length=max_message_length)
+                not_before = self._reply_not_before(batch.due_at)
+                logger.debug(f"Agendando resposta para {wa_id} em {not_before - time.time():.1f}s")
 
-                create_message(
+                agent_message = create_message(
                     db, conversation_id=conversation_id, profile_id=profile_id,
                     role="agent", content=response_text or "",
                 )
 
-                import asyncio
-                try:
-                    loop = asyncio.get_event_loop()
-                    if loop.is_running():
-                        asyncio.ensure_future(ws_manager.broadcast("new_message", {
-                            "conversation_id": str(conversation_id),
-                            "profile_id": str(profile_id),
-                        }))
-                    else:
-                        loop.run_until_complete(ws_manager.broadcast("new_message", {
-                            "conversation_id": str(conversation_id),
-                            "profile_id": str(profile_id),
-                        }))
-                except RuntimeError:
-                    loop = asyncio.new_event_loop()
-                    loop.run_until_complete(ws_manager.broadcast("new_message", {
-                        "conversation_id": str(conversation_id),
-                        "profile_id": str(profile_id),
-                    }))
-                    loop.close()
+                chunks = split_response(response_text, max_length=max_message_length) if response_text else []
+                if chunks:
+                    self.outbound.schedule(OutboundReply(
+                        wa_id=wa_id,
+                        chunks=chunks,
+                        not_before=not_before,
+                        message_id=agent_message.id,
+                        on_first_sent=on_reply_sent,
+                    ))
+                else:
+                    self._broadcast_new_message(conversation_id, profile_id)
 
                 logger.info(f"Mensagem processada para {wa_id}")
             finally:
                 db.close()
         except Exception as e:
             logger.error(f"Erro ao processar mensagem consolidada: {e}")
+        finally:
+            if streamed is not None and streamed.open:
+                self.outbound.close(streamed)
 
     def _process_langgraph_actions(
         self, db: Session, result: dict, conversation_id: uuid.UUID,
@@ -386,80 +593,30 @@ class MessageHandler:
                             db, conversation_id, profile_id, tag
                         )
 
-                    import asyncio
-                    try:
-                        loop = asyncio.get_event_loop()
-                        if loop.is_running():
-                            asyncio.ensure_future(ws_manager.broadcast("lead_created", {
-                                "lead_id": str(lead.id),
-                                "conversation_id": str(conversation_id),
-                            }))
-                        else:
-                            loop.run_until_complete(ws_manager.broadcast("lead_created", {
-                                "lead_id": str(lead.id),
-                                "conversation_id": str(conversation_id),
-                            }))
-                    except RuntimeError:
-                        pass
+                    ws_manager.broadcast_threadsafe("lead_created", {
+                        "lead_id": str(lead.id),
+                        "conversation_id": str(conversation_id),
+                    })
 
             if result.get("should_human_takeover"):
                 conversation_dao.set_human_takeover(db, conversation_id)
                 logger.info(f"Human takeover ativado para conversa {conversation_id}")
 
-                import asyncio
-                try:
-                    loop = asyncio.get_event_loop()
-                    if loop.is_running():
-                        asyncio.ensure_future(ws_manager.broadcast("human_takeover", {
-                            "conversation_id": str(conversation_id),
-                        }))
-                    else:
-                        loop.run_until_complete(ws_manager.broadcast("human_takeover", {
-                            "conversation_id": str(conversation_id),
-                        }))
-                except RuntimeError:
-                    pass
+                ws_manager.broadcast_threadsafe("human_takeover", {
+                    "conversation_id": str(conversation_id),
+                })
 
                 lead = lead_dao.get_by_conversation_id(db, conversation_id)
                 if lead:
                     pipeline_stage = result.get("pipeline_stage", "")
                     if pipeline_stage == "negotiation":
+                        lead_dao.update_lead(db, lead.id, step_negociacao=True)
                         try:
-                            scoring_service = get_lead_scoring_service()
-                            lead_data_obj = LeadData(
-                                nome_cliente=lead.nome_cliente,
-                                nome_empresa=lead.nome_empresa,
-                                cargo=lead.cargo,
-                                telefone=lead.telefone,
-                                tags=lead.tags or [],
-                                notes=lead.notes,
-                            )
-                            score_result = scoring_service.calculate_score(db, conversation_id, lead_data_obj)
-                            new_score = score_result.get("score", 50)
-                            justificativa = score_result.get("justificativa", "")
-                            notes = lead.notes or ""
-                            if justificativa:
-                                notes = f"{notes}\n\n[Scoring negociação]: {justificativa}".strip()
-
-                            if new_score >= 70:
-                                temperatura = LeadStatus.QUENTE
-                            elif new_score >= 40:
-                                temperatura = LeadStatus.MORNO
-                            else:
-                                temperatura = LeadStatus.FRIO
-
-                            lead_dao.update_lead(
-                                db, lead.id,
-                                status=temperatura,
-                                score=new_score,
-                                notes=notes,
-                                step_negociacao=True,
-                            )
-                            logger.info(f"Lead {lead.id} em negociação: score={new_score}, temperatura={temperatura}")
+                            self.scoring_worker.enqueue(db, lead.id, conversation_id)
+                            logger.info(f"Lead {lead.id} em negociação, scoring enfileirado")
                         except Exception as e:
-                            logger.error(f"Erro ao rodar scoring na negociação: {e}")
-                            lead_dao.update_lead(db, lead.id, step_negociacao=True)
-                            logger.info(f"Lead {lead.id} step_negociacao=True (sem scoring)")
+                            db.rollback()
+                            logger.error(f"Erro ao enfileirar scoring na negociação: {e}")
                     elif result.get("current_score", 50) < 30:
                         lead_dao.update_lead(
                             db, lead.id,
@@ -472,48 +629,128 @@ class MessageHandler:
         except Exception as e:
             logger.error(f"Erro ao processar acoes do LangGraph: {e}")
 
-    def _schedule_processing(
-        self, wa_id: str, db_factory: Callable[[], Session], profile_id, conversation_id,
-    ) -> None:
-        with self._lock:
-            pending = self._pending_messages.get(wa_id)
-            if not pending:
-                return
-            if pending.timer:
-                pending.timer.cancel()
-            pending.timer = threading.Timer(
-                self.timeout,
-                self._process_consolidated_message,
-                args=(wa_id, db_factory, profile_id, conversation_id),
+    def _choose_window(self, wa_id: str, count: int) -> float:
+        if not self.adaptive:
+            window = self.timeout
+        else:
+            with self._contacts.lock_for(wa_id):
+                state = self._contacts.get_or_create(wa_id, ContactState)
+                self._window.observe(state.cadence, time.monotonic(), count)
+                window = self._window.window_for(state.cadence)
+        self._chosen_windows.observe(window)
+        return window
+
+    def consolidation_stats(self) -> dict[str, Any]:
+        return {
+            "adaptive": self.adaptive,
+            "min_window": self._window.min_window,
+            "max_window": self._window.max_window,
+            "cold_start_window": self._window.default_window,
+            "chosen_window_seconds": self._chosen_windows.snapshot(),
+            "time_to_first_response_seconds": self._time_to_first_response.snapshot(),
+            "response_timing": self.response_timing,
+            "response_latency_seconds": self._response_latency.snapshot(),
+            "target_missed": self._target_missed.value,
+        }
+
+    def history_stats(self) -> dict[str, Any]:
+        return {
+            "selection": self.history_selection,
+            "summary": self.conversation_summary,
+            "window_messages": self._history_messages.snapshot(),
+            "window_tokens": self._history_tokens.snapshot(),
+        }
+
+    def contact_state_stats(self) -> dict[str, Any]:
+        return self._contacts.stats(_contact_state_size)
+
+    def _dispatch_turn(self, key: Hashable, fn: Callable[..., Any], args: tuple[Any, ...]) -> None:
+        self._executor.submit(key, fn, *args)
+
+    def _schedule_processing(self, wa_id: str, delay: float, db_factory: Callable[[], Session]) -> None:
+        self._scheduler.schedule(wa_id, delay, self._process_consolidated_message, wa_id, db_factory)
+
+    def _recover_pending(self) -> None:
+        try:
+            for wa_id in self.store.due_contacts():
+                if self._scheduler.deadline_of(wa_id) is None:
+                    self._schedule_processing(wa_id, 0, SessionLocal)
+        except Exception as e:
+            logger.error(f"Erro ao recuperar mensagens pendentes: {e}")
+        finally:
+            self._scheduler.schedule(
+                "__recovery__", settings.consolidation_recovery_interval, self._recover_pending,
             )
-            pending.timer.start()
+
+    def start_recovery(self) -> None:
+        if self.store.durable:
+            self._scheduler.schedule("__recovery__", 0, self._recover_pending)
+
+    @property
+    def pending_deadlines(self) -> int:
+        return self._scheduler.pending_count
 
     def handle_text_message(
         self, wa_id: str, text: str, message_id: str, db: Session,
         db_factory: Callable[[], Session],
     ) -> None:
-        profile = get_or_create(db, wa_id, None)
-        conversation = get_or_create_open(db, profile.id)
-        self.whatsapp.mark_as_read(message_id)
+        self.handle_text_messages(
+            [InboundMessage(wa_id=wa_id, message_id=message_id, message_type="text", text_body=text)],
+            db,
+            db_factory,
+        )
 
-        if conversation.status == ConversationStatus.HUMAN:
-            create_message(
-                db, conversation_id=conversation.id, profile_id=profile.id,
-                role="user", content=text,
-            )
-            logger.info(f"Mensagem de {wa_id} persistida (modo human takeover)")
+    def handle_text_messages(
+        self, messages: list[InboundMessage], db: Session,
+        db_factory: Callable[[], Session],
+    ) -> None:
+        if not messages:
             return
+        persisted_ids = message_dao.get_existing_provider_message_ids(
+            db, [m.message_id for m in messages]
+        )
+        if persisted_ids:
+            message_deduplicator.dropped_database.inc(len(persisted_ids))
+            logger.info(f"{len(persisted_ids)} mensagens ja persistidas descartadas")
+            messages = [m for m in messages if m.message_id not in persisted_ids]
+            if not messages:
+                return
+        profiles = profile_dao.get_or_create_many(db, (m.wa_id for m in messages))
+        conversations = conversation_dao.get_or_create_open_many(db, (p.id for p in profiles.values()))
+
+        last_message_ids = {m.wa_id: m.message_id for m in messages}
+        for message_id in last_message_ids.values():
+            self.whatsapp.mark_as_read(message_id)
+
+        human_messages: list[dict] = []
+        to_consolidate: dict[str, tuple[uuid.UUID, uuid.UUID, list[tuple[str, str]]]] = {}
+        for message in messages:
+            profile = profiles[message.wa_id]
+            conversation = conversations[profile.id]
+
+            if conversation.status == ConversationStatus.HUMAN:
+                human_messages.append({
+                    "conversation_id": conversation.id,
+                    "profile_id": profile.id,
+                    "role": "user",
+                    "content": message.text_body or "",
+                    "provider_message_id": message.message_id,
+                })
+                continue
+
+            if message.wa_id not in to_consolidate:
+                to_consolidate[message.wa_id] = (profile.id, conversation.id, [])
+            to_consolidate[message.wa_id][2].append((message.text_body or "", message.message_id))
 
-        import time
-        with self._lock:
-            if wa_id not in self._pending_messages:
-                self._pending_messages[wa_id] = PendingMessage()
-            pending = self._pending_messages[wa_id]
-            pending.texts.append(text)
-            pending.timestamp = time.time()
+        if human_messages:
+            message_dao.create_messages(db, human_messages)
+            logger.info(f"{len(human_messages)} mensagens persistidas (modo human takeover)")
 
-        self._schedule_processing(wa_id, db_factory, profile.id, conversation.id)
-        logger.debug(f"Mensagem de texto adicionada a fila para {wa_id}")
+        for wa_id, (profile_id, conversation_id, items) in to_consolidate.items():
+            window = self._choose_window(wa_id, len(items))
+            delay = self.store.append(wa_id, profile_id, conversation_id, items, window)
+            self._schedule_processing(wa_id, delay, db_factory)
+            logger.debug(f"Mensagem de texto adicionada a fila para {wa_id}")
 
     def handle_audio_message(self, wa_id: str, message_id: str) -> None:
         self.whatsapp.mark_as_read(message_id)
@@ -529,23 +766,36 @@ class MessageHandler:
         self.whatsapp.send_text_message(wa_id, unsupported_message)
         logger.info(f"Mensagem tipo '{message_type}' nao suportada para {wa_id}")
 
-def extract_message_data(payload: WebhookPayload) -> tuple[str | None, str | None, str | None, str | None, str | None]:
-    if not payload.entry:
-        return None, None, None, None, None
-    for entry in payload.entry:
-        if not entry.changes:
-            continue
-        for change in entry.changes:
+def extract_messages(payload: WebhookPayload) -> list[InboundMessage]:
+    messages: list[InboundMessage] = []
+    for entry in payload.entry or []:
+        for change in entry.changes or []:
             value = change.value
             if not value or not value.messages:
                 continue
-            message = value.messages[0]
-            contact = value.contacts[0] if value.contacts else None
-            wa_id = (contact.wa_id if contact else None) or message.from_
-            display_name = contact.profile.name if contact and contact.profile else None
-            message_type = message.type or "text"
-            text_body = message.text.body if message.text else None
-            return wa_id, display_name, text_body, message.id, message_type
-    return None, None, None, None, None
+            contacts = value.contacts or []
+            contacts_by_wa_id = {c.wa_id: c for c in contacts if c.wa_id}
+            for message in value.messages:
+                contact = contacts_by_wa_id.get(message.from_ or "")
+                if contact is None and len(contacts) == 1:
+                    contact = contacts[0]
+                wa_id = (contact.wa_id if contact else None) or message.from_
+                if not wa_id or not message.id:
+                    continue
+                messages.append(InboundMessage(
+                    wa_id=wa_id,
+                    message_id=message.id,
+                    message_type=message.type or "text",
+                    text_body=message.text.body if message.text else None,
+                    display_name=contact.profile.name if contact and contact.profile else None,
+                ))
+    return messages
+
+def extract_message_data(payload: WebhookPayload) -> tuple[str | None, str | None, str | None, str | None, str | None]:
+    messages = extract_messages(payload)
+    if not messages:
+        return None, None, None, None, None
+    first = messages[0]
+    return first.wa_id, first.display_name, first.text_body, first.message_id, first.message_type
 
 message_handler = MessageHandler()
@@ -1,5 +1,6 @@
 from __future__ import annotations
 
+import asyncio
 import json
 import logging
 from typing import Any
@@ -12,6 +13,10 @@ class ConnectionManager:
 
     def __init__(self) -> None:
         self.active_connections: list[WebSocket] = []
+        self._loop: asyncio.AbstractEventLoop | None = None
+
+    def bind_loop(self, loop: asyncio.AbstractEventLoop) -> None:
+        self._loop = loop
 
     async def connect(self, websocket: WebSocket) -> None:
         await websocket.accept()
@@ -36,6 +41,13 @@ class ConnectionManager:
         for conn in disconnected:
             self.disconnect(conn)
 
+    def broadcast_threadsafe(self, event: str, data: dict[str, Any] | None = None) -> None:
+        loop = self._loop
+        if loop is None or loop.is_closed():
+            logger.debug(f"Loop do WebSocket indisponivel, evento {event} descartado")
+            return
+        asyncio.run_coroutine_threadsafe(self.broadcast(event, data), loop)
+
     async def broadcast_sync_wrapper(self, event: str, data: dict[str, Any] | None = None) -> None:
         await self.broadcast(event, data)
 
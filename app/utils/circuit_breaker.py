@@ -0,0 +1,111 @@
+from __future__ import annotations
+
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Iterator
+
+from app.utils.hedging import on_abandon
+from app.utils.metrics import Counter, register_provider
+from app.utils.settings import settings
+
+class CircuitOpenError(RuntimeError):
+    pass
+
+class CircuitBreaker:
+
+    def __init__(self, name: str, failure_threshold: int, reset_timeout: float):
+        self.name = name
+        self.failure_threshold = max(1, failure_threshold)
+        self.reset_timeout = reset_timeout
+        self.state = "closed"
+        self._failures = 0
+        self._opened_at = 0.0
+        self._trial_in_flight = False
+        self._lock = threading.Lock()
+        self.opened = Counter()
+        self.rejected = Counter()
+
+    def allow(self) -> bool:
+        with self._lock:
+            if self.state == "closed":
+                return True
+            if self.state == "open":
+                if time.monotonic() - self._opened_at < self.reset_timeout:
+                    self.rejected.inc()
+                    return False
+                self.state = "half_open"
+                self._trial_in_flight = False
+            if self._trial_in_flight:
+                self.rejected.inc()
+                return False
+            self._trial_in_flight = True
+            return True
+
+    def check(self) -> None:
+        if not self.allow():
+            raise CircuitOpenError(f"Circuito aberto para {self.name}")
+
+    def release_trial(self) -> None:
+        with self._lock:
+            self._trial_in_flight = False
+
+    @contextmanager
+    def guard(self) -> Iterator[None]:
+        self.check()
+        cancel = on_abandon(self.release_trial)
+        try:
+            yield
+        except Exception:
+            self.record_failure()
+            raise
+        else:
+            self.record_success()
+        finally:
+            cancel()
+
+    def record_success(self) -> None:
+        with self._lock:
+            self._failures = 0
+            self._trial_in_flight = False
+            self.state = "closed"
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self._failures += 1
+            self._trial_in_flight = False
+            if self.state == "half_open" or self._failures >= self.failure_threshold:
+                if self.state != "open":
+                    self.opened.inc()
+                self.state = "open"
+                self._opened_at = time.monotonic()
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            "state": self.state,
+            "consecutive_failures": self._failures,
+            "opened": self.opened.value,
+            "rejected": self.rejected.value,
+        }
+
+_breakers: dict[str, CircuitBreaker] = {}
+_breakers_lock = threading.Lock()
+
+def _breakers_stats() -> dict[str, Any]:
+    with _breakers_lock:
+        breakers = dict(_breakers)
+    return {name: breaker.stats() for name, breaker in breakers.items()}
+
+def get_circuit_breaker(endpoint: str) -> CircuitBreaker:
+    with _breakers_lock:
+        breaker = _breakers.get(endpoint)
+        if breaker is None:
+            breaker = CircuitBreaker(
+                endpoint, settings.circuit_failure_threshold, settings.circuit_reset_timeout,
+            )
+            _breakers[endpoint] = breaker
+            register_provider("circuit_breakers", _breakers_stats)
+        return breaker
+
+def endpoint_key(base_url: str | None, model: str, role: str = "primary") -> str:
+    return f"{role}:{base_url or 'openai'}|{model}"
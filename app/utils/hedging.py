@@ -0,0 +1,216 @@
+from __future__ import annotations
+
+import contextvars
+import logging
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from typing import Any, Callable, Generic, TypeVar
+
+from app.utils.metrics import Counter, LatencyStats, register_provider
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+class DeadlineExceeded(TimeoutError):
+    pass
+
+class CallScope:
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._callbacks: list[Callable[[], None]] = []
+        self.abandoned = False
+
+    def on_abandon(self, callback: Callable[[], None]) -> Callable[[], None]:
+        with self._lock:
+            if not self.abandoned:
+                self._callbacks.append(callback)
+                return lambda: self._discard(callback)
+        callback()
+        return _noop
+
+    def _discard(self, callback: Callable[[], None]) -> None:
+        with self._lock:
+            if callback in self._callbacks:
+                self._callbacks.remove(callback)
+
+    def abandon(self) -> None:
+        with self._lock:
+            if self.abandoned:
+                return
+            self.abandoned = True
+            callbacks, self._callbacks = self._callbacks, []
+        for callback in callbacks:
+            try:
+                callback()
+            except Exception as e:
+                logger.warning(f"Erro ao liberar recurso de chamada abandonada: {e}")
+
+_current_scope: contextvars.ContextVar[CallScope | None] = contextvars.ContextVar("hedged_call_scope", default=None)
+
+def _noop() -> None:
+    pass
+
+def on_abandon(callback: Callable[[], None]) -> Callable[[], None]:
+    scope = _current_scope.get()
+    if scope is None:
+        return _noop
+    return scope.on_abandon(callback)
+
+def call_abandoned() -> bool:
+    scope = _current_scope.get()
+    return scope is not None and scope.abandoned
+
+def _run_scoped(scope: CallScope, fn: Callable[[], T]) -> T:
+    token = _current_scope.set(scope)
+    try:
+        return fn()
+    finally:
+        _current_scope.reset(token)
+
+class HedgedCall(Generic[T]):
+
+    def __init__(
+        self,
+        name: str,
+        hedge_percentile: float,
+        min_hedge_delay: float,
+        min_samples: int,
+        fallback_reserve: float = 0.0,
+        max_workers: int = 32,
+    ):
+        self.name = name
+        self.hedge_percentile = hedge_percentile
+        self.min_hedge_delay = min_hedge_delay
+        self.min_samples = min_samples
+        self.fallback_reserve = max(0.0, fallback_reserve)
+        self._executor = ThreadPoolExecutor(max_workers=max(2, max_workers), thread_name_prefix=f"{name}-call")
+        self._lock = threading.Lock()
+        self._running = 0
+        self._primary_latency = LatencyStats()
+        self._primary_wins = Counter()
+        self._fallback_wins = Counter()
+        self._hedges = Counter()
+        self._failovers = Counter()
+        self._deadline_failovers = Counter()
+        self._deadline_exceeded = Counter()
+        self._abandoned = Counter()
+        register_provider(f"hedging_{name}", self.stats)
+
+    def hedge_delay(self) -> float | None:
+        snapshot = self._primary_latency.snapshot()
+        if snapshot["count"] < self.min_samples:
+            return None
+        return max(self.min_hedge_delay, self._primary_latency.percentile(self.hedge_percentile))
+
+    def _observe_primary(self, started: float, future: Future) -> None:
+        if not future.cancelled() and future.exception() is None:
+            self._primary_latency.observe(time.monotonic() - started)
+
+    def _finished(self, future: Future) -> None:
+        with self._lock:
+            self._running -= 1
+
+    def _submit(self, fn: Callable[[], T], scopes: dict[Future, CallScope]) -> Future:
+        scope = CallScope()
+        with self._lock:
+            self._running += 1
+        future = self._executor.submit(_run_scoped, scope, fn)
+        future.add_done_callback(self._finished)
+        scopes[future] = scope
+        return future
+
+    def _abandon(self, pending: dict[Future, str], scopes: dict[Future, CallScope]) -> None:
+        for future, source in pending.items():
+            if future.done():
+                continue
+            self._abandoned.inc()
+            future.cancel()
+            scopes[future].abandon()
+            logger.debug(f"Chamada {source} abandonada em {self.name}")
+
+    def call(
+        self,
+        primary: Callable[[], T],
+        fallback: Callable[[], T] | None,
+        deadline: float | None,
+        hedge: bool = False,
+    ) -> tuple[str, T]:
+        started = time.monotonic()
+        expires_at = started + deadline if deadline else None
+        scopes: dict[Future, CallScope] = {}
+        primary_future = self._submit(primary, scopes)
+        primary_future.add_done_callback(lambda f: self._observe_primary(started, f))
+        pending: dict[Future, str] = {primary_future: "primary"}
+
+        delay = self.hedge_delay() if hedge and fallback else None
+        hedge_at = started + delay if delay is not None else None
+        failover_at = (
+            max(started, expires_at - self.fallback_reserve)
+            if fallback and expires_at is not None and self.fallback_reserve
+            else None
+        )
+        launch_at = min((t for t in (hedge_at, failover_at) if t is not None), default=None)
+        fallback_started = False
+        last_error: BaseException | None = None
+
+        try:
+            while pending:
+                now = time.monotonic()
+                timeout = max(0.0, expires_at - now) if expires_at is not None else None
+                if launch_at is not None and not fallback_started:
+                    until_launch = max(0.0, launch_at - now)
+                    timeout = until_launch if timeout is None else min(timeout, until_launch)
+
+                done, _ = wait(pending, timeout=timeout, return_when=FIRST_COMPLETED)
+                for future in done:
+                    source = pending.pop(future)
+                    if future.cancelled():
+                        continue
+                    error = future.exception()
+                    if error is None:
+                        (self._primary_wins if source == "primary" else self._fallback_wins).inc()
+                        return source, future.result()
+                    last_error = error
+                    logger.warning(f"Chamada {source} falhou em {self.name}: {error}")
+                    if source == "primary" and fallback and not fallback_started:
+                        self._failovers.inc()
+                        pending[self._submit(fallback, scopes)] = "fallback"
+                        fallback_started = True
+
+                now = time.monotonic()
+                if expires_at is not None and now >= expires_at:
+                    if any(future.done() for future in pending):
+                        continue
+                    self._deadline_exceeded.inc()
+                    raise DeadlineExceeded(f"Prazo de {deadline}s excedido em {self.name}")
+
+                if launch_at is not None and not fallback_started and now >= launch_at:
+                    if launch_at == hedge_at:
+                        self._hedges.inc()
+                    else:
+                        self._deadline_failovers.inc()
+                        logger.warning(f"Primaria lenta em {self.name}, iniciando fallback antes do prazo")
+                    pending[self._submit(fallback, scopes)] = "fallback"
+                    fallback_started = True
+        finally:
+            self._abandon(pending, scopes)
+
+        raise last_error or RuntimeError(f"Nenhuma chamada concluida em {self.name}")
+
+    def stats(self) -> dict[str, Any]:
+        delay = self.hedge_delay()
+        return {
+            "hedge_delay_seconds": round(delay, 4) if delay is not None else None,
+            "primary_latency_seconds": self._primary_latency.snapshot(),
+            "primary_wins": self._primary_wins.value,
+            "fallback_wins": self._fallback_wins.value,
+            "hedges": self._hedges.value,
+            "failovers": self._failovers.value,
+            "deadline_failovers": self._deadline_failovers.value,
+            "running_calls": self._running,
+            "deadline_exceeded": self._deadline_exceeded.value,
+            "abandoned_calls": self._abandoned.value,
+        }
@@ -0,0 +1,190 @@
+from __future__ import annotations
+
+import json
+import logging
+import re
+from dataclasses import dataclass, field
+from typing import Any, TypeVar, Union
+
+logger = logging.getLogger(__name__)
+
+MARKER_NAMES = (
+    "LEAD_DATA",
+    "ADD_TAG",
+    "LEAD_ANALYSIS",
+    "NEGOTIATION_DETECTED",
+    "NEGATIVE_SIGNAL",
+    "BGX_COMMAND",
+)
+
+_OPEN = re.compile(r'\[(' + "|".join(MARKER_NAMES) + r')(?::(\w+))?\]')
+_COMMAND_SUFFIX = re.compile(r':\w*')
+_BLOCK = re.compile(
+    r'\[(' + "|".join(MARKER_NAMES) + r')(?::(\w+))?\](.*?)\[/\1\]', re.DOTALL,
+)
+
+@dataclass
+class LeadDataAction:
+    data: dict[str, Any]
+
+@dataclass
+class AddTagAction:
+    tag: str
+
+@dataclass
+class LeadAnalysisAction:
+    data: dict[str, Any]
+
+@dataclass
+class NegotiationDetectedAction:
+    pass
+
+@dataclass
+class NegativeSignalAction:
+    pass
+
+@dataclass
+class BgxCommandAction:
+    command: str
+    data: dict[str, Any]
+
+MarkerAction = Union[
+    LeadDataAction,
+    AddTagAction,
+    LeadAnalysisAction,
+    NegotiationDetectedAction,
+    NegativeSignalAction,
+    BgxCommandAction,
+]
+
+A = TypeVar("A")
+
+@dataclass
+class ParsedOutput:
+    text: str
+    actions: list[MarkerAction] = field(default_factory=list)
+
+    def of(self, action_type: type[A]) -> list[A]:
+        return [a for a in self.actions if isinstance(a, action_type)]
+
+    def first(self, action_type: type[A]) -> A | None:
+        for action in self.actions:
+            if isinstance(action, action_type):
+                return action
+        return None
+
+    def has(self, action_type: type) -> bool:
+        return self.first(action_type) is not None
+
+def _load_object(name: str, body: str) -> dict[str, Any] | None:
+    try:
+        data = json.loads(body)
+    except json.JSONDecodeError as e:
+        logger.warning(f"Erro ao parsear {name}: {e}")
+        return None
+    return data if isinstance(data, dict) else None
+
+def _to_action(name: str, command: str | None, body: str) -> MarkerAction | None:
+    if name == "NEGATIVE_SIGNAL":
+        return NegativeSignalAction() if body == "true" else None
+    if name == "NEGOTIATION_DETECTED":
+        return NegotiationDetectedAction() if body == "true" else None
+    data = _load_object(name, body)
+    if data is None:
+        return None
+    if name == "LEAD_DATA":
+        return LeadDataAction(data)
+    if name == "LEAD_ANALYSIS":
+        return LeadAnalysisAction(data)
+    if name == "ADD_TAG":
+        tag = data.get("tag")
+        return AddTagAction(str(tag)) if tag else None
+    if name == "BGX_COMMAND" and command:
+        return BgxCommandAction(command, data)
+    return None
+
+def _could_open(tail: str) -> bool:
+    head = tail[1:]
+    for name in MARKER_NAMES:
+        if name.startswith(head):
+            return True
+        if name == "BGX_COMMAND" and head.startswith(name):
+            return _COMMAND_SUFFIX.fullmatch(head[len(name):]) is not None
+    return False
+
+class MarkerParser:
+
+    def __init__(self) -> None:
+        self.actions: list[MarkerAction] = []
+        self._buffer = ""
+        self._close_search_from = 0
+        self._emitted: list[str] = []
+
+    def feed(self, delta: str) -> str:
+        self._buffer += delta
+        safe = self._consume(final=False)
+        self._emitted.append(safe)
+        return safe
+
+    def flush(self) -> str:
+        tail = self._consume(final=True)
+        self._emitted.append(tail)
+        return tail
+
+    def finish(self) -> ParsedOutput:
+        self.flush()
+        return ParsedOutput(text="".join(self._emitted).strip(), actions=self.actions)
+
+    def _consume(self, final: bool) -> str:
+        out: list[str] = []
+        buffer = self._buffer
+        pos = 0
+        while True:
+            start = buffer.find("[", pos)
+            if start < 0:
+                out.append(buffer[pos:])
+                pos = len(buffer)
+                break
+            out.append(buffer[pos:start])
+            pos = start
+            opening = _OPEN.match(buffer, start)
+            if opening:
+                closing = f"[/{opening.group(1)}]"
+                end = buffer.find(closing, max(opening.end(), start + self._close_search_from))
+                if end < 0:
+                    if final:
+                        self._close_search_from = 0
+                        out.append("[")
+                        pos = start + 1
+                        continue
+                    self._close_search_from = max(opening.end(), len(buffer) - len(closing) + 1) - start
+                    break
+                self._close_search_from = 0
+                action = _to_action(
+                    opening.group(1), opening.group(2), buffer[opening.end():end].strip(),
+                )
+                if action is not None:
+                    self.actions.append(action)
+                pos = end + len(closing)
+                continue
+            if not final and _could_open(buffer[start:]):
+                break
+            out.append("[")
+            pos = start + 1
+        self._buffer = buffer[pos:]
+        return "".join(out)
+
+def parse_markers(text: str) -> ParsedOutput:
+    pieces: list[str] = []
+    actions: list[MarkerAction] = []
+    pos = 0
+    for match in _BLOCK.finditer(text):
+        pieces.append(text[pos:match.start()])
+        action = _to_action(match.group(1), match.group(2), match.group(3).strip())
+        if action is not None:
+            actions.append(action)
+        pos = match.end()
+    if not pos:
+        return ParsedOutput(text=text.strip(), actions=actions)
+    pieces.append(text[pos:])
+    return ParsedOutput(text="".join(pieces).strip(), actions=actions)
@@ -2,6 +2,8 @@ from __future__ import annotations
 
 import re
 
+from app.utils.markers import MarkerAction, MarkerParser
+
 def split_response(text: str, max_length: int = 300) -> list[str]:
     if not text or not text.strip():
         return []
@@ -75,3 +77,38 @@ def _split_by_length(text: str, max_length: int) -> list[str]:
         chunks.append(current.strip())
 
     return [c for c in chunks if c]
+
+def _settled_chunks(text: str, max_length: int) -> list[str]:
+    text = text.lstrip()
+    if len(text.rstrip()) <= max_length:
+        return []
+    segments = text.split("\n\n")
+    paragraphs = [p.strip() for p in segments[:-1] if p.strip()]
+    if not paragraphs or (len(paragraphs) == 1 and not segments[-1].strip()):
+        return []
+    return _merge_chunks(paragraphs, max_length)[:-1]
+
+class StreamingSplitter:
+
+    def __init__(self, max_length: int = 300):
+        self.max_length = max_length
+        self._markers = MarkerParser()
+        self._text = ""
+        self._emitted = 0
+
+    @property
+    def actions(self) -> list[MarkerAction]:
+        return self._markers.actions
+
+    def feed(self, delta: str) -> list[str]:
+        self._text += self._markers.feed(delta)
+        return self._take(_settled_chunks(self._text, self.max_length))
+
+    def finish(self) -> list[str]:
+        self._text += self._markers.flush()
+        return self._take(split_response(self._text, self.max_length))
+
+    def _take(self, chunks: list[str]) -> list[str]:
+        fresh = chunks[self._emitted:]
+        self._emitted += len(fresh)
+        return fresh
@@ -0,0 +1,74 @@
+from __future__ import annotations
+
+import threading
+from collections import deque
+from typing import Any, Callable
+
+_providers: dict[str, Callable[[], dict[str, Any]]] = {}
+_providers_lock = threading.Lock()
+
+def _pick(samples: list[float], pct: float) -> float:
+    if not samples:
+        return 0.0
+    index = min(len(samples) - 1, int(round(pct / 100 * (len(samples) - 1))))
+    return samples[index]
+
+class Counter:
+
+    def __init__(self) -> None:
+        self._value = 0
+        self._lock = threading.Lock()
+
+    def inc(self, amount: int = 1) -> None:
+        with self._lock:
+            self._value += amount
+
+    @property
+    def value(self) -> int:
+        return self._value
+
+class LatencyStats:
+
+    def __init__(self, window: int = 1024) -> None:
+        self._samples: deque[float] = deque(maxlen=window)
+        self._count = 0
+        self._total = 0.0
+        self._max = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, seconds: float) -> None:
+        with self._lock:
+            self._samples.append(seconds)
+            self._count += 1
+            self._total += seconds
+            if seconds > self._max:
+                self._max = seconds
+
+    def percentile(self, pct: float) -> float:
+        with self._lock:
+            samples = sorted(self._samples)
+        return _pick(samples, pct)
+
+    def snapshot(self) -> dict[str, Any]:
+        with self._lock:
+            samples = sorted(self._samples)
+            count = self._count
+            total = self._total
+            maximum = self._max
+        return {
+            "count": count,
+            "avg": round(total / count, 4) if count else 0.0,
+            "p50": round(_pick(samples, 50), 4),
+            "p95": round(_pick(samples, 95), 4),
+            "p99": round(_pick(samples, 99), 4),
+            "max": round(maximum, 4),
+        }
+
+def register_provider(name: str, provider: Callable[[], dict[str, Any]]) -> None:
+    with _providers_lock:
+        _providers[name] = provider
+
+def collect() -> dict[str, Any]:
+    with _providers_lock:
+        providers = dict(_providers)
+    return {name: provider() for name, provider in providers.items()}
@@ -0,0 +1,50 @@
+from __future__ import annotations
+
+import re
+from typing import Any
+
+_PLACEHOLDER = re.compile(r'\{([a-z_][a-z0-9_]*)\}')
+
+MISSING_VALUE = "Não informado"
+
+class PromptTemplate:
+
+    def __init__(self, source: str | None = None, segments: list[tuple[bool, str]] | None = None):
+        if segments is None:
+            segments = []
+            pos = 0
+            for match in _PLACEHOLDER.finditer(source or ""):
+                if match.start() > pos:
+                    segments.append((False, source[pos:match.start()]))
+                segments.append((True, match.group(1)))
+                pos = match.end()
+            if source and pos < len(source):
+                segments.append((False, source[pos:]))
+        self._segments = segments
+        self.placeholders = frozenset(name for is_field, name in segments if is_field)
+
+    @staticmethod
+    def _value(value: Any) -> str:
+        return MISSING_VALUE if value is None else str(value)
+
+    def partial(self, **values: Any) -> PromptTemplate:
+        segments: list[tuple[bool, str]] = []
+        for is_field, text in self._segments:
+            if is_field and text in values:
+                is_field, text = False, self._value(values[text])
+            if not is_field and segments and not segments[-1][0]:
+                segments[-1] = (False, segments[-1][1] + text)
+            else:
+                segments.append((is_field, text))
+        return PromptTemplate(segments=segments)
+
+    def render(self, **values: Any) -> str:
+        parts: list[str] = []
+        for is_field, text in self._segments:
+            if not is_field:
+                parts.append(text)
+            elif text in values:
+                parts.append(self._value(values[text]))
+            else:
+                parts.append("{" + text + "}")
+        return "".join(parts)
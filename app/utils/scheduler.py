@@ -0,0 +1,121 @@
+from __future__ import annotations
+
+import heapq
+import itertools
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Hashable
+
+from app.utils.metrics import Counter, register_provider
+
+logger = logging.getLogger(__name__)
+
+_DEADLINE, _SEQ, _KEY, _FN, _ARGS, _CANCELLED = range(6)
+
+class DeadlineScheduler:
+
+    def __init__(
+        self,
+        name: str,
+        max_workers: int,
+        dispatch: Callable[[Hashable, Callable[..., Any], tuple[Any, ...]], None] | None = None,
+    ):
+        self.name = name
+        self.max_workers = max_workers
+        self._heap: list[list[Any]] = []
+        self._entries: dict[Hashable, list[Any]] = {}
+        self._cancelled = 0
+        self._seq = itertools.count()
+        self._cond = threading.Condition()
+        self._thread: threading.Thread | None = None
+        self._dispatch = dispatch
+        self._executor: ThreadPoolExecutor | None = None
+        if dispatch is None:
+            self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix=name)
+        self._fired = Counter()
+        register_provider(f"scheduler_{name}", self.stats)
+
+    def _ensure_started(self) -> None:
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name=f"{self.name}-timer", daemon=True)
+            self._thread.start()
+
+    def schedule(self, key: Hashable | None, delay: float, fn: Callable[..., Any], *args: Any) -> Hashable:
+        deadline = time.monotonic() + max(0.0, delay)
+        seq = next(self._seq)
+        if key is None:
+            key = ("job", seq)
+        entry = [deadline, seq, key, fn, args, False]
+        with self._cond:
+            self._ensure_started()
+            previous = self._entries.get(key)
+            if previous is not None:
+                previous[_CANCELLED] = True
+                self._cancelled += 1
+            self._entries[key] = entry
+            heapq.heappush(self._heap, entry)
+            self._compact_locked()
+            if self._heap[0] is entry:
+                self._cond.notify()
+        return key
+
+    def cancel(self, key: Hashable) -> bool:
+        with self._cond:
+            entry = self._entries.pop(key, None)
+            if entry is None:
+                return False
+            entry[_CANCELLED] = True
+            self._cancelled += 1
+            self._compact_locked()
+            return True
+
+    def deadline_of(self, key: Hashable) -> float | None:
+        with self._cond:
+            entry = self._entries.get(key)
+            return entry[_DEADLINE] if entry else None
+
+    @property
+    def pending_count(self) -> int:
+        return len(self._entries)
+
+    def _compact_locked(self) -> None:
+        if self._cancelled > 64 and self._cancelled > len(self._heap) // 2:
+            self._heap = [e for e in self._heap if not e[_CANCELLED]]
+            heapq.heapify(self._heap)
+            self._cancelled = 0
+
+    def _run(self) -> None:
+        while True:
+            with self._cond:
+                while True:
+                    while self._heap and self._heap[0][_CANCELLED]:
+                        heapq.heappop(self._heap)
+                        self._cancelled -= 1
+                    if not self._heap:
+                        self._cond.wait()
+                        continue
+                    timeout = self._heap[0][_DEADLINE] - time.monotonic()
+                    if timeout <= 0:
+                        break
+                    self._cond.wait(timeout)
+                entry = heapq.heappop(self._heap)
+                if self._entries.get(entry[_KEY]) is entry:
+                    del self._entries[entry[_KEY]]
+            self._fired.inc()
+            try:
+                if self._dispatch is not None:
+                    self._dispatch(entry[_KEY], entry[_FN], entry[_ARGS])
+                else:
+                    self._executor.submit(entry[_FN], *entry[_ARGS])
+            except Exception as e:
+                logger.error(f"Erro ao despachar tarefa agendada em {self.name}: {e}")
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            "pending_deadlines": self.pending_count,
+            "heap_size": len(self._heap),
+            "fired": self._fired.value,
+            "max_workers": self.max_workers,
+        }
@@ -23,12 +23,83 @@ class Settings:
     openai_api_key: str | None = os.getenv("OPENAI_API_KEY")
     openai_base_url: str | None = os.getenv("OPENAI_BASE_URL")
     model: str = os.getenv("MODEL", "gpt-4o-mini")
+    prompt_layout: str = os.getenv("PROMPT_LAYOUT", "inline")
+    llm_pool_max_connections: int = int(os.getenv("LLM_POOL_MAX_CONNECTIONS", "20"))
+    llm_pool_max_keepalive: int = int(os.getenv("LLM_POOL_MAX_KEEPALIVE", "10"))
+    llm_keepalive_expiry: float = float(os.getenv("LLM_KEEPALIVE_EXPIRY", "60"))
+    llm_http2: bool = os.getenv("LLM_HTTP2", "true").lower() == "true"
+    llm_connect_timeout: float = float(os.getenv("LLM_CONNECT_TIMEOUT", "5"))
+    llm_read_timeout: float = float(os.getenv("LLM_READ_TIMEOUT", "60"))
+    llm_pool_timeout: float = float(os.getenv("LLM_POOL_TIMEOUT", "10"))
+    llm_max_concurrency: int = int(os.getenv("LLM_MAX_CONCURRENCY", "32"))
+    llm_requests_per_minute: int = int(os.getenv("LLM_REQUESTS_PER_MINUTE", "0"))
+    llm_tokens_per_minute: int = int(os.getenv("LLM_TOKENS_PER_MINUTE", "0"))
+    llm_expected_output_tokens: int = int(os.getenv("LLM_EXPECTED_OUTPUT_TOKENS", "300"))
+    fallback_model: str = os.getenv("FALLBACK_MODEL", os.getenv("MODEL", "gpt-4o-mini"))
+    turn_deadline: float = float(os.getenv("TURN_DEADLINE", "45"))
+    fallback_reserve: float = float(os.getenv("FALLBACK_RESERVE", "15"))
+    llm_hedging: bool = os.getenv("LLM_HEDGING", "false").lower() == "true"
+    hedge_percentile: float = float(os.getenv("HEDGE_PERCENTILE", "95"))
+    hedge_min_delay: float = float(os.getenv("HEDGE_MIN_DELAY", "2"))
+    hedge_min_samples: int = int(os.getenv("HEDGE_MIN_SAMPLES", "20"))
+    hedge_max_workers: int = int(os.getenv("HEDGE_MAX_WORKERS", "32"))
+    circuit_failure_threshold: int = int(os.getenv("CIRCUIT_FAILURE_THRESHOLD", "5"))
+    circuit_reset_timeout: float = float(os.getenv("CIRCUIT_RESET_TIMEOUT", "30"))
+    response_cache: bool = os.getenv("RESPONSE_CACHE", "false").lower() == "true"
+    response_cache_max_entries: int = int(os.getenv("RESPONSE_CACHE_MAX_ENTRIES", "1000"))
+    response_cache_ttl: float = float(os.getenv("RESPONSE_CACHE_TTL", "3600"))
 
     message_history_limit: int = int(os.getenv("MESSAGE_HISTORY_LIMIT", "20"))
+    history_selection: str = os.getenv("HISTORY_SELECTION", "count")
+    history_scan_limit: int = int(os.getenv("HISTORY_SCAN_LIMIT", "60"))
+    history_budget_onboarding: int = int(os.getenv("HISTORY_BUDGET_ONBOARDING", "1500"))
+    history_budget_first_contact: int = int(os.getenv("HISTORY_BUDGET_FIRST_CONTACT", "3000"))
+    history_budget_negotiation: int = int(os.getenv("HISTORY_BUDGET_NEGOTIATION", "4000"))
+    conversation_summary: bool = os.getenv("CONVERSATION_SUMMARY", "false").lower() == "true"
+    summary_workers: int = int(os.getenv("SUMMARY_WORKERS", "2"))
+    summary_batch_size: int = int(os.getenv("SUMMARY_BATCH_SIZE", "50"))
+    summary_min_messages: int = int(os.getenv("SUMMARY_MIN_MESSAGES", "6"))
+    summary_min_tokens: int = int(os.getenv("SUMMARY_MIN_TOKENS", "600"))
     message_consolidation_timeout: int = int(os.getenv("MESSAGE_CONSOLIDATION_TIMEOUT", "60"))
+    adaptive_consolidation: bool = os.getenv("ADAPTIVE_CONSOLIDATION", "false").lower() == "true"
+    consolidation_min_window: float = float(os.getenv("CONSOLIDATION_MIN_WINDOW", "5"))
+    consolidation_max_window: float = float(os.getenv("CONSOLIDATION_MAX_WINDOW", os.getenv("MESSAGE_CONSOLIDATION_TIMEOUT", "60")))
+    consolidation_cold_start_window: float = float(os.getenv("CONSOLIDATION_COLD_START_WINDOW", os.getenv("CONSOLIDATION_MIN_WINDOW", "5")))
+    contact_state_max_entries: int = int(os.getenv("CONTACT_STATE_MAX_ENTRIES", "50000"))
+    contact_state_ttl: float = float(os.getenv("CONTACT_STATE_TTL", "21600"))
+    contact_state_lock_stripes: int = int(os.getenv("CONTACT_STATE_LOCK_STRIPES", "64"))
+    consolidation_store_stripes: int = int(os.getenv("CONSOLIDATION_STORE_STRIPES", "64"))
+    consolidation_workers: int = int(os.getenv("CONSOLIDATION_WORKERS", "8"))
+    consolidation_store: str = os.getenv("CONSOLIDATION_STORE", "memory")
+    consolidation_recovery_interval: float = float(os.getenv("CONSOLIDATION_RECOVERY_INTERVAL", "30"))
     
     min_response_delay: int = int(os.getenv("MIN_RESPONSE_DELAY", "10"))
     max_response_delay: int = int(os.getenv("MAX_RESPONSE_DELAY", "45"))
+    response_timing: str = os.getenv("RESPONSE_TIMING", "delay")
+    llm_streaming: bool = os.getenv("LLM_STREAMING", "false").lower() == "true"
+    outbound_workers: int = int(os.getenv("OUTBOUND_WORKERS", "4"))
+    outbound_chunk_min_gap: float = float(os.getenv("OUTBOUND_CHUNK_MIN_GAP", "1.0"))
+    outbound_chunk_max_gap: float = float(os.getenv("OUTBOUND_CHUNK_MAX_GAP", "3.0"))
+
+    scoring_workers: int = int(os.getenv("SCORING_WORKERS", "2"))
+    scoring_poll_interval: float = float(os.getenv("SCORING_POLL_INTERVAL", "5"))
+    scoring_max_attempts: int = int(os.getenv("SCORING_MAX_ATTEMPTS", "3"))
+    scoring_retry_backoff: float = float(os.getenv("SCORING_RETRY_BACKOFF", "10"))
+    scoring_stale_after: float = float(os.getenv("SCORING_STALE_AFTER", "300"))
+    rescore_concurrency: int = int(os.getenv("RESCORE_CONCURRENCY", "4"))
+    rescore_batch_size: int = int(os.getenv("RESCORE_BATCH_SIZE", "50"))
+
+    webhook_ingestion_mode: str = os.getenv("WEBHOOK_INGESTION_MODE", "inline")
+    webhook_queue_max_size: int = int(os.getenv("WEBHOOK_QUEUE_MAX_SIZE", "1000"))
+    webhook_workers: int = int(os.getenv("WEBHOOK_WORKERS", "4"))
+    webhook_parser: str = os.getenv("WEBHOOK_PARSER", "pydantic")
+
+    dedupe_cache_size: int = int(os.getenv("DEDUPE_CACHE_SIZE", "10000"))
+
+    delivery_status_tracking: bool = os.getenv("DELIVERY_STATUS_TRACKING", "false").lower() == "true"
+    delivery_status_batch_size: int = int(os.getenv("DELIVERY_STATUS_BATCH_SIZE", "200"))
+    delivery_status_flush_interval: float = float(os.getenv("DELIVERY_STATUS_FLUSH_INTERVAL", "5"))
+    delivery_status_max_buffer: int = int(os.getenv("DELIVERY_STATUS_MAX_BUFFER", "10000"))
 
     @property
     def database_url(self) -> str:
@@ -54,3 +125,6 @@ def load_lead_prompt() -> str:
 def load_scoring_prompt() -> str:
     return _load_prompt_file("system_prompt_scoring.md")
 
+@lru_cache
+def load_summary_prompt() -> str:
+    return _load_prompt_file("system_prompt_summary.md")
@@ -0,0 +1,89 @@
+from __future__ import annotations
+
+import logging
+import queue
+import threading
+import time
+import zlib
+from typing import Any, Callable, Hashable
+
+from app.utils.metrics import register_provider
+
+logger = logging.getLogger(__name__)
+
+class _Lane:
+
+    def __init__(self, name: str):
+        self.name = name
+        self.queue: queue.Queue[tuple[Callable[..., Any], tuple[Any, ...]]] = queue.Queue()
+        self.processed = 0
+        self.busy_seconds = 0.0
+        self.active_since: float | None = None
+        self.started_at = time.monotonic()
+        self._thread: threading.Thread | None = None
+        self._start_lock = threading.Lock()
+
+    def ensure_started(self) -> None:
+        if self._thread is not None:
+            return
+        with self._start_lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name=self.name, daemon=True)
+                self._thread.start()
+
+    def _run(self) -> None:
+        while True:
+            fn, args = self.queue.get()
+            self.active_since = time.monotonic()
+            try:
+                fn(*args)
+            except Exception as e:
+                logger.error(f"Erro ao executar tarefa na lane {self.name}: {e}")
+            finally:
+                self.busy_seconds += time.monotonic() - self.active_since
+                self.active_since = None
+                self.processed += 1
+                self.queue.task_done()
+
+    def stats(self) -> dict[str, Any]:
+        now = time.monotonic()
+        busy = self.busy_seconds
+        active_since = self.active_since
+        if active_since is not None:
+            busy += now - active_since
+        elapsed = max(now - self.started_at, 1e-9)
+        return {
+            "queued": self.queue.qsize(),
+            "active": active_since is not None,
+            "processed": self.processed,
+            "utilization": round(busy / elapsed, 4),
+        }
+
+class ShardedExecutor:
+
+    def __init__(self, name: str, lanes: int):
+        self.name = name
+        self._lanes = [_Lane(f"{name}-lane-{i}") for i in range(max(1, lanes))]
+        register_provider(f"sharded_{name}", self.stats)
+
+    def lane_for(self, key: Hashable) -> int:
+        return zlib.crc32(str(key).encode("utf-8")) % len(self._lanes)
+
+    def submit(self, key: Hashable, fn: Callable[..., Any], *args: Any) -> None:
+        lane = self._lanes[self.lane_for(key)]
+        lane.ensure_started()
+        lane.queue.put((fn, args))
+
+    @property
+    def queued(self) -> int:
+        return sum(lane.queue.qsize() for lane in self._lanes)
+
+    def stats(self) -> dict[str, Any]:
+        lanes = [lane.stats() for lane in self._lanes]
+        return {
+            "lanes": len(lanes),
+            "queued": sum(lane["queued"] for lane in lanes),
+            "active": sum(1 for lane in lanes if lane["active"]),
+            "max_queued": max(lane["queued"] for lane in lanes),
+            "per_lane": lanes,
+        }
@@ -0,0 +1,17 @@
+from __future__ import annotations
+
+CHARS_PER_TOKEN = 4
+MESSAGE_OVERHEAD_TOKENS = 4
+
+def estimate_tokens(text: str) -> int:
+    return MESSAGE_OVERHEAD_TOKENS + (len(text) + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN
+
+def window_start(contents: list[str], budget: int) -> int:
+    used = 0
+    start = len(contents)
+    for index in range(len(contents) - 1, -1, -1):
+        used += estimate_tokens(contents[index])
+        if used > budget and start < len(contents):
+            break
+        start = index
+    return start
@@ -0,0 +1,129 @@
+from __future__ import annotations
+
+import sys
+import threading
+import time
+import zlib
+from collections import OrderedDict
+from typing import Any, Callable, Generic, Hashable, TypeVar
+
+from app.utils.metrics import Counter
+
+V = TypeVar("V")
+
+class TTLCache(Generic[V]):
+
+    def __init__(self, max_entries: int, ttl: float):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries: OrderedDict[Hashable, tuple[float, V]] = OrderedDict()
+        self._lock = threading.RLock()
+        self.expired = Counter()
+        self.evicted = Counter()
+
+    @property
+    def lock(self) -> threading.RLock:
+        return self._lock
+
+    def _purge_locked(self, now: float) -> None:
+        while self._entries:
+            key, (touched_at, _) = next(iter(self._entries.items()))
+            if now - touched_at < self.ttl:
+                break
+            del self._entries[key]
+            self.expired.inc()
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evicted.inc()
+
+    def get(self, key: Hashable) -> V | None:
+        now = time.monotonic()
+        with self._lock:
+            self._purge_locked(now)
+            item = self._entries.get(key)
+            if item is None:
+                return None
+            self._entries[key] = (now, item[1])
+            self._entries.move_to_end(key)
+            return item[1]
+
+    def get_or_create(self, key: Hashable, factory: Callable[[], V]) -> V:
+        now = time.monotonic()
+        with self._lock:
+            item = self._entries.get(key)
+            value = item[1] if item is not None and now - item[0] < self.ttl else factory()
+            self._entries[key] = (now, value)
+            self._entries.move_to_end(key)
+            self._purge_locked(now)
+            return value
+
+    def pop(self, key: Hashable) -> V | None:
+        with self._lock:
+            item = self._entries.pop(key, None)
+            return item[1] if item else None
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def approximate_bytes(self, sizer: Callable[[V], int] | None = None) -> int:
+        with self._lock:
+            items = list(self._entries.items())
+        total = sys.getsizeof(self._entries)
+        for key, (_, value) in items:
+            total += sys.getsizeof(key) + (sizer(value) if sizer else sys.getsizeof(value))
+        return total
+
+    def stats(self, sizer: Callable[[V], int] | None = None) -> dict[str, Any]:
+        with self._lock:
+            self._purge_locked(time.monotonic())
+        return {
+            "entries": len(self),
+            "max_entries": self.max_entries,
+            "ttl_seconds": self.ttl,
+            "approx_bytes": self.approximate_bytes(sizer),
+            "expired": self.expired.value,
+            "evicted": self.evicted.value,
+        }
+
+class ShardedTTLCache(Generic[V]):
+
+    def __init__(self, shards: int, max_entries: int, ttl: float):
+        shards = max(1, shards)
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._shards: list[TTLCache[V]] = [
+            TTLCache(max(1, -(-max_entries // shards)), ttl) for _ in range(shards)
+        ]
+
+    def _shard(self, key: Hashable) -> TTLCache[V]:
+        return self._shards[zlib.crc32(str(key).encode("utf-8")) % len(self._shards)]
+
+    def lock_for(self, key: Hashable) -> threading.RLock:
+        return self._shard(key).lock
+
+    def get(self, key: Hashable) -> V | None:
+        return self._shard(key).get(key)
+
+    def get_or_create(self, key: Hashable, factory: Callable[[], V]) -> V:
+        return self._shard(key).get_or_create(key, factory)
+
+    def pop(self, key: Hashable) -> V | None:
+        return self._shard(key).pop(key)
+
+    def __len__(self) -> int:
+        return sum(len(shard) for shard in self._shards)
+
+    def approximate_bytes(self, sizer: Callable[[V], int] | None = None) -> int:
+        return sum(shard.approximate_bytes(sizer) for shard in self._shards)
+
+    def stats(self, sizer: Callable[[V], int] | None = None) -> dict[str, Any]:
+        shard_stats = [shard.stats(sizer) for shard in self._shards]
+        return {
+            "shards": len(shard_stats),
+            "entries": sum(s["entries"] for s in shard_stats),
+            "max_entries": self.max_entries,
+            "ttl_seconds": self.ttl,
+            "approx_bytes": sum(s["approx_bytes"] for s in shard_stats),
+            "expired": sum(s["expired"] for s in shard_stats),
+            "evicted": sum(s["evicted"] for s in shard_stats),
+        }
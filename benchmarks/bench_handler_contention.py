@@ -0,0 +1,119 @@
+from __future__ import annotations
+
+import argparse
+import random
+import sys
+import threading
+import time
+import uuid
+from pathlib import Path
+from types import SimpleNamespace
+from typing import Any, Iterable
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from app.entities.conversation_entity import ConversationStatus  # noqa: E402
+from app.schemas.webhook_schemas import InboundMessage  # noqa: E402
+from app.services import webhook_service  # noqa: E402
+from app.services.consolidation_store import MemoryConsolidationStore  # noqa: E402
+from app.services.webhook_service import ContactState, MessageHandler  # noqa: E402
+from app.utils.settings import settings  # noqa: E402
+from app.utils.ttl_cache import ShardedTTLCache  # noqa: E402
+
+class _Rows:
+
+    def __init__(self) -> None:
+        self.profiles: dict[str, Any] = {}
+        self.conversations: dict[uuid.UUID, Any] = {}
+
+    def profiles_for(self, db: Any, wa_ids: Iterable[str]) -> dict[str, Any]:
+        return {
+            wa_id: self.profiles.setdefault(wa_id, SimpleNamespace(id=uuid.uuid4()))
+            for wa_id in wa_ids
+        }
+
+    def conversations_for(self, db: Any, profile_ids: Iterable[uuid.UUID]) -> dict[uuid.UUID, Any]:
+        return {
+            profile_id: self.conversations.setdefault(
+                profile_id, SimpleNamespace(id=uuid.uuid4(), status=ConversationStatus.OPEN),
+            )
+            for profile_id in profile_ids
+        }
+
+class _WhatsApp:
+
+    def mark_as_read(self, message_id: str) -> None:
+        pass
+
+def _install_rows() -> None:
+    rows = _Rows()
+    webhook_service.profile_dao.get_or_create_many = rows.profiles_for
+    webhook_service.conversation_dao.get_or_create_open_many = rows.conversations_for
+    webhook_service.message_dao.get_existing_provider_message_ids = lambda db, ids: set()
+
+def _build_handler(stripes: int) -> MessageHandler:
+    handler = MessageHandler(whatsapp=_WhatsApp(), store=MemoryConsolidationStore(stripes))
+    handler._contacts = ShardedTTLCache(
+        stripes, settings.contact_state_max_entries, settings.contact_state_ttl,
+    )
+    handler.adaptive = False
+    handler.timeout = 0
+    handler._schedule_processing = lambda wa_id, delay, db_factory: _consume(handler, wa_id)
+    return handler
+
+def _consume(handler: MessageHandler, wa_id: str) -> None:
+    batch = handler.store.claim(wa_id)
+    if batch is None:
+        return
+    with handler._contacts.lock_for(wa_id):
+        state = handler._contacts.get_or_create(wa_id, ContactState)
+        handler._validate_message(state, " ".join(batch.texts))
+
+def _run(handler: MessageHandler, contacts: list[str], threads: int, per_thread: int) -> float:
+    barrier = threading.Barrier(threads + 1)
+
+    def worker(seed: int) -> None:
+        rng = random.Random(seed)
+        barrier.wait()
+        for i in range(per_thread):
+            message = InboundMessage(
+                wa_id=rng.choice(contacts),
+                message_id=f"wamid.{seed}.{i}",
+                message_type="text",
+                text_body=f"mensagem {i}",
+            )
+            handler.handle_text_messages([message], None, None)
+
+    workers = [threading.Thread(target=worker, args=(i,)) for i in range(threads)]
+    for w in workers:
+        w.start()
+    barrier.wait()
+    start = time.perf_counter()
+    for w in workers:
+        w.join()
+    return threads * per_thread / (time.perf_counter() - start)
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description="Mede a contencao do caminho handle_text_messages -> claim do MessageHandler",
+    )
+    parser.add_argument("--contacts", type=int, default=5000)
+    parser.add_argument("--threads", type=int, default=32)
+    parser.add_argument("--messages", type=int, default=2000, help="mensagens por thread")
+    parser.add_argument("--stripes", type=int, default=settings.consolidation_store_stripes)
+    parser.add_argument("--rounds", type=int, default=3)
+    args = parser.parse_args()
+
+    _install_rows()
+    contacts = [f"55119{i:08d}" for i in range(args.contacts)]
+
+    print(f"{'layout':<16}{'stripes':>8}{'msgs/s':>14}")
+    for name, stripes in (("global lock", 1), ("striped", args.stripes)):
+        best = max(
+            _run(_build_handler(stripes), contacts, args.threads, args.messages)
+            for _ in range(args.rounds)
+        )
+        print(f"{name:<16}{stripes:>8}{best:>14.0f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,122 @@
+from __future__ import annotations
+
+import argparse
+import json
+import sys
+import time
+from pathlib import Path
+from typing import Callable
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from app.utils.markers import MarkerParser, parse_markers  # noqa: E402
+
+SAMPLES = {
+    "plain": (
+        "Oi Ana, tudo bem? Que bom falar com voce!\n\n"
+        "Me conta um pouco mais sobre como a equipe comercial de voces trabalha hoje."
+    ),
+    "first_contact": (
+        "Entendi, faz total sentido. Muitas empresas do seu porte passam por isso.\n\n"
+        "Hoje voces usam alguma ferramenta para acompanhar os leads?\n\n"
+        '[ADD_TAG]{"tag": "saas"}[/ADD_TAG]\n'
+        '[ADD_TAG]{"tag": "dor_identificada"}[/ADD_TAG]\n'
+        '[LEAD_ANALYSIS]{"temperatura": "morno", "engajamento": "alto", "qualidade_respostas": "detalhada", '
+        '"dor_identificada": true, "resumo": "Cliente descreveu o processo atual com detalhes"}[/LEAD_ANALYSIS]\n'
+        "[NEGOTIATION_DETECTED]true[/NEGOTIATION_DETECTED]\n"
+        "[NEGATIVE_SIGNAL]true[/NEGATIVE_SIGNAL]"
+    ),
+    "onboarding": (
+        "Prazer, Ricardo! Anotei aqui.\n\n"
+        '[LEAD_DATA]{"first_name": "Ricardo", "last_name": null, "nome_empresa": "StartupX", '
+        '"cargo": "diretor comercial"}[/LEAD_DATA]'
+    ),
+    "bgx": (
+        "Perfeito, ja deixei registrado.\n"
+        '[BGX_COMMAND:ADD_TAGS] {"tags": ["saas", "b2b"]} [/BGX_COMMAND]\n'
+        '[BGX_COMMAND:CREATE_LEAD] {"nome_cliente": "Ana", "nome_empresa": "ACME"} [/BGX_COMMAND]'
+    ),
+}
+
+def legacy_chain(response_text: str) -> tuple[str, int]:
+    import re
+
+    actions = 0
+    text = response_text
+    if "[LEAD_DATA]" in text and "[/LEAD_DATA]" in text:
+        try:
+            start = text.index("[LEAD_DATA]") + len("[LEAD_DATA]")
+            end = text.index("[/LEAD_DATA]")
+            lead_json = text[start:end].strip()
+            json.loads(lead_json)
+            actions += 1
+            text = text.replace(f"[LEAD_DATA]{lead_json}[/LEAD_DATA]", "").strip()
+        except (json.JSONDecodeError, ValueError):
+            pass
+
+    pattern = r'\[LEAD_ANALYSIS\]\s*(\{.*?\})\s*\[/LEAD_ANALYSIS\]'
+    for match in re.findall(pattern, text, re.DOTALL):
+        json.loads(match)
+        actions += 1
+    text = re.sub(pattern, "", text).strip()
+
+    if "[NEGOTIATION_DETECTED]true[/NEGOTIATION_DETECTED]" in text:
+        actions += 1
+        text = text.replace("[NEGOTIATION_DETECTED]true[/NEGOTIATION_DETECTED]", "").strip()
+
+    if "[NEGATIVE_SIGNAL]true[/NEGATIVE_SIGNAL]" in text:
+        actions += 1
+        text = text.replace("[NEGATIVE_SIGNAL]true[/NEGATIVE_SIGNAL]", "").strip()
+
+    tag_pattern = r'\[ADD_TAG\]\s*(\{.*?\})\s*\[/ADD_TAG\]'
+    for match in re.findall(tag_pattern, text, re.DOTALL):
+        json.loads(match)
+        actions += 1
+    text = re.sub(tag_pattern, "", text).strip()
+
+    bgx_pattern = re.compile(r'\[BGX_COMMAND:(\w+)\]\s*(\{.*?\})\s*\[/BGX_COMMAND\]', re.DOTALL)
+    for _, json_str in bgx_pattern.findall(text):
+        json.loads(json_str)
+        actions += 1
+    text = bgx_pattern.sub("", text).strip()
+    return text, actions
+
+def engine(response_text: str) -> tuple[str, int]:
+    parsed = parse_markers(response_text)
+    return parsed.text, len(parsed.actions)
+
+def engine_streamed(response_text: str, delta_size: int = 8) -> tuple[str, int]:
+    parser = MarkerParser()
+    for i in range(0, len(response_text), delta_size):
+        parser.feed(response_text[i:i + delta_size])
+    parsed = parser.finish()
+    return parsed.text, len(parsed.actions)
+
+def _time_per_call(fn: Callable[[str], object], text: str, iterations: int) -> float:
+    start = time.perf_counter()
+    for _ in range(iterations):
+        fn(text)
+    return (time.perf_counter() - start) / iterations
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Compara o motor de marcadores com a cadeia de regex anterior")
+    parser.add_argument("--iterations", type=int, default=20000)
+    args = parser.parse_args()
+
+    implementations = {
+        "legacy": legacy_chain,
+        "engine": engine,
+        "streamed": engine_streamed,
+    }
+
+    print(f"{'sample':<16}{'impl':<10}{'us/call':>10}{'actions':>9}")
+    for name, text in SAMPLES.items():
+        for impl_name, fn in implementations.items():
+            _, actions = fn(text)
+            for _ in range(200):
+                fn(text)
+            per_call = _time_per_call(fn, text, args.iterations)
+            print(f"{name:<16}{impl_name:<10}{per_call * 1e6:>10.2f}{actions:>9}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+from __future__ import annotations
+
+import argparse
+import sys
+import time
+from pathlib import Path
+from typing import Callable
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from app.services.langgraph_service import (  # noqa: E402
+    FIRST_CONTACT_PROMPT_TEMPLATE,
+    NEGOTIATION_PROMPT_TEMPLATE,
+    ONBOARDING_PROMPT_TEMPLATE,
+    _load_prompt,
+)
+from app.utils.prompt_template import PromptTemplate  # noqa: E402
+
+CONFIG_VALUES = {
+    "tone_instructions": (
+        "- Seja cordial e profissional, sem formalidade excessiva\n"
+        "- Use linguagem clara e direta, evitando jargoes"
+    ),
+    "emoji_instructions": "- Use emojis com moderacao, no maximo um por mensagem",
+    "greeting_instructions": "- Cumprimente o cliente pelo nome quando souber",
+    "response_style_instructions": (
+        "- Mensagens curtas, de no maximo 300 caracteres\n"
+        "- Faca uma pergunta por vez"
+    ),
+}
+
+TURN_VALUES = {
+    "first_name": "Ana",
+    "nome_empresa": "ACME",
+    "cargo": "gerente comercial",
+    "context": "\n".join(
+        f"{'Cliente' if i % 2 == 0 else 'Agente'}: mensagem numero {i} da conversa ate aqui"
+        for i in range(10)
+    ),
+}
+
+TEMPLATES = {
+    "onboarding": ("system_prompt_onboarding.md", ONBOARDING_PROMPT_TEMPLATE),
+    "first_contact": ("system_prompt_first_contact.md", FIRST_CONTACT_PROMPT_TEMPLATE),
+    "negotiation": ("system_prompt_negotiation.md", NEGOTIATION_PROMPT_TEMPLATE),
+}
+
+def legacy_safe_format(template: str, **kwargs) -> str:
+    result = template
+    for key, value in kwargs.items():
+        placeholder = "{" + key + "}"
+        if value is None:
+            replacement = "Não informado"
+        else:
+            replacement = str(value)
+        result = result.replace(placeholder, replacement)
+    return result
+
+def _time_per_call(fn: Callable[[], str], iterations: int) -> float:
+    start = time.perf_counter()
+    for _ in range(iterations):
+        fn()
+    return (time.perf_counter() - start) / iterations
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Compara templates de prompt pre-compilados com o _safe_format anterior")
+    parser.add_argument("--iterations", type=int, default=20000)
+    args = parser.parse_args()
+
+    print(f"{'template':<16}{'impl':<10}{'us/call':>10}{'chars':>8}")
+    for name, (filename, compiled) in TEMPLATES.items():
+        source = _load_prompt(filename)
+        fields = {k: v for k, v in {**CONFIG_VALUES, **TURN_VALUES}.items() if k in compiled.placeholders}
+        turn_fields = {k: v for k, v in TURN_VALUES.items() if k in compiled.placeholders}
+        partial: PromptTemplate = compiled.partial(**CONFIG_VALUES)
+
+        implementations: dict[str, Callable[[], str]] = {
+            "legacy": lambda: legacy_safe_format(source, **fields),
+            "compiled": lambda: compiled.render(**fields),
+            "memoized": lambda: partial.render(**turn_fields),
+        }
+        expected = implementations["legacy"]()
+        for impl_name, fn in implementations.items():
+            rendered = fn()
+            if rendered != expected:
+                raise SystemExit(f"{name}/{impl_name}: saida diferente do legado")
+            for _ in range(200):
+                fn()
+            per_call = _time_per_call(fn, args.iterations)
+            print(f"{name:<16}{impl_name:<10}{per_call * 1e6:>10.2f}{len(rendered):>8}")
+
+if __name__ == "__main__":
+    main()
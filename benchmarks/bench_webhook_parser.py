@@ -0,0 +1,58 @@
+from __future__ import annotations
+
+import argparse
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+from typing import Callable
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from app.services.webhook_parser import parse_messages_fast, parse_messages_pydantic  # noqa: E402
+
+PAYLOADS_DIR = Path(__file__).parent / "payloads"
+
+def _time_per_call(fn: Callable[[bytes], object], body: bytes, iterations: int) -> float:
+    start = time.perf_counter()
+    for _ in range(iterations):
+        fn(body)
+    return (time.perf_counter() - start) / iterations
+
+def _peak_bytes_per_call(fn: Callable[[bytes], object], body: bytes, iterations: int) -> float:
+    tracemalloc.start()
+    total = 0
+    for _ in range(iterations):
+        current, _ = tracemalloc.get_traced_memory()
+        tracemalloc.reset_peak()
+        fn(body)
+        _, peak = tracemalloc.get_traced_memory()
+        total += peak - current
+    tracemalloc.stop()
+    return total / iterations
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Compara o parser rapido do webhook com os modelos Pydantic")
+    parser.add_argument("--iterations", type=int, default=20000)
+    args = parser.parse_args()
+
+    parsers = {
+        "pydantic": parse_messages_pydantic,
+        "fast": parse_messages_fast,
+    }
+
+    print(f"{'payload':<24}{'parser':<10}{'us/call':>10}{'peak bytes/call':>18}")
+    for path in sorted(PAYLOADS_DIR.glob("*.json")):
+        body = path.read_bytes()
+        baseline = parsers["pydantic"](body)
+        for name, fn in parsers.items():
+            if fn(body) != baseline:
+                raise SystemExit(f"{name} divergiu do parser Pydantic em {path.name}")
+            for _ in range(200):
+                fn(body)
+            per_call = _time_per_call(fn, body, args.iterations)
+            peak = _peak_bytes_per_call(fn, body, min(args.iterations, 2000))
+            print(f"{path.stem:<24}{name:<10}{per_call * 1e6:>10.2f}{peak:>18.0f}")
+
+if __name__ == "__main__":
+    main()
@@ -1,6 +1,8 @@
 from __future__ import annotations
 
+import asyncio
 import logging
+from contextlib import asynccontextmanager
 
 from fastapi import FastAPI, WebSocket, WebSocketDisconnect
 from fastapi.middleware.cors import CORSMiddleware
@@ -10,6 +12,9 @@ from app.controllers.client_controller import router as client_router
 from app.controllers.lead_controller import router as lead_router
 from app.controllers.message_controller import router as message_router
 from app.controllers.agent_config_controller import router as agent_config_router
+from app.controllers.metrics_controller import router as metrics_router
+from app.services.scoring_worker import get_scoring_worker
+from app.services.webhook_service import message_handler
 from app.services.websocket_manager import ws_manager
 
 logging.basicConfig(
@@ -17,10 +22,18 @@ logging.basicConfig(
     format="%(asctime)s - %(name)s - %(levelname)s - %(message)s",
 )
 
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    ws_manager.bind_loop(asyncio.get_running_loop())
+    message_handler.start_recovery()
+    get_scoring_worker().start()
+    yield
+
 app = FastAPI(
     title="WhatsApp Agent API",
     description="API para agente de atendimento via WhatsApp com IA",
     version="2.0.0",
+    lifespan=lifespan,
 )
 
 app.add_middleware(
@@ -36,6 +49,7 @@ app.include_router(client_router)
 app.include_router(lead_router)
 app.include_router(message_router)
 app.include_router(agent_config_router)
+app.include_router(metrics_router)
 
 @app.websocket("/ws")
 async def websocket_endpoint(websocket: WebSocket):
@@ -0,0 +1,60 @@
+from __future__ import annotations
+
+import argparse
+import logging
+import sys
+from datetime import datetime
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from app.dao.lead_dao import STEP_COLUMNS  # noqa: E402
+from app.services.lead_rescoring_service import (  # noqa: E402
+    LeadRescorer,
+    RescoreFilter,
+    RescoreRun,
+)
+
+def _print_progress(run: RescoreRun) -> None:
+    print(
+        f"\r{run.processed:>6}/{run.total:<6} atualizados={run.updated:<6} falhas={run.failed:<4} "
+        f"{run.throughput:>7.2f} leads/s",
+        end="",
+        flush=True,
+    )
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Recalcula o score dos leads selecionados pelos filtros")
+    parser.add_argument("--status", choices=("quente", "morno", "frio"))
+    parser.add_argument("--step", choices=tuple(STEP_COLUMNS), help="Step do pipeline")
+    parser.add_argument("--created-from", type=datetime.fromisoformat, help="Data ISO inicial (inclusiva)")
+    parser.add_argument("--created-to", type=datetime.fromisoformat, help="Data ISO final (exclusiva)")
+    parser.add_argument("--limit", type=int)
+    parser.add_argument("--concurrency", type=int, help="Padrao: RESCORE_CONCURRENCY")
+    parser.add_argument("--batch-size", type=int, help="Padrao: RESCORE_BATCH_SIZE")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.WARNING)
+    filters = RescoreFilter(
+        status=args.status,
+        step=args.step,
+        created_from=args.created_from,
+        created_to=args.created_to,
+        limit=args.limit,
+    )
+    try:
+        run = LeadRescorer(batch_size=args.batch_size).run(filters, args.concurrency, on_progress=_print_progress)
+    except RuntimeError as e:
+        raise SystemExit(f"Rescoring nao iniciado: {e}")
+    print()
+
+    print(f"{'estado':<12}{'total':>8}{'atualizados':>13}{'falhas':>8}{'segundos':>10}{'leads/s':>10}")
+    print(
+        f"{run.state:<12}{run.total:>8}{run.updated:>13}{run.failed:>8}"
+        f"{run.elapsed_seconds:>10.1f}{run.throughput:>10.2f}"
+    )
+    if run.error:
+        raise SystemExit(f"Rescoring interrompido: {run.error}")
+
+if __name__ == "__main__":
+    main()
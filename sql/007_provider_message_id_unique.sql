@@ -0,0 +1,17 @@
+-- Migration: Idempotência do webhook por provider_message_id
+-- Data: 2026-10-17
+-- Descrição: Garante que uma mesma mensagem do WhatsApp (wamid) seja
+--            persistida no máximo uma vez, mesmo quando a Meta reenvia o webhook.
+
+-- Remove duplicatas existentes mantendo o registro mais antigo
+DELETE FROM messages m
+USING messages d
+WHERE m.provider_message_id IS NOT NULL
+  AND m.provider_message_id = d.provider_message_id
+  AND m.created_at > d.created_at;
+
+CREATE UNIQUE INDEX IF NOT EXISTS uq_messages_provider_message_id
+    ON messages(provider_message_id)
+    WHERE provider_message_id IS NOT NULL;
+
+COMMENT ON COLUMN messages.provider_message_id IS 'ID da mensagem no WhatsApp (wamid). Único quando presente.';
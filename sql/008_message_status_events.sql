@@ -0,0 +1,18 @@
+-- Migration: Eventos de status de entrega (sent/delivered/read)
+-- Data: 2026-10-17
+-- Descrição: Tabela append-only com os callbacks de status do WhatsApp,
+--            gravada em lote e ligada a messages.provider_message_id.
+
+CREATE TABLE IF NOT EXISTS message_status_events (
+    id UUID PRIMARY KEY DEFAULT gen_random_uuid(),
+    provider_message_id VARCHAR(128) NOT NULL,
+    status VARCHAR(32) NOT NULL,
+    recipient_id VARCHAR(32),
+    status_at TIMESTAMPTZ,
+    created_at TIMESTAMPTZ NOT NULL DEFAULT NOW()
+);
+
+CREATE INDEX IF NOT EXISTS idx_message_status_events_provider_message_id
+    ON message_status_events(provider_message_id);
+
+COMMENT ON TABLE message_status_events IS 'Callbacks de status do WhatsApp (sent, delivered, read, failed)';
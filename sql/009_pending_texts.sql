@@ -0,0 +1,22 @@
+-- Migration: Buffer de consolidação compartilhado entre workers
+-- Data: 2026-10-17
+-- Descrição: Textos recebidos aguardando a janela de consolidação.
+--            Cada worker reivindica os textos de um contato com
+--            SELECT ... FOR UPDATE SKIP LOCKED e os remove ao processar,
+--            permitindo múltiplos processos uvicorn e sobrevivendo a restarts.
+
+CREATE TABLE IF NOT EXISTS pending_texts (
+    id BIGSERIAL PRIMARY KEY,
+    wa_id VARCHAR(32) NOT NULL,
+    profile_id UUID NOT NULL,
+    conversation_id UUID NOT NULL,
+    provider_message_id VARCHAR(128),
+    text TEXT NOT NULL,
+    due_at TIMESTAMPTZ NOT NULL,
+    created_at TIMESTAMPTZ NOT NULL DEFAULT NOW()
+);
+
+CREATE INDEX IF NOT EXISTS idx_pending_texts_wa_id ON pending_texts(wa_id);
+CREATE INDEX IF NOT EXISTS idx_pending_texts_due_at ON pending_texts(due_at);
+
+COMMENT ON TABLE pending_texts IS 'Buffer de mensagens aguardando consolidação (CONSOLIDATION_STORE=postgres)';
@@ -0,0 +1,11 @@
+-- Migration: Resumo incremental da conversa
+-- Data: 2026-10-17
+-- Descrição: Mensagens que saem da janela de histórico (orçamento de tokens
+--            por etapa) são condensadas em um resumo por conversa, atualizado
+--            de forma incremental a partir de summary_until.
+
+ALTER TABLE conversations ADD COLUMN IF NOT EXISTS summary TEXT;
+ALTER TABLE conversations ADD COLUMN IF NOT EXISTS summary_until TIMESTAMPTZ;
+
+COMMENT ON COLUMN conversations.summary IS 'Resumo das mensagens anteriores à janela de histórico (CONVERSATION_SUMMARY=true)';
+COMMENT ON COLUMN conversations.summary_until IS 'created_at da última mensagem incorporada ao resumo';
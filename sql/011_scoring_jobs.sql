@@ -0,0 +1,25 @@
+-- Migration: Fila durável de scoring de leads
+-- Data: 2026-10-17
+-- Descrição: O scoring da passagem para negociação sai do caminho da resposta.
+--            O handler enfileira um job e um pool de workers reivindica os
+--            jobs com SELECT ... FOR UPDATE SKIP LOCKED, com novas tentativas
+--            via run_after e recuperação de jobs presos em 'running'.
+
+CREATE TABLE IF NOT EXISTS scoring_jobs (
+    id BIGSERIAL PRIMARY KEY,
+    lead_id UUID NOT NULL REFERENCES leads(id) ON DELETE CASCADE,
+    conversation_id UUID NOT NULL,
+    status VARCHAR(16) NOT NULL DEFAULT 'pending',
+    attempts INTEGER NOT NULL DEFAULT 0,
+    run_after TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+    locked_at TIMESTAMPTZ,
+    last_error TEXT,
+    created_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+    updated_at TIMESTAMPTZ NOT NULL DEFAULT NOW()
+);
+
+CREATE INDEX IF NOT EXISTS idx_scoring_jobs_status_run_after ON scoring_jobs(status, run_after);
+CREATE UNIQUE INDEX IF NOT EXISTS uq_scoring_jobs_active_lead
+    ON scoring_jobs(lead_id) WHERE status IN ('pending', 'running');
+
+COMMENT ON TABLE scoring_jobs IS 'Jobs de scoring de lead processados em background (pending, running, done, failed)';
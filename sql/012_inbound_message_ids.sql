@@ -0,0 +1,23 @@
+-- Migration: Todos os wamids de um turno consolidado
+-- Data: 2026-10-17
+-- Descrição: Um turno consolidado junta várias mensagens do WhatsApp, mas
+--            messages.provider_message_id guarda apenas o primeiro wamid.
+--            Esta tabela registra cada wamid do turno com chave única, para
+--            que reenvios da Meta de qualquer mensagem do lote sejam
+--            descartados mesmo após reinício ou expiração do cache em memória.
+
+CREATE TABLE IF NOT EXISTS inbound_message_ids (
+    provider_message_id VARCHAR(128) PRIMARY KEY,
+    message_id UUID NOT NULL REFERENCES messages(id) ON DELETE CASCADE,
+    created_at TIMESTAMPTZ NOT NULL DEFAULT NOW()
+);
+
+CREATE INDEX IF NOT EXISTS idx_inbound_message_ids_message_id ON inbound_message_ids(message_id);
+
+INSERT INTO inbound_message_ids (provider_message_id, message_id)
+SELECT provider_message_id, id
+FROM messages
+WHERE role = 'user' AND provider_message_id IS NOT NULL
+ON CONFLICT DO NOTHING;
+
+COMMENT ON TABLE inbound_message_ids IS 'wamids de entrada já persistidos, um por mensagem do WhatsApp consolidada em messages';
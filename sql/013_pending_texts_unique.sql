@@ -0,0 +1,17 @@
+-- Migration: Idempotência do buffer de consolidação por provider_message_id
+-- Data: 2026-10-17
+-- Descrição: Com vários workers, um reenvio da Meta pode cair em um processo
+--            cujo cache de deduplicação em memória não viu o wamid. O índice
+--            único parcial faz o INSERT ... ON CONFLICT DO NOTHING descartar o
+--            texto repetido em vez de duplicá-lo no turno consolidado.
+
+-- Remove duplicatas pendentes mantendo o registro mais antigo
+DELETE FROM pending_texts p
+USING pending_texts d
+WHERE p.provider_message_id IS NOT NULL
+  AND p.provider_message_id = d.provider_message_id
+  AND p.id > d.id;
+
+CREATE UNIQUE INDEX IF NOT EXISTS uq_pending_texts_provider_message_id
+    ON pending_texts(provider_message_id)
+    WHERE provider_message_id IS NOT NULL;
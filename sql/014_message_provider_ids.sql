@@ -0,0 +1,18 @@
+-- Migration: wamids de saída na tabela de ids do provedor
+-- Data: 2026-10-17
+-- Descrição: Uma resposta do agente é enviada em vários chunks, cada um com
+--            o seu wamid, mas messages.provider_message_id guarda apenas o
+--            primeiro. A tabela inbound_message_ids passa a registrar também
+--            os wamids de saída, para que os callbacks de status de qualquer
+--            chunk possam ser ligados à mensagem.
+
+ALTER TABLE IF EXISTS inbound_message_ids RENAME TO message_provider_ids;
+ALTER INDEX IF EXISTS idx_inbound_message_ids_message_id RENAME TO idx_message_provider_ids_message_id;
+
+INSERT INTO message_provider_ids (provider_message_id, message_id)
+SELECT provider_message_id, id
+FROM messages
+WHERE role = 'agent' AND provider_message_id IS NOT NULL
+ON CONFLICT DO NOTHING;
+
+COMMENT ON TABLE message_provider_ids IS 'Todos os wamids (entrada e saída) de cada mensagem persistida em messages';
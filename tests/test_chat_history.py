@@ -0,0 +1,78 @@
+from __future__ import annotations
+
+import uuid
+from datetime import datetime, timedelta, timezone
+from types import SimpleNamespace
+
+import pytest
+
+from app.services import webhook_service
+from app.services.consolidation_store import MemoryConsolidationStore
+from app.services.webhook_service import MessageHandler
+from app.utils.settings import settings
+
+BASE = datetime(2026, 1, 1, tzinfo=timezone.utc)
+
+class _Summarizer:
+
+    def __init__(self) -> None:
+        self.scheduled: list[datetime] = []
+
+    def schedule(self, conversation_id: uuid.UUID, window_start: datetime) -> None:
+        self.scheduled.append(window_start)
+
+def _messages(count: int) -> list[SimpleNamespace]:
+    return [
+        SimpleNamespace(
+            role="user" if i % 2 == 0 else "assistant",
+            content=f"mensagem numero {i} " + "x" * 36,
+            created_at=BASE + timedelta(minutes=i),
+        )
+        for i in range(count)
+    ]
+
+@pytest.fixture
+def handler(monkeypatch):
+    monkeypatch.setattr(settings, "history_scan_limit", 100)
+    monkeypatch.setattr(settings, "summary_min_messages", 6)
+    monkeypatch.setattr(settings, "summary_min_tokens", 10_000)
+    handler = MessageHandler(whatsapp=SimpleNamespace(), store=MemoryConsolidationStore(1))
+    handler.history_selection = "budget"
+    handler.conversation_summary = True
+    handler._summarizer = _Summarizer()
+    handler._history_budget = lambda pipeline_stage: 60
+    return handler
+
+def _build(handler, monkeypatch, messages, summary_until):
+    monkeypatch.setattr(webhook_service, "get_messages_by_conversation_id", lambda db, cid, limit: messages)
+    history, _ = handler._build_chat_history(None, uuid.uuid4(), "negotiation", summary_until)
+    return [msg.content for msg in history]
+
+def test_messages_after_summary_stay_in_window_until_summarized(handler, monkeypatch):
+    messages = _messages(20)
+    summary_until = messages[13].created_at
+
+    contents = _build(handler, monkeypatch, messages, summary_until)
+
+    assert contents == [msg.content for msg in messages[14:]]
+    assert handler.summarizer.scheduled == []
+
+def test_summarizer_runs_once_overflow_is_large_enough(handler, monkeypatch):
+    messages = _messages(20)
+    summary_until = messages[5].created_at
+
+    contents = _build(handler, monkeypatch, messages, summary_until)
+
+    assert contents == [msg.content for msg in messages[6:]]
+    assert len(handler.summarizer.scheduled) == 1
+    assert handler.summarizer.scheduled[0] > summary_until
+
+def test_window_never_overlaps_summarized_messages(handler, monkeypatch):
+    handler._history_budget = lambda pipeline_stage: 10_000
+    messages = _messages(20)
+    summary_until = messages[9].created_at
+
+    contents = _build(handler, monkeypatch, messages, summary_until)
+
+    assert contents == [msg.content for msg in messages[10:]]
+    assert handler.summarizer.scheduled == []
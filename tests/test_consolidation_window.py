@@ -0,0 +1,38 @@
+from __future__ import annotations
+
+from app.services.consolidation_window import AdaptiveWindow, TypingCadence
+
+def _simulate(window: AdaptiveWindow, gaps: list[float]) -> list[float]:
+    cadence = TypingCadence()
+    now = 1000.0
+    applied = []
+    for gap in gaps:
+        now += gap
+        window.observe(cadence, now)
+        applied.append(window.window_for(cadence))
+    return applied
+
+def test_single_message_turns_stay_at_min_window():
+    window = AdaptiveWindow(min_window=5, max_window=60, default_window=5)
+    assert _simulate(window, [0, 30, 40, 25, 50]) == [5, 5, 5, 5, 5]
+
+def test_burst_closes_when_gap_exceeds_applied_window():
+    window = AdaptiveWindow(min_window=5, max_window=60, default_window=5)
+    cadence = TypingCadence()
+    now = 1000.0
+    for gap in (0, 3, 4, 3):
+        now += gap
+        window.observe(cadence, now)
+        window.window_for(cadence)
+    assert cadence.current_burst == 4
+
+    now += 40
+    window.observe(cadence, now)
+    assert cadence.current_burst == 1
+    assert cadence.burst_size_ewma == 4
+
+def test_multi_turn_conversation_widens_only_while_typing():
+    window = AdaptiveWindow(min_window=5, max_window=60, default_window=5)
+    applied = _simulate(window, [0, 3, 4, 3, 40, 2, 3, 50, 45, 35])
+    assert all(w < 10 for w in applied)
+    assert applied[2] > applied[0]
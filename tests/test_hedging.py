@@ -0,0 +1,57 @@
+from __future__ import annotations
+
+import threading
+import time
+
+import pytest
+
+from app.services.llm_limiter import LLMLimiter
+from app.utils.hedging import DeadlineExceeded, HedgedCall
+
+def _hedged(**kwargs) -> HedgedCall:
+    return HedgedCall("test", hedge_percentile=95, min_hedge_delay=0.01, min_samples=1000, **kwargs)
+
+def test_deadline_abandons_call_and_releases_limiter_slot():
+    limiter = LLMLimiter(max_concurrency=1, requests_per_minute=0, tokens_per_minute=0)
+    release = threading.Event()
+
+    def slow():
+        with limiter.slot("negotiation", 10):
+            release.wait(5)
+        return "tarde"
+
+    with pytest.raises(DeadlineExceeded):
+        _hedged().call(slow, None, deadline=0.1)
+
+    started = time.monotonic()
+    with limiter.slot("negotiation", 10):
+        pass
+    assert time.monotonic() - started < 1
+    release.set()
+
+def test_fallback_started_by_reserve_wins_over_stuck_primary():
+    calls = _hedged(fallback_reserve=0.15)
+    release = threading.Event()
+
+    def primary():
+        release.wait(5)
+        return "primaria"
+
+    def fallback():
+        time.sleep(0.1)
+        return "fallback"
+
+    assert calls.call(primary, fallback, deadline=0.3) == ("fallback", "fallback")
+    release.set()
+
+def test_executor_is_bounded():
+    calls = _hedged(max_workers=2)
+    gate = threading.Event()
+    threads = [threading.Thread(target=calls.call, args=(lambda: gate.wait(5), None, None)) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    time.sleep(0.1)
+    assert len([t for t in threading.enumerate() if t.name.startswith("test-call")]) == 2
+    gate.set()
+    for thread in threads:
+        thread.join()
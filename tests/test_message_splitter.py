@@ -0,0 +1,58 @@
+from __future__ import annotations
+
+import random
+
+import pytest
+
+from app.utils.markers import parse_markers
+from app.utils.message_splitter import StreamingSplitter, split_response
+
+SENTENCES = [
+    "Oi! Tudo bem?",
+    "Obrigado pelo retorno, vou verificar com o time comercial.",
+    "O plano anual tem desconto de 20% e inclui suporte dedicado.",
+    "Podemos agendar uma demonstracao para quinta-feira as 15h?",
+    "Fico no aguardo.",
+    "Segue o link: https://exemplo.com.br/proposta?id=123",
+    "palavra" * 60,
+]
+
+SEPARATORS = [" ", " ", "\n", "\n\n", "\n\n\n", " \n\n "]
+
+def _random_text(rng: random.Random) -> str:
+    parts = []
+    for _ in range(rng.randint(1, 14)):
+        parts.append(rng.choice(SENTENCES))
+        parts.append(rng.choice(SEPARATORS))
+    if rng.random() < 0.3:
+        parts.insert(rng.randrange(len(parts)), "[LEAD_SCORE]80[/LEAD_SCORE]")
+    return "".join(parts)
+
+def _stream(text: str, rng: random.Random, max_length: int) -> list[str]:
+    splitter = StreamingSplitter(max_length=max_length)
+    chunks: list[str] = []
+    pos = 0
+    while pos < len(text):
+        step = rng.randint(1, 40)
+        chunks.extend(splitter.feed(text[pos:pos + step]))
+        pos += step
+    chunks.extend(splitter.finish())
+    return chunks
+
+@pytest.mark.parametrize("seed", range(300))
+def test_streamed_chunks_match_split_response(seed):
+    rng = random.Random(seed)
+    text = _random_text(rng)
+    max_length = rng.choice((80, 160, 300))
+
+    expected = split_response(parse_markers(text).text, max_length=max_length)
+
+    assert _stream(text, rng, max_length) == expected
+
+def test_paragraphs_are_emitted_before_the_stream_ends():
+    splitter = StreamingSplitter(max_length=60)
+    first = "Obrigado pelo retorno, vou verificar com o time comercial."
+    second = "Podemos agendar uma demonstracao para quinta-feira as 15h?"
+
+    assert splitter.feed(f"{first}\n\n{second}\n\nFico") == [first]
+    assert splitter.finish() == [second, "Fico"]
@@ -0,0 +1,41 @@
+from __future__ import annotations
+
+from types import SimpleNamespace
+
+import pytest
+
+from app.services.consolidation_store import MemoryConsolidationStore
+from app.services.outbound_service import OutboundReply
+from app.services.webhook_service import MessageHandler, StreamGate
+
+class _Outbound:
+
+    def push(self, reply: OutboundReply, chunk: str) -> None:
+        reply.chunks.append(chunk)
+
+@pytest.fixture
+def handler():
+    handler = MessageHandler(whatsapp=SimpleNamespace(), store=MemoryConsolidationStore(1))
+    handler._outbound = _Outbound()
+    return handler
+
+def _reply() -> OutboundReply:
+    return OutboundReply(wa_id="5511999990000", chunks=[], not_before=0.0, open=True)
+
+def test_fallback_runs_when_nothing_was_streamed(handler):
+    gate = StreamGate()
+    reply = _reply()
+
+    assert handler._fallback_unless_streamed(gate, lambda: "fallback") == "fallback"
+    handler._push_chunk(reply, gate, "atrasado")
+
+    assert reply.chunks == []
+
+def test_fallback_is_refused_after_partial_stream(handler):
+    gate = StreamGate()
+    reply = _reply()
+    handler._push_chunk(reply, gate, "primeira parte")
+
+    with pytest.raises(RuntimeError):
+        handler._fallback_unless_streamed(gate, lambda: "fallback")
+    assert reply.chunks == ["primeira parte"]